@@ -8,7 +8,46 @@ Handles archiving operations
 """
 
 import frappe
-from frappe.utils import now
+from frappe import _
+from frappe.utils import cint, now
+
+from correspondence.correspondence.api.search import (
+	get_branch_table,
+	get_cursor_condition,
+	get_permission_conditions,
+)
+from correspondence.correspondence.utils.archive_export import enqueue_archive_export, get_export_status
+from correspondence.correspondence.utils.archive_numbers import get_archive_number
+from correspondence.correspondence.utils.archive_statistics import get_archive_summary
+from correspondence.correspondence.utils.archive_tables import (
+	get_archive_tables,
+	get_stub_condition,
+	restore_letters,
+	retarget_query,
+)
+from correspondence.correspondence.utils.bulk_archive import enqueue_bulk_archive, get_job_status
+from correspondence.correspondence.utils.pagination import decode_cursor, encode_cursor, get_page_size
+from correspondence.correspondence.utils.query_builder import build_sql_conditions
+from correspondence.correspondence.utils.query_profiler import SearchProfiler, get_profiler_mode
+from correspondence.correspondence.utils.search_cache import cached_search
+
+
+# Filters accepted by search_archived_documents: key -> (column, operator)
+ARCHIVE_SEARCH_FILTERS = {
+	"archive_location": ("archive_location", "="),
+	"from_date": ("archived_on", ">="),
+	"to_date": ("archived_on", "<="),
+	"archived_by": ("archived_by", "="),
+	"department": ("department", "="),
+	"archive_number": ("archive_number", "="),
+	"letter_number": ("letter_number", "="),
+}
+
+# Archived doctypes searched -> correspondent columns (the other side is NULL)
+ARCHIVE_SEARCH_DOCTYPES = {
+	"Incoming Letter": "`sender`, NULL AS `recipient`",
+	"Outgoing Letter": "NULL AS `sender`, `recipient`",
+}
 
 
 @frappe.whitelist()
@@ -32,8 +71,7 @@ def archive_document(doctype, docname, archive_location=None):
 			return {"success": False, "error": "Document is already archived"}
 		
 		# Generate archive number
-		from frappe.model.naming import make_autoname
-		archive_number = make_autoname("ARCH-.YYYY.-.MM.-.#####")
+		archive_number = get_archive_number()
 		
 		# Update document
 		doc.is_archived = 1
@@ -45,12 +83,9 @@ def archive_document(doctype, docname, archive_location=None):
 		if archive_location:
 			doc.archive_location = archive_location
 		
+		# Archive location counts are updated by the on_change hook
 		doc.save(ignore_permissions=True)
 		
-		# Update archive location count
-		if archive_location:
-			update_archive_location_count(archive_location)
-		
 		return {
 			"success": True,
 			"archive_number": archive_number,
@@ -67,58 +102,47 @@ def bulk_archive(documents, archive_location=None):
 	"""
 	Bulk archive multiple documents
 	
+	The documents are archived set-based in one transaction by a background
+	job; follow it with the `bulk_archive_progress` realtime event or
+	get_bulk_archive_status.
+	
 	Args:
 		documents: List of documents (JSON string or list of dicts with doctype and name)
 		archive_location: Optional archive location for all documents
 	
 	Returns:
-		Results summary
+		Success status, job_id, number of queued documents and already_queued
 	"""
 	import json
 	
 	if isinstance(documents, str):
 		documents = json.loads(documents)
 	
-	results = {
-		"success": [],
-		"failed": [],
-		"total": len(documents)
-	}
-	
-	for doc_info in documents:
-		try:
-			doctype = doc_info.get('doctype')
-			docname = doc_info.get('name')
-			
-			if not doctype or not docname:
-				results['failed'].append({
-					"doc": doc_info,
-					"error": "Missing doctype or name"
-				})
-				continue
-			
-			result = archive_document(doctype, docname, archive_location)
-			
-			if result.get('success'):
-				results['success'].append({
-					"doctype": doctype,
-					"name": docname,
-					"archive_number": result.get('archive_number')
-				})
-			else:
-				results['failed'].append({
-					"doctype": doctype,
-					"name": docname,
-					"error": result.get('error')
-				})
-		
-		except Exception as e:
-			results['failed'].append({
-				"doc": doc_info,
-				"error": str(e)
-			})
+	try:
+		return enqueue_bulk_archive(documents, archive_location)
+	
+	except Exception as e:
+		frappe.log_error(f"Bulk archive failed: {str(e)}")
+		return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def get_bulk_archive_status(job_id):
+	"""
+	Get the progress or result of a bulk archive job
 	
-	return results
+	Args:
+		job_id: Job id returned by bulk_archive
+	
+	Returns:
+		Job status (Queued, Running, Completed or Failed) with progress or results
+	"""
+	status = get_job_status(job_id)
+	
+	if not status or (status.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles()):
+		return {"success": False, "error": "Unknown bulk archive job"}
+	
+	return {"success": True, **status}
 
 
 @frappe.whitelist()
@@ -138,15 +162,13 @@ def unarchive_document(doctype, docname):
 		if "System Manager" not in frappe.get_roles():
 			return {"success": False, "error": "Only System Manager can unarchive documents"}
 		
+		# Letters of past archive years may have been moved to an archive table
+		restore_letters(doctype, [docname])
 		doc = frappe.get_doc(doctype, docname)
 		
 		if not doc.is_archived:
 			return {"success": False, "error": "Document is not archived"}
 		
-		# Update archive location count before unarchiving
-		if doc.archive_location:
-			update_archive_location_count(doc.archive_location)
-		
 		# Unarchive
 		doc.is_archived = 0
 		doc.status = "Completed"  # Reset to completed status
@@ -155,65 +177,80 @@ def unarchive_document(doctype, docname):
 		return {"success": True, "message": "Document unarchived successfully"}
 	
 	except Exception as e:
+		# Do not commit a partly restored letter
+		frappe.db.rollback()
 		frappe.log_error(f"Unarchive document failed: {str(e)}")
 		return {"success": False, "error": str(e)}
 
 
+@frappe.whitelist()
+def export_archived_documents(doctype=None, from_date=None, to_date=None, archive_location=None, names=None, compress=0):
+	"""
+	Export archived letters as a package for hand-off (background job)
+	
+	The package is a tar file with each letter's document, attachments,
+	version history and signatures, and a manifest.jsonl with SHA-256
+	checksums; follow the `archive_export_progress` realtime event or
+	get_archive_export_status for progress, throughput and the file URL.
+	
+	Args:
+		doctype: Incoming Letter or Outgoing Letter (default both)
+		from_date: Archived on or after
+		to_date: Archived on or before
+		archive_location: Archive location
+		names: Optional JSON list of letter names
+		compress: 1 to gzip the package
+	
+	Returns:
+		Success status and job_id
+	"""
+	import json
+	
+	if isinstance(names, str):
+		names = json.loads(names) if names else None
+	
+	try:
+		frappe.only_for(["System Manager", "Correspondence Manager"])
+		return enqueue_archive_export([doctype] if doctype else None, from_date, to_date, archive_location, names, compress)
+	
+	except Exception as e:
+		frappe.log_error(f"Archive export failed: {str(e)}")
+		return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def get_archive_export_status(job_id):
+	"""
+	Get the progress or result of an archive export job
+	
+	Args:
+		job_id: Job id returned by export_archived_documents
+	
+	Returns:
+		Job status (Queued, Running, Completed or Failed) with throughput metrics
+	"""
+	status = get_export_status(job_id)
+	
+	if not status or (status.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles()):
+		return {"success": False, "error": "Unknown archive export job"}
+	
+	return {"success": True, **status}
+
+
 @frappe.whitelist()
 def get_archive_statistics():
 	"""
 	Get archive statistics
 	
+	Read from the maintained Archive Statistic summary; `updated_on` is the
+	last change, `rebuilt_on` the last full rebuild and `stale` is set when
+	no rebuild ran recently.
+	
 	Returns:
 		Statistics about archived documents
 	"""
 	try:
-		stats = {}
-		
-		# Total archived documents
-		stats['total_archived'] = frappe.db.count('Incoming Letter', {'is_archived': 1})
-		stats['total_archived'] += frappe.db.count('Outgoing Letter', {'is_archived': 1})
-		
-		# By department
-		stats['by_department'] = frappe.db.sql("""
-			SELECT department, COUNT(*) as count
-			FROM (
-				SELECT department FROM `tabIncoming Letter` WHERE is_archived = 1
-				UNION ALL
-				SELECT department FROM `tabOutgoing Letter` WHERE is_archived = 1
-			) as combined
-			WHERE department IS NOT NULL
-			GROUP BY department
-			ORDER BY count DESC
-		""", as_dict=True)
-		
-		# By location
-		stats['by_location'] = frappe.db.sql("""
-			SELECT archive_location, COUNT(*) as count
-			FROM (
-				SELECT archive_location FROM `tabIncoming Letter` WHERE is_archived = 1
-				UNION ALL
-				SELECT archive_location FROM `tabOutgoing Letter` WHERE is_archived = 1
-			) as combined
-			WHERE archive_location IS NOT NULL
-			GROUP BY archive_location
-			ORDER BY count DESC
-		""", as_dict=True)
-		
-		# By year
-		stats['by_year'] = frappe.db.sql("""
-			SELECT YEAR(archived_on) as year, COUNT(*) as count
-			FROM (
-				SELECT archived_on FROM `tabIncoming Letter` WHERE is_archived = 1
-				UNION ALL
-				SELECT archived_on FROM `tabOutgoing Letter` WHERE is_archived = 1
-			) as combined
-			WHERE archived_on IS NOT NULL
-			GROUP BY YEAR(archived_on)
-			ORDER BY year DESC
-		""", as_dict=True)
-		
-		return {"success": True, "statistics": stats}
+		return {"success": True, "statistics": get_archive_summary()}
 	
 	except Exception as e:
 		frappe.log_error(f"Get archive statistics failed: {str(e)}")
@@ -244,27 +281,26 @@ def get_available_archive_locations():
 		return {"success": False, "error": str(e)}
 
 
-def update_archive_location_count(location_name):
-	"""
-	Update the count of documents in an archive location
-	
-	Args:
-		location_name: Archive location name
-	"""
-	try:
-		location = frappe.get_doc("Archive Location", location_name)
-		location.update_count()
-	except Exception as e:
-		frappe.log_error(f"Update archive location count failed: {str(e)}")
-
-
 @frappe.whitelist()
-def search_archived_documents(filters=None):
+def search_archived_documents(filters=None, use_cache=True, doctype=None, limit=50, cursor=None, with_timings=None):
 	"""
 	Search archived documents
 	
+	Archived Incoming and Outgoing Letters are returned newest archived
+	first in one list, one page at a time. Each doctype reads its own page
+	from the (is_archived, archive_location, archived_on) or
+	(is_archived, archived_on) index, and the pages are merged in one
+	UNION ALL query.
+	
 	Args:
-		filters: Search filters (JSON string or dict)
+		filters: Search filters (JSON string or dict); keys are limited to
+			ARCHIVE_SEARCH_FILTERS
+		use_cache: Serve repeated searches from the per-user result cache
+		doctype: Restrict to Incoming Letter or Outgoing Letter
+		limit: Maximum results per page
+		cursor: Cursor returned by the previous page
+		with_timings: Return a timing breakdown (see search.search_letters);
+			bypasses the cache
 	
 	Returns:
 		Archived documents
@@ -274,42 +310,140 @@ def search_archived_documents(filters=None):
 	if isinstance(filters, str):
 		filters = json.loads(filters) if filters else {}
 	
-	try:
-		# Base filter
-		base_filter = {"is_archived": 1}
-		
-		# Add additional filters
-		if filters:
-			base_filter.update(filters)
-		
-		# Search in both doctypes
-		incoming = frappe.get_all(
-			"Incoming Letter",
-			filters=base_filter,
-			fields=["name", "letter_number", "subject", "sender", "archive_number", 
-			        "archive_location", "archived_on", "archived_by"],
-			limit=100
+	if not filters:
+		filters = {}
+	
+	if cint(use_cache) and not get_profiler_mode(with_timings):
+		arguments = {"filters": filters, "doctype": doctype, "limit": limit, "cursor": cursor}
+		return cached_search(
+			"search_archived_documents",
+			arguments,
+			lambda: search_archived_documents(filters, False, doctype, limit, cursor)
 		)
+	
+	limit = get_page_size(limit)
+	after = decode_cursor(cursor)
+	profiler = SearchProfiler("search_archived_documents", get_profiler_mode(with_timings))
+	
+	try:
+		values = {}
+		with profiler.phase("build"):
+			branches = get_archive_search_branches(filters, doctype, values)
 		
-		outgoing = frappe.get_all(
-			"Outgoing Letter",
-			filters=base_filter,
-			fields=["name", "letter_number", "subject", "recipient", "archive_number",
-			        "archive_location", "archived_on", "archived_by"],
-			limit=100
-		)
+		results = []
+		if branches:
+			with profiler.phase("query"):
+				results = run_archive_search(branches, values, after, limit, profiler)
 		
-		# Add doctype to results
-		for doc in incoming:
-			doc['doctype'] = 'Incoming Letter'
+		# The extra row only tells whether another page exists
+		has_more = len(results) > limit
+		results = results[:limit]
 		
-		for doc in outgoing:
-			doc['doctype'] = 'Outgoing Letter'
+		next_cursor = None
+		if has_more:
+			next_cursor = encode_cursor([results[-1].archived_on, results[-1].doctype, results[-1].name])
 		
-		results = incoming + outgoing
+		for doc in results:
+			doc.pop("recipient" if doc.doctype == "Incoming Letter" else "sender", None)
 		
-		return {"success": True, "results": results, "count": len(results)}
+		return profiler.finish({
+			"success": True,
+			"results": results,
+			"count": len(results),
+			"has_more": has_more,
+			"next_cursor": next_cursor
+		})
 	
 	except Exception as e:
 		frappe.log_error(f"Search archived documents failed: {str(e)}")
 		return {"success": False, "error": str(e)}
+
+
+def get_archive_search_branches(filters, doctype, values):
+	"""
+	Per-doctype parts of an archived document search
+	
+	Args:
+		filters: Dict of filter key -> value (keys from ARCHIVE_SEARCH_FILTERS)
+		doctype: Optional doctype restriction
+		values: Dict of query parameters (updated in place)
+	
+	Returns:
+		List of branches (doctype, conditions, sort_value, prefix and, for
+		the archive tables the date filters can match, table)
+	"""
+	if doctype and doctype not in ARCHIVE_SEARCH_DOCTYPES:
+		frappe.throw(_("Cannot search archived documents of {0}").format(doctype))
+	
+	filters = dict(filters)
+	
+	# A date-only upper bound includes the whole day
+	to_date = filters.get("to_date")
+	if to_date and len(str(to_date)) == 10:
+		filters["to_date"] = f"{to_date} 23:59:59.999999"
+	
+	# Letters without an archive date cannot be placed on a page
+	conditions = ["`is_archived` = 1", "`archived_on` IS NOT NULL"]
+	conditions += build_sql_conditions(filters, ARCHIVE_SEARCH_FILTERS, values, "filter")
+	
+	branches = []
+	for dt in ARCHIVE_SEARCH_DOCTYPES:
+		if doctype and dt != doctype or not frappe.has_permission(dt, "read"):
+			continue
+		
+		# User permissions and permission query conditions, on the branch
+		# table; moved letters are read from their archive table, not their stub
+		dt_conditions = conditions + get_permission_conditions(dt) + [get_stub_condition(dt)]
+		
+		for table in [None, *get_archive_tables(dt, filters.get("from_date"), filters.get("to_date"))]:
+			branches.append({
+				"doctype": dt,
+				"table": table,
+				"conditions": [retarget_query(dt, condition, table) for condition in dt_conditions] if table else dt_conditions,
+				"sort_value": "`archived_on`",
+				"prefix": frappe.scrub(dt)
+			})
+	
+	return branches
+
+
+def run_archive_search(branches, values, after, limit, profiler):
+	"""
+	Fetch one page of archived documents as a single UNION ALL query
+	
+	Args:
+		branches: Branches from get_archive_search_branches
+		values: Dict of query parameters (updated in place)
+		after: Decoded cursor [archived_on, doctype, name] or None
+		limit: Page size
+		profiler: SearchProfiler timing the query
+	
+	Returns:
+		Up to limit+1 rows ordered by archived_on, doctype and name descending
+	"""
+	values["page_limit"] = limit + 1
+	parts = []
+	
+	for branch in branches:
+		dt = branch["doctype"]
+		conditions = list(branch["conditions"])
+		
+		if after:
+			conditions.append(get_cursor_condition(branch, after, values))
+		
+		parts.append(f"""(
+			SELECT
+				'{dt}' AS `doctype`, `name`, `letter_number`, `subject`,
+				{ARCHIVE_SEARCH_DOCTYPES[dt]}, `archive_number`,
+				`archive_location`, `archived_on`, `archived_by`
+			FROM {get_branch_table(branch)}
+			WHERE {' AND '.join(conditions)}
+			ORDER BY `archived_on` DESC, `name` DESC
+			LIMIT %(page_limit)s
+		)""")
+	
+	return profiler.sql("results", f"""
+		SELECT * FROM ({' UNION ALL '.join(parts)}) AS results
+		ORDER BY `archived_on` DESC, `doctype` DESC, `name` DESC
+		LIMIT %(page_limit)s
+	""", values)
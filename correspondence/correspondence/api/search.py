@@ -7,20 +7,188 @@ Search API Module
 Provides advanced search functionality for letters
 """
 
+import re
+
 import frappe
-from frappe.utils import cstr
+from frappe import _
+from frappe.utils import cint, cstr
+
+from correspondence.correspondence.utils.archive_tables import (
+	get_archive_tables,
+	get_letter_tables,
+	get_stub_condition,
+	get_stub_filters,
+	retarget_query,
+)
+from correspondence.correspondence.utils.pagination import (
+	decode_cursor,
+	encode_cursor,
+	estimate_count,
+	get_page_size,
+	keyset_condition,
+)
+from correspondence.correspondence.utils.query_builder import build_sql_conditions
+from correspondence.correspondence.utils.query_profiler import SearchProfiler, get_profiler_mode
+from correspondence.correspondence.utils.search_cache import cached_search, normalize_query
+from correspondence.correspondence.utils.search_index import is_search_index_enabled, search_letter_index
+from correspondence.correspondence.utils.search_suggestions import get_suggestions
+from correspondence.correspondence.utils.snippets import SNIPPET_LENGTH, build_match_pattern, get_snippet
+
+# FULLTEXT index name and columns per doctype (created by the
+# add_letter_fulltext_indexes patch)
+FULLTEXT_INDEXES = {
+	"Incoming Letter": ("letter_fulltext", ["subject", "sender", "summary", "ocr_text", "letter_number"]),
+	"Outgoing Letter": ("letter_fulltext", ["subject", "recipient", "body_text", "ocr_text", "letter_number"]),
+	"Internal Memo": ("letter_fulltext", ["subject", "content", "reference_number"]),
+	"Legacy Archive": ("letter_fulltext", ["subject", "summary", "keywords", "source", "destination", "legacy_reference_number"]),
+}
+
+# InnoDB ignores tokens shorter than innodb_ft_min_token_size (default 3)
+FULLTEXT_MIN_TOKEN_SIZE = 3
+
+# Characters with a special meaning in BOOLEAN MODE queries
+FULLTEXT_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+
+# Light column projection per doctype (no Long Text / Text Editor columns)
+RESULT_FIELDS = {
+	"Incoming Letter": ["name", "letter_number", "subject", "sender", "date_received", "status", "priority", "modified"],
+	"Outgoing Letter": ["name", "letter_number", "subject", "recipient", "date_created", "status", "priority", "modified"],
+}
+
+# Projection of advanced_search for other doctypes (the whole row, as before
+# the light projections)
+DEFAULT_RESULT_FIELDS = ["*"]
+
+# Doctypes searched by search_letters, mapped onto one common projection
+# (a missing column is returned as NULL)
+SEARCH_SOURCES = {
+	"Incoming Letter": {
+		"reference_number": "letter_number",
+		"subject": "subject",
+		"correspondent": "sender",
+		"document_date": "date_received",
+		"status": "status",
+		"priority": "priority",
+	},
+	"Outgoing Letter": {
+		"reference_number": "letter_number",
+		"subject": "subject",
+		"correspondent": "recipient",
+		"document_date": "date_created",
+		"status": "status",
+		"priority": "priority",
+	},
+	"Internal Memo": {
+		"reference_number": "reference_number",
+		"subject": "subject",
+		"correspondent": "sender",
+		"document_date": "date",
+		"status": "status",
+		"priority": "priority",
+	},
+	"Legacy Archive": {
+		"reference_number": "legacy_reference_number",
+		"subject": "subject",
+		"correspondent": "source",
+		"document_date": "date",
+	},
+}
+
+RESULT_COLUMNS = ["reference_number", "subject", "correspondent", "document_date", "status", "priority"]
+
+# Filters accepted by search_letters: key -> (column, operator)
+SEARCH_FILTERS = {
+	field: (field, "in" if field in ("status", "priority", "department") else "=")
+	for field in [
+		"status", "priority", "department", "recipient_department", "is_archived", "archive_location",
+		"assigned_to", "sender_key", "recipient_key", "owner", "docstatus",
+	]
+}
+
+# Facet name -> SQL expression per doctype (doctypes without the facet are
+# left out of its counts); topic facets join Letter Topic instead
+FACET_COLUMNS = {
+	"Incoming Letter": {
+		"status": "`status`",
+		"priority": "`priority`",
+		"department": "`department`",
+		"archive_year": "IF(`is_archived` = 1, YEAR(`archived_on`), NULL)",
+	},
+	"Outgoing Letter": {
+		"status": "`status`",
+		"priority": "`priority`",
+		"department": "`department`",
+		"archive_year": "IF(`is_archived` = 1, YEAR(`archived_on`), NULL)",
+	},
+	"Internal Memo": {
+		"status": "`status`",
+		"priority": "`priority`",
+		"department": "`recipient_department`",
+	},
+	"Legacy Archive": {
+		"archive_year": "YEAR(`date`)",
+	},
+}
+
+FACETS = ["status", "priority", "department", "archive_year", "topic"]
+
+# Doctypes tagged with topics (Letter Topic rows)
+TOPIC_DOCTYPES = ["Incoming Letter", "Outgoing Letter"]
+
+# Values returned per facet
+FACET_LIMIT = 50
+
+# Text columns snippets are cut from, in order of preference
+SNIPPET_FIELDS = {
+	"Incoming Letter": ["summary", "ocr_text"],
+	"Outgoing Letter": ["body_text", "ocr_text"],
+	"Internal Memo": ["content"],
+	"Legacy Archive": ["summary", "keywords"],
+}
+
+# Columns matched by the LIKE search
+SEARCH_FIELDS = {
+	"Incoming Letter": ["subject", "sender", "summary", "ocr_text", "letter_number"],
+	"Outgoing Letter": ["subject", "recipient", "body_text", "ocr_text", "letter_number"],
+	"Internal Memo": ["subject", "content", "reference_number"],
+	"Legacy Archive": ["subject", "summary", "keywords", "source", "destination", "legacy_reference_number"],
+}
 
 
 @frappe.whitelist()
-def search_letters(query, filters=None, doctype=None, limit=50):
+def search_letters(query, filters=None, doctype=None, limit=50, mode="auto", cursor=None, with_count=None,
+		with_snippets=True, snippet_length=SNIPPET_LENGTH, with_facets=None, use_cache=True, with_timings=None):
 	"""
-	Full-text search across letters
+	Full-text search across letters, memos and legacy archive records
+	
+	All doctypes are searched in one UNION ALL query over a common
+	projection, so a page is the global top-N ordered by relevance (or by
+	modified for LIKE searches), then doctype and name. Pass the returned
+	`next_cursor` to get the following page.
 	
 	Args:
 		query: Search query string
-		filters: Additional filters (JSON string or dict)
-		doctype: Specific doctype to search (Incoming Letter / Outgoing Letter)
-		limit: Maximum results
+		filters: Additional filters (JSON string or dict) on SEARCH_FILTERS
+			fields; a list value matches any of its items and a doctype
+			without a filtered field is left out of the search
+		doctype: Doctype (or JSON list of doctypes) to search, default all
+		limit: Maximum results per page
+		mode: "index" (app-level Arabic-aware index, supports OR and
+			"phrases"), "fulltext" (FULLTEXT index, relevance ordered), "like"
+			or "auto" (index when enabled, else fulltext when available)
+		cursor: Cursor returned by the previous page
+		with_count: "estimate" (from the query plan) or "exact" to include totals
+		with_snippets: Add a highlighted `snippet` of the body/OCR text to each result
+		snippet_length: Maximum snippet length in characters
+		with_facets: 1 for all facets or a (JSON) list of status, priority,
+			department, archive_year and topic; counts cover all matches
+			(in index mode, the ranked candidates)
+		use_cache: Serve repeated searches from the per-user result cache
+		with_timings: 1 to return (and log) a timing breakdown per phase and
+			query, "analyze" to add per-doctype rows read from ANALYZE (runs
+			the queries twice); bypasses the cache. System Manager only,
+			ignored for other users
 	
 	Returns:
 		Search results
@@ -33,61 +201,627 @@ def search_letters(query, filters=None, doctype=None, limit=50):
 	if not filters:
 		filters = {}
 	
-	# Determine which doctypes to search
-	doctypes_to_search = []
-	if doctype:
-		doctypes_to_search = [doctype]
-	else:
-		doctypes_to_search = ["Incoming Letter", "Outgoing Letter"]
+	if cint(use_cache) and not get_profiler_mode(with_timings):
+		arguments = {
+			"query": normalize_query(query), "filters": filters, "doctype": doctype, "limit": limit,
+			"mode": mode, "cursor": cursor, "with_count": with_count, "with_snippets": with_snippets,
+			"snippet_length": snippet_length, "with_facets": with_facets
+		}
+		return cached_search("search_letters", arguments, lambda: search_letters(
+			query, filters, doctype, limit, mode, cursor, with_count,
+			with_snippets, snippet_length, with_facets, use_cache=False
+		))
 	
-	results = []
+	limit = get_page_size(limit)
+	after = decode_cursor(cursor)
+	profiler = SearchProfiler("search_letters", get_profiler_mode(with_timings))
 	
-	for dt in doctypes_to_search:
-		try:
-			# Build search conditions
-			conditions = build_search_conditions(query, dt)
-			
-			# Add user filters
-			for key, value in filters.items():
-				if key and value:
-					conditions.append(f"`{key}` = '{frappe.db.escape(cstr(value))}'")
-			
-			# Build query
-			if dt == "Incoming Letter":
-				fields = ["name", "letter_number", "subject", "sender", "date_received", "status", "priority"]
+	try:
+		values = {}
+		with profiler.phase("build"):
+			branches = get_search_branches(query, filters, get_search_doctypes(doctype), mode, values)
+		
+		if not branches:
+			return profiler.finish({"success": True, "results": [], "count": 0, "has_more": False, "next_cursor": None})
+		
+		search_mode = branches[0]["mode"]
+		
+		with profiler.phase("query"):
+			if search_mode == "index":
+				results = run_index_search(query, branches, values, after, limit, profiler)
 			else:
-				fields = ["name", "letter_number", "subject", "recipient", "date_created", "status", "priority"]
-			
-			where_clause = " AND ".join(conditions) if conditions else "1=1"
-			
-			sql = f"""
-				SELECT {', '.join([f'`{f}`' for f in fields])}
-				FROM `tab{dt}`
-				WHERE {where_clause}
-				ORDER BY modified DESC
-				LIMIT {int(limit)}
-			"""
-			
-			docs = frappe.db.sql(sql, as_dict=True)
+				results = run_union_search(branches, values, after, limit, profiler)
+		
+		# The extra row only tells whether another page exists
+		has_more = len(results) > limit
+		results = results[:limit]
+		
+		for doc in results:
+			if search_mode != "like":
+				doc["relevance"] = doc.sort_value
+		
+		response = {
+			"success": True,
+			"results": results,
+			"count": len(results),
+			"mode": search_mode,
+			"has_more": has_more,
+			"next_cursor": encode_cursor(
+				[results[-1].sort_value, results[-1].doctype, results[-1].name]
+			) if has_more else None
+		}
+		
+		for doc in results:
+			doc.pop("sort_value", None)
+		
+		if cint(with_snippets) and results:
+			with profiler.phase("snippets"):
+				add_snippets(results, query, get_page_size(snippet_length, default=SNIPPET_LENGTH, maximum=1000))
+		
+		if with_count and not after:
+			with profiler.phase("count"):
+				totals = {}
+				for branch in branches:
+					dt = branch["doctype"]
+					count_sql = f"SELECT `name` FROM {get_branch_table(branch)} WHERE {' AND '.join(branch['conditions'])}"
+					if with_count == "exact":
+						count = profiler.sql(
+							f"count {branch.get('table') or dt}", f"SELECT COUNT(*) FROM ({count_sql}) AS matches",
+							values, as_dict=False
+						)[0][0]
+					else:
+						count = estimate_count(count_sql, values)
+					totals[dt] = totals.get(dt, 0) + count
 			
-			# Add doctype to results
-			for doc in docs:
-				doc['doctype'] = dt
-				results.append(doc)
+			response["total"] = totals
+			response["total_count"] = sum(totals.values())
+			response["total_is_estimate"] = with_count != "exact"
+		
+		if with_facets and not after:
+			with profiler.phase("facets"):
+				response["facets"] = get_search_facets(branches, values, get_facet_names(with_facets), profiler)
+		
+		return profiler.finish(response)
+	
+	except Exception as e:
+		frappe.log_error(f"Search failed: {str(e)}")
+		return {"success": False, "error": str(e)}
+
+
+def get_search_doctypes(doctype=None):
+	"""
+	Resolve the doctypes to search, keeping those the user may read
+	
+	Args:
+		doctype: Doctype name, list or JSON list (default all searchable)
+	
+	Returns:
+		List of doctypes
+	"""
+	import json
+	
+	if isinstance(doctype, str) and doctype.startswith("["):
+		doctype = json.loads(doctype)
+	
+	if not doctype:
+		doctypes = list(SEARCH_SOURCES)
+	elif isinstance(doctype, str):
+		doctypes = [doctype]
+	else:
+		doctypes = list(doctype)
+	
+	for dt in doctypes:
+		if dt not in SEARCH_SOURCES:
+			frappe.throw(_("Invalid doctype: {0}").format(dt))
+	
+	return [dt for dt in doctypes if frappe.has_permission(dt, "read")]
+
+
+def get_search_branches(query, filters, doctypes, mode, values):
+	"""
+	Build the WHERE conditions of each doctype taking part in a search
+	
+	Args:
+		query: Search query
+		filters: User filters
+		doctypes: Doctypes to search
+		mode: Requested search mode
+		values: Dict of query parameters (updated in place)
+	
+	Returns:
+		List of dicts with doctype, mode, conditions and sort_value (the
+		ranking expression)
+	"""
+	search_mode = get_search_mode(query, doctypes, mode)
+	branches = []
+	
+	for dt in doctypes:
+		prefix = frappe.scrub(dt)
+		filter_conditions = build_filter_conditions(dt, filters, values, prefix)
+		
+		# The doctype has no column for one of the filters
+		if filter_conditions is None:
+			continue
+		
+		if search_mode == "index":
+			conditions = [f"`name` IN %({prefix}_index_names)s"]
+			sort_value = "0"
+		elif search_mode == "fulltext":
+			sort_value = build_fulltext_match(query, dt, values)
+			conditions = [sort_value]
+		else:
+			conditions = build_search_conditions(query, dt, values)
+			sort_value = "`modified`"
+		
+		branches.append({
+			"doctype": dt,
+			"mode": search_mode,
+			"conditions": (conditions + filter_conditions + get_permission_conditions(dt)) or ["1=1"],
+			"sort_value": sort_value,
+			"prefix": prefix
+		})
+	
+	return add_archive_branches(branches, filters)
+
+
+def add_archive_branches(branches, filters):
+	"""
+	Add a branch per archive table of the letter doctypes (see
+	utils.archive_tables), sharing the conditions and parameters of the
+	doctype's branch
+	
+	Args:
+		branches: Branches over the main tables
+		filters: User filters
+	
+	Returns:
+		List of branches
+	"""
+	# Only archived letters are moved
+	if str(filters.get("is_archived")) == "0":
+		return branches
+	
+	main_branches = []
+	archive_branches = []
+	for branch in branches:
+		dt = branch["doctype"]
+		tables = get_archive_tables(dt)
+		
+		# Moved letters are read from their archive table, not their stub
+		if tables:
+			branch = {**branch, "conditions": branch["conditions"] + [get_stub_condition(dt)]}
+		main_branches.append(branch)
+		
+		for table in tables:
+			# Permission conditions name the doctype table
+			conditions = [retarget_query(dt, condition, table) for condition in branch["conditions"]]
+			archive_branches.append({**branch, "table": table, "conditions": conditions})
+	
+	return main_branches + archive_branches
+
+
+def get_permission_conditions(doctype, user=None):
+	"""
+	Conditions restricting a branch to the documents the session user may
+	read (user permissions, shares and permission query conditions, as
+	applied by frappe.get_list)
+	
+	Args:
+		doctype: Document type
+		user: User (default current user)
+	
+	Returns:
+		List with the SQL condition on `tab<doctype>`, empty if the user may
+		read every document
+	"""
+	from frappe.model.db_query import DatabaseQuery
+	
+	condition = DatabaseQuery(doctype, user=user).build_match_conditions()
+	
+	# The search queries are run with parameters
+	return [f"({condition.replace('%', '%%')})"] if condition else []
+
+
+def get_branch_table(branch):
+	"""
+	Returns:
+		Quoted table a branch reads (the doctype table unless the branch
+		covers an archive table)
+	"""
+	return f"`{branch.get('table') or 'tab' + branch['doctype']}`"
+
+
+def build_filter_conditions(doctype, filters, values, prefix):
+	"""
+	Build parameterized conditions for user filters
+	
+	Args:
+		doctype: Document type
+		filters: Dict of field -> value (only SEARCH_FILTERS keys)
+		values: Dict of query parameters (updated in place)
+		prefix: Parameter name prefix
+	
+	Returns:
+		List of SQL conditions, or None if the doctype lacks a filtered field
+	"""
+	from frappe.model import default_fields
+	
+	columns = {field.fieldname for field in frappe.get_meta(doctype).fields} | set(default_fields)
+	return build_sql_conditions(filters, SEARCH_FILTERS, values, f"{prefix}_filter", columns)
+
+
+def get_result_projection(doctype, sort_value):
+	"""
+	Select list mapping a doctype onto the common result columns
+	
+	Args:
+		doctype: Document type
+		sort_value: Ranking expression
+	
+	Returns:
+		SQL select list
+	"""
+	source = SEARCH_SOURCES[doctype]
+	columns = ["`name`", f"'{doctype}' AS `doctype`"]
+	
+	for column in RESULT_COLUMNS:
+		field = source.get(column)
+		columns.append(f"`{field}` AS `{column}`" if field else f"NULL AS `{column}`")
+	
+	columns += ["`modified`", f"{sort_value} AS `sort_value`"]
+	return ", ".join(columns)
+
+
+def run_union_search(branches, values, after, limit, profiler=None):
+	"""
+	Fetch one page as a single UNION ALL query
+	
+	Every branch returns its own top limit+1 rows after the cursor (an
+	index range scan on the sort key), and the outer query merges them into
+	the global order.
+	
+	Args:
+		branches: Branches from get_search_branches (an optional `join`
+			clause, a callable taking the quoted table, is added after the
+			FROM table)
+		values: Dict of query parameters (updated in place)
+		after: Decoded cursor [sort_value, doctype, name] or None
+		limit: Page size
+		profiler: SearchProfiler timing the query
+	
+	Returns:
+		Up to limit+1 rows in global order
+	"""
+	profiler = profiler or SearchProfiler("search")
+	values["page_limit"] = limit + 1
+	parts = []
+	
+	for branch in branches:
+		dt = branch["doctype"]
+		conditions = list(branch["conditions"])
+		
+		if after:
+			conditions.append(get_cursor_condition(branch, after, values))
+		
+		table = get_branch_table(branch)
+		join = branch["join"](table) if branch.get("join") else ""
+		
+		parts.append(f"""(
+			SELECT {get_result_projection(dt, branch['sort_value'])}
+			FROM {table}{join}
+			WHERE {' AND '.join(conditions)}
+			ORDER BY `sort_value` DESC, `name` DESC
+			LIMIT %(page_limit)s
+		)""")
+	
+	return profiler.sql("results", f"""
+		SELECT * FROM ({' UNION ALL '.join(parts)}) AS results
+		ORDER BY `sort_value` DESC, `doctype` DESC, `name` DESC
+		LIMIT %(page_limit)s
+	""", values)
+
+
+def get_cursor_condition(branch, after, values):
+	"""
+	Condition selecting the rows of a branch that follow the cursor
+	
+	The global order is (sort_value, doctype, name) descending. Inside a
+	branch the doctype is constant, so the condition reduces to a range on
+	the branch's own sort key.
+	
+	Args:
+		branch: Branch from get_search_branches
+		after: Decoded cursor [sort_value, doctype, name]
+		values: Dict of query parameters (updated in place)
+	
+	Returns:
+		SQL condition
+	"""
+	after_value, after_doctype, after_name = after
+	prefix = f"{branch['prefix']}_cursor"
+	
+	if branch["doctype"] == after_doctype:
+		return keyset_condition([branch["sort_value"], "`name`"], [after_value, after_name], values, prefix=prefix)
+	
+	values[prefix] = after_value
+	operator = "<" if branch["doctype"] > after_doctype else "<="
+	return f"{branch['sort_value']} {operator} %({prefix})s"
+
+
+def run_index_search(query, branches, values, after, limit, profiler=None):
+	"""
+	Fetch one page ranked by the app-level search index
+	
+	The index ranks candidates across all doctypes; the database only
+	applies filters and returns the list columns.
+	
+	Args:
+		query: Search query
+		branches: Branches from get_search_branches
+		values: Dict of query parameters (updated in place)
+		after: Decoded cursor [score, doctype, name] or None
+		limit: Page size
+		profiler: SearchProfiler timing the query
+	
+	Returns:
+		Up to limit+1 rows in global order
+	"""
+	profiler = profiler or SearchProfiler("search")
+	doctypes = [branch["doctype"] for branch in branches]
+	
+	with profiler.phase("index lookup"):
+		ranked = search_letter_index(query, doctypes=doctypes, limit=max(limit * 20, 1000))
+	scores = {(hit["doctype"], hit["name"]): hit["score"] for hit in ranked}
+	
+	candidates = sorted(((score, dt, name) for (dt, name), score in scores.items()), reverse=True)
+	if after:
+		candidates = [row for row in candidates if row < tuple(after)]
+	
+	parts = []
+	for branch in branches:
+		names = tuple(name for score, dt, name in candidates if dt == branch["doctype"])
+		
+		# Counts and facets reuse the branch conditions, so always bind the
+		# parameter ('' matches no document)
+		values[f"{branch['prefix']}_index_names"] = names or ("",)
+		if not names:
+			continue
+		
+		parts.append(f"""
+			SELECT {get_result_projection(branch['doctype'], branch['sort_value'])}
+			FROM {get_branch_table(branch)}
+			WHERE {' AND '.join(branch['conditions'])}
+		""")
+	
+	if not parts:
+		return []
+	
+	rows = profiler.sql("results", " UNION ALL ".join(parts), values)
+	for row in rows:
+		row.sort_value = scores[(row.doctype, row.name)]
+	
+	rows.sort(key=lambda row: (row.sort_value, row.doctype, row.name), reverse=True)
+	return rows[:limit + 1]
+
+
+def add_snippets(results, query, length):
+	"""
+	Add a highlighted `snippet` to each search result
+	
+	Only the text columns of the returned page are read, one query per
+	doctype, so list views never need the full letter preview.
+	
+	Args:
+		results: Result rows (updated in place)
+		query: Search query
+		length: Maximum snippet length
+	"""
+	pattern = build_match_pattern(query or "")
+	by_doctype = {}
+	for doc in results:
+		by_doctype.setdefault(doc.doctype, []).append(doc)
+	
+	for dt, docs in by_doctype.items():
+		texts = {
+			row.name: row for row in frappe.get_all(
+				dt,
+				filters=[["name", "in", [doc.name for doc in docs]], *get_stub_filters(dt)],
+				fields=["name", *SNIPPET_FIELDS[dt]]
+			)
+		}
+		
+		# Letters moved to archive tables
+		missing = tuple(doc.name for doc in docs if doc.name not in texts)
+		for table in get_archive_tables(dt) if missing else []:
+			columns = ", ".join(f"`{field}`" for field in ["name", *SNIPPET_FIELDS[dt]])
+			for row in frappe.db.sql(f"SELECT {columns} FROM `{table}` WHERE `name` IN %(names)s", {"names": missing}, as_dict=True):
+				texts[row.name] = row
 		
-		except Exception as e:
-			frappe.log_error(f"Search failed for {dt}: {str(e)}")
+		for doc in docs:
+			doc["snippet"] = get_snippet(texts.get(doc.name, {}), SNIPPET_FIELDS[dt], pattern, length)
+
+
+def get_facet_names(with_facets):
+	"""
+	Resolve the requested facets
+	
+	Args:
+		with_facets: Truthy for all facets, or a (JSON) list of facet names
+	
+	Returns:
+		List of facet names
+	"""
+	import json
+	
+	if isinstance(with_facets, str) and with_facets.startswith("["):
+		with_facets = json.loads(with_facets)
+	
+	if not isinstance(with_facets, (list, tuple)):
+		return list(FACETS)
+	
+	for facet in with_facets:
+		if facet not in FACETS:
+			frappe.throw(_("Invalid facet: {0}").format(facet))
+	
+	return list(with_facets)
+
+
+def get_search_facets(branches, values, facets, profiler=None):
+	"""
+	Count the matching documents per facet value in a single statement
+	
+	Each facet/doctype pair is one grouped aggregation over the search
+	conditions; the outer query adds up the doctypes.
+	
+	Args:
+		branches: Branches from get_search_branches
+		values: Query parameters of the branches
+		facets: Facet names
+		profiler: SearchProfiler timing the query
+	
+	Returns:
+		Dict of facet -> list of {"value", "count"}, most frequent first
+	"""
+	profiler = profiler or SearchProfiler("search")
+	parts = []
+	
+	for branch in branches:
+		dt = branch["doctype"]
+		where = " AND ".join(branch["conditions"])
+		
+		for facet in facets:
+			if facet == "topic" and dt in TOPIC_DOCTYPES:
+				parts.append(f"""
+					SELECT 'topic' AS facet, lt.`topic` AS value, COUNT(DISTINCT lt.`parent`) AS count
+					FROM `tabLetter Topic` lt
+					JOIN (SELECT `name` FROM {get_branch_table(branch)} WHERE {where}) AS matches ON matches.`name` = lt.`parent`
+					WHERE lt.`parenttype` = '{dt}'
+					GROUP BY lt.`topic`
+				""")
+			elif facet in FACET_COLUMNS[dt]:
+				column = FACET_COLUMNS[dt][facet]
+				parts.append(f"""
+					SELECT '{facet}' AS facet, {column} AS value, COUNT(*) AS count
+					FROM {get_branch_table(branch)}
+					WHERE {where}
+					GROUP BY {column}
+				""")
+	
+	result = {facet: [] for facet in facets}
+	if not parts:
+		return result
+	
+	rows = profiler.sql("facets", f"""
+		SELECT facet, value, SUM(count) AS count
+		FROM ({' UNION ALL '.join(parts)}) AS facet_counts
+		WHERE IFNULL(value, '') != ''
+		GROUP BY facet, value
+		ORDER BY facet, count DESC, value
+	""", values)
+	
+	for row in rows:
+		if len(result[row.facet]) < FACET_LIMIT:
+			result[row.facet].append({"value": cstr(row.value), "count": cint(row.count)})
+	
+	return result
+
+
+def get_search_mode(query, doctypes, mode="auto"):
+	"""
+	Decide how a search is executed
+	
+	One mode is used for all doctypes so their ranking values compare.
+	
+	Args:
+		query: Search query
+		doctypes: Document types searched
+		mode: Requested mode ("auto", "index", "fulltext" or "like")
+	
+	Returns:
+		"index", "fulltext" or "like"
+	"""
+	if mode == "like" or not query or not query.strip():
+		return "like"
+	
+	if mode == "index" or (mode == "auto" and is_search_index_enabled()):
+		return "index"
+	
+	if not all(has_fulltext_index(dt) for dt in doctypes):
+		return "like"
+	
+	# Tokens below the minimum size are not indexed; LIKE still finds them
+	if not get_fulltext_terms(query):
+		return "like"
+	
+	return "fulltext"
+
+
+def has_fulltext_index(doctype):
+	"""
+	Check (and cache) whether the FULLTEXT index exists for a doctype
+	
+	Args:
+		doctype: Document type
+	
+	Returns:
+		True if the index is available
+	"""
+	if doctype not in FULLTEXT_INDEXES:
+		return False
+	
+	def _check():
+		index_name, columns = FULLTEXT_INDEXES[doctype]
+		return bool(frappe.db.sql(f"""
+			SHOW INDEX FROM `tab{doctype}`
+			WHERE Key_name = %s AND Index_type = 'FULLTEXT'
+		""", index_name))
+	
+	return frappe.cache().hget("letter_fulltext_index", doctype, generator=_check)
+
+
+def get_fulltext_terms(query):
+	"""
+	Split a query into terms usable in a FULLTEXT BOOLEAN MODE search
+	
+	Args:
+		query: Search query
+	
+	Returns:
+		List of sanitized terms
+	"""
+	terms = FULLTEXT_OPERATORS.sub(" ", query).split()
+	return [term for term in terms if len(term) >= FULLTEXT_MIN_TOKEN_SIZE]
+
+
+def build_fulltext_match(query, doctype, values):
+	"""
+	Build the MATCH ... AGAINST expression for a doctype
+	
+	Every term is required and matched as a prefix, so results behave like
+	the LIKE search but come back ordered by relevance.
+	
+	Args:
+		query: Search query
+		doctype: Document type
+		values: Dict of query parameters (updated in place)
+	
+	Returns:
+		SQL expression (usable both as condition and as relevance score)
+	"""
+	index_name, columns = FULLTEXT_INDEXES[doctype]
+	values["fulltext_query"] = " ".join(f"+{term}*" for term in get_fulltext_terms(query))
 	
-	return {"success": True, "results": results, "count": len(results)}
+	return f"MATCH({', '.join(f'`{c}`' for c in columns)}) AGAINST (%(fulltext_query)s IN BOOLEAN MODE)"
 
 
-def build_search_conditions(query, doctype):
+def build_search_conditions(query, doctype, values=None):
 	"""
 	Build search conditions for SQL query
 	
 	Args:
 		query: Search query
 		doctype: Document type
+		values: Dict of query parameters (updated in place)
 	
 	Returns:
 		List of SQL conditions
@@ -95,43 +829,38 @@ def build_search_conditions(query, doctype):
 	if not query or not query.strip():
 		return []
 	
-	query = frappe.db.escape(query)
+	if values is None:
+		values = {}
+	
+	values["like_query"] = f"%{query.strip()}%"
 	conditions = []
 	
 	# Search in multiple fields
-	search_fields = []
-	
-	if doctype == "Incoming Letter":
-		search_fields = [
-			f"`subject` LIKE '%{query}%'",
-			f"`sender` LIKE '%{query}%'",
-			f"`summary` LIKE '%{query}%'",
-			f"`ocr_text` LIKE '%{query}%'",
-			f"`letter_number` LIKE '%{query}%'"
-		]
-	else:  # Outgoing Letter
-		search_fields = [
-			f"`subject` LIKE '%{query}%'",
-			f"`recipient` LIKE '%{query}%'",
-			f"`body_text` LIKE '%{query}%'",
-			f"`ocr_text` LIKE '%{query}%'",
-			f"`letter_number` LIKE '%{query}%'"
-		]
+	search_fields = SEARCH_FIELDS[doctype]
 	
 	# Combine with OR
 	if search_fields:
-		conditions.append(f"({' OR '.join(search_fields)})")
+		conditions.append(f"({' OR '.join(f'`{field}` LIKE %(like_query)s' for field in search_fields)})")
 	
 	return conditions
 
 
+# Columns advanced_search may sort on (name is always the tie-breaker)
+SORTABLE_FIELDS = ["modified", "creation", "date_received", "date_created", "letter_number", "priority", "status"]
+
+
 @frappe.whitelist()
-def advanced_search(filters):
+def advanced_search(filters, use_cache=True, with_timings=None):
 	"""
 	Advanced search with multiple filters
 	
 	Args:
-		filters: Dictionary of filters (JSON string or dict)
+		filters: Dictionary of filters (JSON string or dict). Besides the
+			field filters it accepts `limit`, `order_by` ("<field> asc|desc"),
+			`cursor` (from the previous page), `with_count`
+			("estimate" or "exact") and `with_facets` (see search_letters)
+		use_cache: Serve repeated searches from the per-user result cache
+		with_timings: Return a timing breakdown (see search_letters)
 	
 	Returns:
 		Search results
@@ -141,6 +870,11 @@ def advanced_search(filters):
 	if isinstance(filters, str):
 		filters = json.loads(filters)
 	
+	if cint(use_cache) and not get_profiler_mode(with_timings):
+		return cached_search("advanced_search", filters, lambda: advanced_search(filters, use_cache=False))
+	
+	profiler = SearchProfiler("advanced_search", get_profiler_mode(with_timings))
+	
 	try:
 		doctype = filters.get('doctype', 'Incoming Letter')
 		
@@ -156,87 +890,317 @@ def advanced_search(filters):
 		if filters.get('priority'):
 			frappe_filters['priority'] = filters['priority']
 		
+		date_field = 'date_received' if doctype == 'Incoming Letter' else 'date_created'
+		tables = get_letter_tables(doctype)
+		
 		if filters.get('date_from') and filters.get('date_to'):
-			date_field = 'date_received' if doctype == 'Incoming Letter' else 'date_created'
 			frappe_filters[date_field] = ['between', [filters['date_from'], filters['date_to']]]
+			tables = get_letter_tables(doctype, filters['date_from'], filters['date_to'], date_field)
 		
 		if filters.get('is_archived') is not None:
 			frappe_filters['is_archived'] = filters['is_archived']
+			
+			# Only archived letters are moved to archive tables
+			if not cint(filters['is_archived']):
+				tables = tables[:1]
+		
+		# Moved letters are read from their archive table, not their stub
+		if len(tables) > 1:
+			frappe_filters['archive_table'] = ['is', 'not set']
+		
+		limit = get_page_size(filters.get('limit'), default=100)
+		sort_field, sort_order = parse_order_by(doctype, filters.get('order_by'))
+		fields = RESULT_FIELDS.get(doctype, DEFAULT_RESULT_FIELDS)
+		if "*" not in fields and sort_field not in fields:
+			fields = [*fields, sort_field]
+		
+		# Keyset pagination: continue strictly after the last row of the
+		# previous page instead of using an OFFSET
+		page_filters = [[doctype, key, *(value if isinstance(value, list) else ["=", value])] for key, value in frappe_filters.items()]
+		or_filters = None
+		after = decode_cursor(filters.get('cursor'))
+		if after:
+			operator = "<" if sort_order == "desc" else ">"
+			page_filters.append([doctype, sort_field, operator + "=", after[0]])
+			or_filters = [
+				[doctype, sort_field, operator, after[0]],
+				[doctype, "name", operator, after[1]],
+			]
 		
 		# Get results
-		results = frappe.get_all(
-			doctype,
-			filters=frappe_filters,
-			fields=['*'],
-			limit=filters.get('limit', 100),
-			order_by=filters.get('order_by', 'modified desc')
-		)
+		with profiler.phase("query"):
+			order_by = f"`{sort_field}` {sort_order}, `name` {sort_order}"
+			query = frappe.get_all(
+				doctype,
+				filters=page_filters,
+				or_filters=or_filters,
+				fields=fields,
+				limit=limit + 1,
+				order_by=order_by,
+				run=0
+			)
+			
+			if len(tables) > 1:
+				query = f"""
+					SELECT * FROM ({union_letter_tables(doctype, query, tables)}) AS results
+					ORDER BY {order_by}
+					LIMIT {limit + 1}
+				"""
+			
+			results = profiler.sql("results", query)
 		
-		return {"success": True, "results": results, "count": len(results)}
+		# The extra row only tells whether another page exists
+		has_more = len(results) > limit
+		results = results[:limit]
+		
+		response = {
+			"success": True,
+			"results": results,
+			"count": len(results),
+			"has_more": has_more,
+			"next_cursor": encode_cursor([results[-1][sort_field], results[-1].name]) if has_more else None
+		}
+		
+		if filters.get('with_count') and not after:
+			with profiler.phase("count"):
+				if filters['with_count'] == "exact" and len(tables) == 1:
+					response["total_count"] = frappe.db.count(doctype, filters=frappe_filters)
+				else:
+					count_sql = frappe.get_all(doctype, filters=frappe_filters, fields=["name"], run=0)
+					response["total_count"] = 0
+					
+					for table in tables:
+						table_sql = retarget_query(doctype, count_sql, table)
+						if filters['with_count'] == "exact":
+							response["total_count"] += profiler.sql(
+								f"count {table}", f"SELECT COUNT(*) FROM ({table_sql}) AS matches", as_dict=False
+							)[0][0]
+						else:
+							response["total_count"] += estimate_count(table_sql)
+			response["total_is_estimate"] = filters['with_count'] != "exact"
+		
+		if filters.get('with_facets') and not after:
+			with profiler.phase("facets"):
+				response["facets"] = get_filter_facets(
+					doctype, frappe_filters, get_facet_names(filters['with_facets']), tables
+				)
+		
+		return profiler.finish(response)
 	
 	except Exception as e:
 		frappe.log_error(f"Advanced search failed: {str(e)}")
 		return {"success": False, "error": str(e)}
 
 
+def union_letter_tables(doctype, query, tables):
+	"""
+	Run a statement written for the main letter table over several letter
+	tables (see utils.archive_tables.get_letter_tables)
+	
+	Returns:
+		UNION ALL of the statement retargeted at each table
+	"""
+	return " UNION ALL ".join(f"({retarget_query(doctype, query, table)})" for table in tables)
+
+
+def get_filter_facets(doctype, frappe_filters, facets, tables=None):
+	"""
+	Count the documents matching advanced_search filters per facet value
+	
+	Args:
+		doctype: Document type
+		frappe_filters: Filters as passed to frappe.get_all
+		facets: Facet names
+		tables: Letter tables to count in (default the doctype table)
+	
+	Returns:
+		Dict of facet -> list of {"value", "count"}, most frequent first
+	"""
+	result = {}
+	
+	for facet in facets:
+		facet_filters = dict(frappe_filters)
+		
+		if facet == "topic":
+			column = "`tabLetter Topic`.`topic`"
+			count = f"count(distinct `tab{doctype}`.`name`)"
+		elif facet == "archive_year":
+			column = "year(`archived_on`)"
+			count = "count(*)"
+			facet_filters["is_archived"] = 1
+		else:
+			column = FACET_COLUMNS[doctype][facet]
+			count = "count(*)"
+		
+		if tables and len(tables) > 1:
+			query = frappe.get_all(
+				doctype,
+				filters=facet_filters,
+				fields=[f"{column} as value", f"{count} as count"],
+				group_by=column,
+				order_by="count desc",
+				run=0
+			)
+			rows = frappe.db.sql(f"""
+				SELECT value, SUM(count) AS count
+				FROM ({union_letter_tables(doctype, query, tables)}) AS facet_counts
+				GROUP BY value
+				ORDER BY count DESC
+				LIMIT {FACET_LIMIT}
+			""", as_dict=True)
+		else:
+			rows = frappe.get_all(
+				doctype,
+				filters=facet_filters,
+				fields=[f"{column} as value", f"{count} as count"],
+				group_by=column,
+				order_by="count desc",
+				limit=FACET_LIMIT
+			)
+		
+		result[facet] = [
+			{"value": cstr(row.value), "count": cint(row.count)}
+			for row in rows if cstr(row.value)
+		]
+	
+	return result
+
+
+def parse_order_by(doctype, order_by):
+	"""
+	Validate an "<field> asc|desc" sort specification
+	
+	Args:
+		doctype: Doctype being sorted
+		order_by: Requested sort (defaults to "modified desc")
+	
+	Returns:
+		Tuple of (field, "asc" or "desc")
+	"""
+	parts = (order_by or "modified desc").replace("`", "").split()
+	sort_field = parts[0] if parts else "modified"
+	sort_order = parts[1].lower() if len(parts) > 1 else "desc"
+	
+	valid_field = sort_field in ("modified", "creation") or frappe.get_meta(doctype).has_field(sort_field)
+	
+	if sort_field not in SORTABLE_FIELDS or not valid_field or sort_order not in ("asc", "desc"):
+		frappe.throw(_("Invalid sort order: {0}").format(order_by))
+	
+	return sort_field, sort_order
+
+
 @frappe.whitelist()
-def search_by_topic(topic_name, limit=50):
+def search_by_topic(topic_name, limit=50, include_subtopics=False, doctype=None, cursor=None, with_timings=None):
 	"""
 	Search letters by topic
 	
+	Letters are found through their Letter Topic rows (joined on the
+	(topic, parenttype, parent) index) and returned newest first across both
+	letter doctypes, one page at a time.
+	
 	Args:
 		topic_name: Topic name
-		limit: Maximum results
+		limit: Maximum results per page
+		include_subtopics: Also match letters tagged with any subtopic
+		doctype: Restrict to Incoming Letter or Outgoing Letter
+		cursor: Cursor returned by the previous page
+		with_timings: Return a timing breakdown (see search_letters)
 	
 	Returns:
 		Letters with this topic
 	"""
+	profiler = SearchProfiler("search_by_topic", get_profiler_mode(with_timings))
+	
 	try:
-		# Search in both incoming and outgoing letters
-		results = []
-		
-		# Incoming letters
-		incoming = frappe.db.sql("""
-			SELECT DISTINCT il.name, il.letter_number, il.subject, il.sender, 
-			       il.date_received, il.status, 'Incoming Letter' as doctype
-			FROM `tabIncoming Letter` il
-			WHERE il.name IN (
-				SELECT parent FROM `tabTopic Link`
-				WHERE topic = %s AND parenttype = 'Incoming Letter'
-			)
-			ORDER BY il.modified DESC
-			LIMIT %s
-		""", (topic_name, int(limit)), as_dict=True)
-		
-		results.extend(incoming)
-		
-		# Outgoing letters
-		outgoing = frappe.db.sql("""
-			SELECT DISTINCT ol.name, ol.letter_number, ol.subject, ol.recipient,
-			       ol.date_created, ol.status, 'Outgoing Letter' as doctype
-			FROM `tabOutgoing Letter` ol
-			WHERE ol.name IN (
-				SELECT parent FROM `tabTopic Link`
-				WHERE topic = %s AND parenttype = 'Outgoing Letter'
-			)
-			ORDER BY ol.modified DESC
-			LIMIT %s
-		""", (topic_name, int(limit)), as_dict=True)
+		limit = get_page_size(limit)
+		after = decode_cursor(cursor)
+		
+		with profiler.phase("build"):
+			topics = get_topic_tree(topic_name) if cint(include_subtopics) else [topic_name]
+		values = {"topics": tuple(topics)}
+		branches = []
+		
+		for dt in TOPIC_DOCTYPES:
+			if doctype and dt != doctype or not frappe.has_permission(dt, "read"):
+				continue
+			
+			branches.append({
+				"doctype": dt,
+				"mode": "like",
+				"conditions": get_permission_conditions(dt) or ["1=1"],
+				"sort_value": "`modified`",
+				"prefix": frappe.scrub(dt),
+				# Distinct parents first, so a letter tagged with several of
+				# the topics is returned once
+				"join": lambda table, dt=dt: f"""
+					JOIN (
+						SELECT DISTINCT `parent`
+						FROM `tabLetter Topic`
+						WHERE `topic` IN %(topics)s AND `parenttype` = '{dt}'
+					) AS tagged ON tagged.`parent` = {table}.`name`
+				"""
+			})
+		
+		branches = add_archive_branches(branches, {})
+		
+		with profiler.phase("query"):
+			results = run_union_search(branches, values, after, limit, profiler) if branches else []
+		
+		has_more = len(results) > limit
+		results = results[:limit]
+		
+		next_cursor = None
+		if has_more:
+			next_cursor = encode_cursor([results[-1].sort_value, results[-1].doctype, results[-1].name])
 		
-		results.extend(outgoing)
+		for doc in results:
+			doc.pop("sort_value", None)
 		
-		return {"success": True, "results": results, "count": len(results)}
+		return profiler.finish({
+			"success": True,
+			"results": results,
+			"count": len(results),
+			"topics": topics,
+			"has_more": has_more,
+			"next_cursor": next_cursor
+		})
 	
 	except Exception as e:
 		frappe.log_error(f"Search by topic failed: {str(e)}")
 		return {"success": False, "error": str(e)}
 
 
+def get_topic_tree(topic_name):
+	"""
+	A topic and all of its descendants
+	
+	Args:
+		topic_name: Root topic
+	
+	Returns:
+		List of topic names, root first
+	"""
+	topics = [topic_name]
+	frontier = [topic_name]
+	
+	# Breadth-first over parent_topic; the visited check guards against cycles
+	while frontier:
+		children = frappe.get_all("Topic", filters={"parent_topic": ["in", frontier]}, pluck="name")
+		frontier = [child for child in children if child not in topics]
+		topics.extend(frontier)
+	
+	return topics
+
+
 @frappe.whitelist()
 def get_search_suggestions(query, limit=10):
 	"""
 	Get search suggestions based on partial query
 	
+	Suggestions come from the Search Term prefix table (subjects, senders,
+	recipients and letter numbers) ranked by frequency and recency, and are
+	limited to what the user may read.
+	
 	Args:
 		query: Partial search query
 		limit: Maximum suggestions
@@ -248,41 +1212,7 @@ def get_search_suggestions(query, limit=10):
 		return {"success": True, "suggestions": []}
 	
 	try:
-		query = frappe.db.escape(query)
-		suggestions = []
-		
-		# Get subject suggestions
-		subjects = frappe.db.sql(f"""
-			SELECT DISTINCT subject
-			FROM (
-				SELECT subject FROM `tabIncoming Letter` WHERE subject LIKE '%{query}%'
-				UNION
-				SELECT subject FROM `tabOutgoing Letter` WHERE subject LIKE '%{query}%'
-			) as combined
-			LIMIT {int(limit)}
-		""", as_dict=True)
-		
-		for s in subjects:
-			suggestions.append({
-				"type": "subject",
-				"value": s.subject
-			})
-		
-		# Get sender/recipient suggestions
-		senders = frappe.db.sql(f"""
-			SELECT DISTINCT sender as value
-			FROM `tabIncoming Letter`
-			WHERE sender LIKE '%{query}%'
-			LIMIT 5
-		""", as_dict=True)
-		
-		for s in senders:
-			suggestions.append({
-				"type": "sender",
-				"value": s.value
-			})
-		
-		return {"success": True, "suggestions": suggestions[:limit]}
+		return {"success": True, "suggestions": get_suggestions(query, get_page_size(limit, default=10, maximum=50))}
 	
 	except Exception as e:
 		frappe.log_error(f"Get suggestions failed: {str(e)}")
@@ -0,0 +1,40 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.api.search import get_cursor_condition
+
+
+class TestSearchCursor(FrappeTestCase):
+	def get_branch(self, doctype):
+		return {"doctype": doctype, "sort_value": "`modified`", "prefix": doctype.lower().replace(" ", "_")}
+
+	def test_same_doctype_continues_after_name(self):
+		values = {}
+		after = ["2025-11-03 10:00:00", "Incoming Letter", "IN-0042"]
+		condition = get_cursor_condition(self.get_branch("Incoming Letter"), after, values)
+
+		self.assertEqual(
+			condition,
+			"((`modified` < %(incoming_letter_cursor_0)s) OR "
+			"(`modified` = %(incoming_letter_cursor_0)s AND `name` < %(incoming_letter_cursor_1)s))"
+		)
+		self.assertEqual(values, {"incoming_letter_cursor_0": after[0], "incoming_letter_cursor_1": "IN-0042"})
+
+	def test_later_doctype_excludes_equal_sort_value(self):
+		# Rows with the cursor's sort value and a greater doctype came first
+		values = {}
+		after = ["2025-11-03 10:00:00", "Incoming Letter", "IN-0042"]
+		condition = get_cursor_condition(self.get_branch("Outgoing Letter"), after, values)
+
+		self.assertEqual(condition, "`modified` < %(outgoing_letter_cursor)s")
+		self.assertEqual(values, {"outgoing_letter_cursor": after[0]})
+
+	def test_earlier_doctype_includes_equal_sort_value(self):
+		values = {}
+		after = ["2025-11-03 10:00:00", "Outgoing Letter", "OUT-0007"]
+		condition = get_cursor_condition(self.get_branch("Internal Memo"), after, values)
+
+		self.assertEqual(condition, "`modified` <= %(internal_memo_cursor)s")
+		self.assertEqual(values, {"internal_memo_cursor": after[0]})
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Benchmark Data Module
+Seeds and removes synthetic letters used by the benchmarks. All generated
+records are prefixed with BENCH- so they can be removed safely.
+"""
+
+import random
+import statistics
+import time
+
+import frappe
+from frappe.utils import add_days, getdate, now
+
+from correspondence.correspondence.utils.arabic_text import make_name_key
+
+
+BENCH_PREFIX = "BENCH-"
+
+WORDS = [
+	"وزارة", "التعليم", "العالي", "طلب", "معلومات", "البرامج", "الأكاديمية", "العقد",
+	"الميزانية", "التوظيف", "الموارد", "البشرية", "الصيانة", "المشروع", "التقرير", "السنوي",
+	"الاجتماع", "اللجنة", "المناقصة", "التوريد", "الفاتورة", "الدفع", "الموافقة", "الإدارة",
+	"contract", "budget", "invoice", "payment", "approval", "meeting", "committee", "tender",
+	"supply", "maintenance", "project", "report", "annual", "request", "information", "training",
+]
+
+SENDERS = [
+	"وزارة التعليم العالي", "وزارة المالية", "هيئة الاتصالات", "شركة الكهرباء",
+	"بلدية المدينة", "Ministry of Health", "National Bank", "Audit Bureau",
+]
+
+
+def seed_letters(rows=100000, topics_per_letter=0, batch_size=5000, seed=42):
+	"""
+	Insert synthetic Incoming Letters (and optionally Letter Topic rows)
+	
+	Args:
+		rows: Number of letters to create
+		topics_per_letter: Number of Letter Topic rows per letter
+		batch_size: Rows per bulk insert
+		seed: Random seed (results are reproducible)
+	
+	Returns:
+		Seconds spent seeding
+	"""
+	rng = random.Random(seed)
+	start = time.monotonic()
+	timestamp = now()
+	user = frappe.session.user
+	base_date = getdate("2020-01-01")
+	topics = ensure_topics(max(topics_per_letter * 4, topics_per_letter))
+	
+	letter_fields = [
+		"name", "letter_number", "date_received", "priority", "status", "sender", "sender_key",
+		"recipient_department", "subject", "summary", "ocr_text", "is_archived",
+		"creation", "modified", "owner", "modified_by", "docstatus", "idx"
+	]
+	topic_fields = ["name", "parent", "parenttype", "parentfield", "topic", "creation", "modified", "owner", "modified_by", "docstatus", "idx"]
+	
+	for offset in range(0, rows, batch_size):
+		letters = []
+		letter_topics = []
+		
+		for i in range(offset, min(offset + batch_size, rows)):
+			name = f"{BENCH_PREFIX}IL-{i:07d}"
+			sender = rng.choice(SENDERS)
+			letters.append((
+				name, name, add_days(base_date, rng.randint(0, 2000)),
+				rng.choice(["Low", "Medium", "High", "Urgent"]),
+				rng.choice(["New", "Under Process", "Waiting", "Completed", "Archived"]),
+				sender, make_name_key(sender), None,
+				" ".join(rng.choices(WORDS, k=8)),
+				" ".join(rng.choices(WORDS, k=40)),
+				" ".join(rng.choices(WORDS, k=300)),
+				0, timestamp, timestamp, user, user, 0, 0
+			))
+			
+			for idx, topic in enumerate(rng.sample(topics, topics_per_letter), start=1):
+				letter_topics.append((
+					f"{name}-T{idx}", name, "Incoming Letter", "topics", topic,
+					timestamp, timestamp, user, user, 0, idx
+				))
+		
+		frappe.db.bulk_insert("Incoming Letter", letter_fields, letters)
+		if letter_topics:
+			frappe.db.bulk_insert("Letter Topic", topic_fields, letter_topics)
+		frappe.db.commit()
+	
+	return round(time.monotonic() - start, 2)
+
+
+def ensure_topics(count):
+	"""
+	Create benchmark topics if needed
+	
+	Args:
+		count: Number of topics
+	
+	Returns:
+		List of topic names
+	"""
+	names = [f"{BENCH_PREFIX}Topic {i:02d}" for i in range(count)]
+	
+	for i, name in enumerate(names):
+		if not frappe.db.exists("Topic", name):
+			frappe.get_doc({
+				"doctype": "Topic",
+				"topic_name": name,
+				# Every fourth topic is a root; the others are subtopics of the previous one
+				"parent_topic": names[i - 1] if i % 4 else None,
+				"enable_auto_categorization": 0
+			}).insert(ignore_permissions=True)
+	
+	return names
+
+
+def cleanup():
+	"""Remove all benchmark letters, topic rows and topics"""
+	frappe.db.sql("DELETE FROM `tabLetter Topic` WHERE parent LIKE %s", f"{BENCH_PREFIX}%")
+	frappe.db.sql("DELETE FROM `tabIncoming Letter` WHERE name LIKE %s", f"{BENCH_PREFIX}%")
+	frappe.db.sql("DELETE FROM `tabTopic` WHERE name LIKE %s", f"{BENCH_PREFIX}%")
+	frappe.db.commit()
+
+
+def time_call(fn, repeat=5):
+	"""
+	Time a callable
+	
+	Args:
+		fn: Callable without arguments
+		repeat: Number of runs
+	
+	Returns:
+		Dict with median, p95 and max in milliseconds
+	"""
+	samples = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		samples.append((time.perf_counter() - start) * 1000)
+	
+	samples.sort()
+	return {
+		"median_ms": round(statistics.median(samples), 2),
+		"p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+		"max_ms": round(samples[-1], 2)
+	}
+
+
+def print_table(title, rows):
+	"""
+	Print benchmark results as a plain text table
+	
+	Args:
+		title: Table title
+		rows: List of dicts with the same keys
+	"""
+	if not rows:
+		return
+	
+	columns = list(rows[0].keys())
+	widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+	
+	print(f"\n{title}")
+	print("  ".join(c.ljust(widths[c]) for c in columns))
+	for row in rows:
+		print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Search Benchmark
+Compares the LIKE, FULLTEXT and (optionally) index modes of search_letters
+on synthetic data.
+
+Run on a test site only:
+
+	bench --site test.localhost execute \\
+		correspondence.correspondence.benchmarks.search_benchmark.run \\
+		--kwargs "{'rows': 100000}"
+"""
+
+import time
+
+import frappe
+
+from correspondence.correspondence.api.search import has_fulltext_index, search_letters
+from correspondence.correspondence.benchmarks.data import cleanup, print_table, seed_letters, time_call
+from correspondence.correspondence.utils.search_index import rebuild_index
+
+
+DEFAULT_QUERIES = ["الميزانية", "contract", "طلب معلومات", "maintenance report"]
+
+
+def run(rows=100000, queries=None, repeat=5, keep_data=False, include_index=False):
+	"""
+	Seed letters, time each query in both modes and clean up
+	
+	Args:
+		rows: Number of synthetic letters
+		queries: Queries to time (defaults to a mixed Arabic/English set)
+		repeat: Runs per query and mode
+		keep_data: Keep the synthetic letters after the run
+		include_index: Also rebuild and time the app-level search index
+	
+	Returns:
+		Benchmark results
+	"""
+	queries = queries or DEFAULT_QUERIES
+	cleanup()
+	
+	try:
+		seconds = seed_letters(int(rows))
+		print(f"Seeded {rows} letters in {seconds}s")
+		
+		# Index availability is cached; re-check after seeding
+		frappe.cache().delete_value("letter_fulltext_index")
+		modes = ["like", "fulltext"] if has_fulltext_index("Incoming Letter") else ["like"]
+		
+		if include_index:
+			start = time.monotonic()
+			rebuild_index()
+			print(f"Built search index in {round(time.monotonic() - start, 2)}s")
+			modes.append("index")
+		
+		results = []
+		for query in queries:
+			for mode in modes:
+				timing = time_call(
+					lambda: search_letters(query, doctype="Incoming Letter", limit=50, mode=mode),
+					repeat=int(repeat)
+				)
+				results.append({"query": query, "mode": mode, **timing})
+		
+		print_table(f"search_letters on {rows} letters", results)
+		return results
+	
+	finally:
+		if not keep_data:
+			cleanup()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Topic Search Benchmark
+Times search_by_topic (join on Letter Topic) against the previous
+IN (SELECT parent ...) query on synthetic letters tagged with topics.
+
+Run on a test site only:
+
+	bench --site test.localhost execute \\
+		correspondence.correspondence.benchmarks.topic_benchmark.run \\
+		--kwargs "{'rows': 100000, 'topics_per_letter': 5}"
+"""
+
+import frappe
+
+from correspondence.correspondence.api.search import search_by_topic
+from correspondence.correspondence.benchmarks.data import (
+	cleanup,
+	ensure_topics,
+	print_table,
+	seed_letters,
+	time_call,
+)
+
+
+def subquery_search(topic_name, limit=50):
+	"""
+	The pre-join query shape, kept as the baseline
+	
+	Args:
+		topic_name: Topic name
+		limit: Maximum results
+	
+	Returns:
+		Matching letters
+	"""
+	return frappe.db.sql("""
+		SELECT il.name, il.letter_number, il.subject, il.sender, il.date_received, il.status
+		FROM `tabIncoming Letter` il
+		WHERE il.name IN (
+			SELECT parent FROM `tabLetter Topic`
+			WHERE topic = %s AND parenttype = 'Incoming Letter'
+		)
+		ORDER BY il.modified DESC
+		LIMIT %s
+	""", (topic_name, int(limit)), as_dict=True)
+
+
+def deep_page(topic_name, pages, **kwargs):
+	"""
+	Follow the cursor to a later page
+	
+	Args:
+		topic_name: Topic name
+		pages: Number of pages to read
+		kwargs: Extra search_by_topic arguments
+	
+	Returns:
+		Last page
+	"""
+	cursor = None
+	for _ in range(pages):
+		page = search_by_topic(topic_name, cursor=cursor, **kwargs)
+		cursor = page.get("next_cursor")
+		if not cursor:
+			break
+	return page
+
+
+def run(rows=100000, topics_per_letter=5, repeat=5, keep_data=False):
+	"""
+	Seed tagged letters, time topic searches and clean up
+	
+	Args:
+		rows: Number of synthetic letters
+		topics_per_letter: Letter Topic rows per letter
+		repeat: Runs per case
+		keep_data: Keep the synthetic letters after the run
+	
+	Returns:
+		Benchmark results
+	"""
+	topics_per_letter = int(topics_per_letter)
+	cleanup()
+	
+	try:
+		seconds = seed_letters(int(rows), topics_per_letter=topics_per_letter)
+		print(f"Seeded {rows} letters with {topics_per_letter} topics each in {seconds}s")
+		
+		topics = ensure_topics(max(topics_per_letter * 4, topics_per_letter))
+		root, leaf = topics[0], topics[1]
+		
+		cases = [
+			("subquery (baseline)", leaf, lambda: subquery_search(leaf)),
+			("join", leaf, lambda: search_by_topic(leaf, doctype="Incoming Letter")),
+			("join + subtopics", root, lambda: search_by_topic(root, include_subtopics=1, doctype="Incoming Letter")),
+			("join, 10 pages", leaf, lambda: deep_page(leaf, 10, doctype="Incoming Letter")),
+		]
+		
+		results = []
+		for label, topic, fn in cases:
+			results.append({"case": label, "topic": topic, **time_call(fn, repeat=int(repeat))})
+		
+		print_table(f"search_by_topic on {rows} letters x {topics_per_letter} topics", results)
+		return results
+	
+	finally:
+		if not keep_data:
+			cleanup()
@@ -18,10 +18,8 @@ class ArchiveLocation(Document):
 			frappe.throw("Current count cannot exceed capacity")
 	
 	def update_count(self):
-		"""Update current count based on archived documents"""
-		count = frappe.db.count("Incoming Letter", {"archive_location": self.name, "is_archived": 1})
-		count += frappe.db.count("Outgoing Letter", {"archive_location": self.name, "is_archived": 1})
+		"""Recount archived documents (counts are otherwise maintained incrementally)"""
+		from correspondence.correspondence.utils.archive_counters import reconcile_archive_location_counts
 		
-		self.current_count = count
-		self.available_space = self.capacity - self.current_count
-		self.save()
+		reconcile_archive_location_counts([self.name])
+		self.reload()
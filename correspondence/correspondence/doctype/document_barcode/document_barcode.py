@@ -6,3 +6,8 @@ from frappe.model.document import Document
 
 class DocumentBarcode(Document):
 	pass
+
+
+def on_doctype_update():
+	"""The retention job finds expired codes by generation date"""
+	frappe.db.add_index("Document Barcode", ["generated_date"])
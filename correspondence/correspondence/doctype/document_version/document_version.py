@@ -5,7 +5,6 @@
 from __future__ import unicode_literals
 import frappe
 from frappe.model.document import Document
-import hashlib
 import os
 
 
@@ -46,19 +45,7 @@ class DocumentVersion(Document):
 	
 	def calculate_file_hash(self, file_url):
 		"""Calculate SHA256 hash of file"""
-		try:
-			file_path = frappe.get_site_path('public', file_url.lstrip('/'))
-			
-			if os.path.exists(file_path):
-				sha256_hash = hashlib.sha256()
-				with open(file_path, "rb") as f:
-					for byte_block in iter(lambda: f.read(4096), b""):
-						sha256_hash.update(byte_block)
-				return sha256_hash.hexdigest()
-		except Exception as e:
-			frappe.log_error(f"Error calculating file hash: {str(e)}")
-		
-		return None
+		return get_file_hash(file_url)
 	
 	def mark_others_as_old(self):
 		"""Mark all other versions as not current"""
@@ -71,6 +58,26 @@ class DocumentVersion(Document):
 		""", (self.reference_doctype, self.reference_name, self.name))
 
 
+def get_file_hash(file_url):
+	"""Calculate SHA256 hash of a site file (the content store hash if recorded)"""
+	from correspondence.correspondence.utils.content_store import get_recorded_hash, hash_file
+	from correspondence.correspondence.utils.file_storage import get_local_path
+	
+	try:
+		content_hash = get_recorded_hash(file_url)
+		if content_hash:
+			return content_hash
+		
+		file_path = get_local_path(file_url)
+		
+		if file_path and os.path.exists(file_path):
+			return hash_file(file_path)[0]
+	except Exception as e:
+		frappe.log_error(f"Error calculating file hash: {str(e)}")
+	
+	return None
+
+
 @frappe.whitelist()
 def compare_versions(version1, version2):
 	"""Compare two versions and return differences"""
@@ -982,15 +982,41 @@ function show_analytics_dashboard(data) {
 
 
 function show_related_documents_panel(frm) {
-    // Create a custom section to show related documents
-    if (frm.doc.related_documents && frm.doc.related_documents.length > 0) {
+    // Saved letters read their relations (in both directions) from the relation graph
+    if (!frm.is_new() && !frm.is_dirty()) {
+        frappe.call({
+            method: 'correspondence.correspondence.utils.relation_graph.get_related_documents',
+            args: {
+                doctype: frm.doctype,
+                docname: frm.docname
+            },
+            callback: function (r) {
+                if (r.message && r.message.success) {
+                    render_related_documents_panel(frm, r.message.related_documents.map(d => ({
+                        document_type: d.doctype,
+                        document_name: d.name,
+                        similarity_score: d.score
+                    })));
+                }
+            }
+        });
+    } else {
+        render_related_documents_panel(frm, frm.doc.related_documents || []);
+    }
+}
+
+function render_related_documents_panel(frm, related_documents) {
+    // Remove a previously rendered panel
+    frm.fields_dict['related_documents_section'].$wrapper.find('.related-documents-panel').remove();
+
+    if (related_documents.length > 0) {
         let html = '<div class="related-documents-panel" style="margin-top: 15px;">';
         html += '<h4>Related Documents</h4>';
         html += '<table class="table table-bordered">';
         html += '<thead><tr><th>Document</th><th>Similarity</th><th>Action</th></tr></thead>';
         html += '<tbody>';
 
-        frm.doc.related_documents.forEach(function (doc) {
+        related_documents.forEach(function (doc) {
             let score = doc.similarity_score ? (doc.similarity_score * 100).toFixed(0) + '%' : 'N/A';
             html += `<tr>
 				<td>${doc.document_type}: ${doc.document_name}</td>
@@ -1001,7 +1027,6 @@ function show_related_documents_panel(frm) {
 
         html += '</tbody></table></div>';
 
-        // Add to form
         frm.fields_dict['related_documents_section'].$wrapper.append(html);
     }
 }
@@ -8,6 +8,31 @@ from datetime import datetime, timedelta
 
 
 class IncomingLetter(Document):
+	def load_from_db(self):
+		"""Load the document, with the full row of a letter moved to an archive table"""
+		super().load_from_db()
+		
+		if self.get("archive_table"):
+			from correspondence.correspondence.utils.archive_tables import load_archived_row
+			load_archived_row(self)
+	
+	def check_not_moved(self):
+		"""Moved letters are read-only until restored from their archive table"""
+		from correspondence.correspondence.utils.archive_tables import check_not_moved
+		check_not_moved(self)
+	
+	def before_update_after_submit(self):
+		"""Before update after submit"""
+		self.check_not_moved()
+	
+	def before_cancel(self):
+		"""Before cancel"""
+		self.check_not_moved()
+	
+	def on_trash(self):
+		"""On trash"""
+		self.check_not_moved()
+	
 	def before_insert(self):
 		"""Before inserting a new letter"""
 		# Set default status if not set
@@ -20,6 +45,8 @@ class IncomingLetter(Document):
 	
 	def validate(self):
 		"""Validate the document"""
+		self.check_not_moved()
+		
 		# Update SLA status
 		self.update_sla_status()
 		
@@ -94,16 +121,19 @@ class IncomingLetter(Document):
 			return
 		
 		from correspondence.correspondence.utils.ocr_processor import extract_text_from_file
+		from correspondence.correspondence.utils.content_store import get_cached_ocr, set_cached_ocr
+		from correspondence.correspondence.utils.file_storage import get_local_path
 		
 		ocr_texts = []
 		for attachment in self.attachments:
 			if not attachment.ocr_extracted and attachment.file:
 				try:
-					# Get file path
-					file_path = frappe.get_site_path('public', attachment.file.lstrip('/'))
+					# Reuse the text of the same content attached elsewhere
+					ocr_text = get_cached_ocr(attachment.content_hash)
 					
-					# Extract text
-					ocr_text = extract_text_from_file(file_path)
+					if ocr_text is None:
+						ocr_text = extract_text_from_file(get_local_path(attachment.file))
+						set_cached_ocr(attachment.content_hash, ocr_text)
 					
 					# Update attachment
 					attachment.ocr_text = ocr_text
@@ -120,28 +150,11 @@ class IncomingLetter(Document):
 			self.ocr_text = "\n\n---\n\n".join(ocr_texts)
 	
 	def find_related_documents(self):
-		"""Find and link related documents using multiple strategies (topic, date, sender, subject)"""
-		from correspondence.correspondence.utils.auto_relation_finder import find_all_related_documents
+		"""Queue the search for related documents (topic, date, sender, subject); the job stores them in the relation graph"""
+		from correspondence.correspondence.utils.auto_relation_finder import queue_related_documents
 		
 		try:
-			# Find all related documents using comprehensive search
-			related_docs = find_all_related_documents(self, "Incoming Letter")
-			
-			# Clear existing auto-generated relations (keep manual ones)
-			self.related_documents = [
-				d for d in self.related_documents 
-				if d.relation_type == "Manual"
-			]
-			
-			# Add new related documents
-			for doc in related_docs:
-				self.append('related_documents', {
-					'document_type': doc.get('doctype'),
-					'document_name': doc.get('name'),
-					'similarity_score': doc.get('score'),
-					'relation_type': 'Auto',
-					'notes': doc.get('relation_reason', '')
-				})
+			queue_related_documents(self)
 		except Exception as e:
 			frappe.log_error(f"Finding related documents failed: {str(e)}")
 	
@@ -250,8 +263,8 @@ class IncomingLetter(Document):
 	
 	def generate_archive_number(self):
 		"""Generate unique archive number"""
-		from frappe.model.naming import make_autoname
-		return make_autoname("ARCH-.YYYY.-.MM.-.#####")
+		from correspondence.correspondence.utils.archive_numbers import get_archive_number
+		return get_archive_number()
 	
 	def create_version_snapshot(self):
 		"""Create a version snapshot of the document"""
@@ -274,38 +287,43 @@ class IncomingLetter(Document):
 		pass
 
 
+def on_doctype_update():
+	"""Archived document searches seek is_archived (and the location) and read pages in archived_on order"""
+	frappe.db.add_index("Incoming Letter", ["is_archived", "archive_location", "archived_on"])
+	frappe.db.add_index("Incoming Letter", ["is_archived", "archived_on"])
+
+
 @frappe.whitelist()
 def get_letter_preview(letter_name):
 	"""Get letter preview data including attachments and related docs"""
+	from correspondence.correspondence.utils.relation_graph import get_relations
+	from correspondence.correspondence.utils.file_storage import get_local_path
+	
 	letter = frappe.get_doc("Incoming Letter", letter_name)
 	
+	# Bring attachments in cold storage back so their URLs can be previewed
+	for att in letter.attachments or []:
+		if att.storage_tier == "Cold":
+			get_local_path(att.file)
+	
 	return {
 		"letter": letter.as_dict(),
 		"attachments": [att.as_dict() for att in letter.attachments] if letter.attachments else [],
-		"related_documents": [rel.as_dict() for rel in letter.related_documents] if letter.related_documents else [],
+		"related_documents": get_relations(letter.doctype, letter.name),
 		"topics": [t.as_dict() for t in letter.topics] if letter.topics else []
 	}
 
 
 @frappe.whitelist()
-def bulk_archive(letter_names):
-	"""Bulk archive letters"""
+def bulk_archive(letter_names, archive_location=None):
+	"""Bulk archive letters in a background job"""
 	import json
+	from correspondence.correspondence.api.archive import bulk_archive as archive_documents
 	
 	if isinstance(letter_names, str):
 		letter_names = json.loads(letter_names)
 	
-	results = {"success": [], "failed": []}
-	
-	for letter_name in letter_names:
-		try:
-			letter = frappe.get_doc("Incoming Letter", letter_name)
-			letter.status = "Archived"
-			letter.archive_document()
-			letter.save(ignore_permissions=True)
-			results["success"].append(letter_name)
-		except Exception as e:
-			results["failed"].append({"name": letter_name, "error": str(e)})
-			frappe.log_error(f"Bulk archive failed for {letter_name}: {str(e)}")
-	
-	return results
+	return archive_documents(
+		[{"doctype": "Incoming Letter", "name": letter_name} for letter_name in letter_names],
+		archive_location
+	)
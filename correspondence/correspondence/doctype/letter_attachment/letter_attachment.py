@@ -30,3 +30,9 @@ class LetterAttachment(Document):
 		# Set uploaded by and on
 		self.uploaded_by = frappe.session.user
 		self.uploaded_on = frappe.utils.now()
+
+
+def on_doctype_update():
+	"""Storage tier and content store lookups find attachment rows by file URL and content hash"""
+	frappe.db.add_index("Letter Attachment", ["file(140)"])
+	frappe.db.add_index("Letter Attachment", ["content_hash"])
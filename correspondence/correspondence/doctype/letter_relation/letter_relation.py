@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.model.document import Document
+
+
+class LetterRelation(Document):
+	pass
+
+
+def on_doctype_update():
+	"""Index edges from both ends so lookups in either direction are a single seek"""
+	frappe.db.add_index("Letter Relation", ["source_doctype", "source_name"])
+	frappe.db.add_index("Letter Relation", ["target_doctype", "target_name"])
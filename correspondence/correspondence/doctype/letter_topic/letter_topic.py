@@ -1,7 +1,13 @@
 # Copyright (c) 2025, ERP Team and contributors
 # For license information, please see license.txt
 
+import frappe
 from frappe.model.document import Document
 
 class LetterTopic(Document):
 	pass
+
+
+def on_doctype_update():
+	"""Topic lookups seek (topic, parenttype) and read the parent from the index"""
+	frappe.db.add_index("Letter Topic", ["topic", "parenttype", "parent"])
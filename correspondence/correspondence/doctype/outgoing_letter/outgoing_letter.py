@@ -7,8 +7,35 @@ from frappe.utils import now
 
 
 class OutgoingLetter(Document):
+	def load_from_db(self):
+		"""Load the document, with the full row of a letter moved to an archive table"""
+		super().load_from_db()
+		
+		if self.get("archive_table"):
+			from correspondence.correspondence.utils.archive_tables import load_archived_row
+			load_archived_row(self)
+	
+	def check_not_moved(self):
+		"""Moved letters are read-only until restored from their archive table"""
+		from correspondence.correspondence.utils.archive_tables import check_not_moved
+		check_not_moved(self)
+	
+	def before_update_after_submit(self):
+		"""Before update after submit"""
+		self.check_not_moved()
+	
+	def before_cancel(self):
+		"""Before cancel"""
+		self.check_not_moved()
+	
+	def on_trash(self):
+		"""On trash"""
+		self.check_not_moved()
+	
 	def validate(self):
 		"""Validate the document"""
+		self.check_not_moved()
+		
 		# Set date_sent when status changes to Sent
 		if self.status == "Sent" and not self.date_sent:
 			self.date_sent = frappe.utils.today()
@@ -44,16 +71,19 @@ class OutgoingLetter(Document):
 			return
 		
 		from correspondence.correspondence.utils.ocr_processor import extract_text_from_file
+		from correspondence.correspondence.utils.content_store import get_cached_ocr, set_cached_ocr
+		from correspondence.correspondence.utils.file_storage import get_local_path
 		
 		ocr_texts = []
 		for attachment in self.attachments:
 			if not attachment.ocr_extracted and attachment.file:
 				try:
-					# Get file path
-					file_path = frappe.get_site_path('public', attachment.file.lstrip('/'))
+					# Reuse the text of the same content attached elsewhere
+					ocr_text = get_cached_ocr(attachment.content_hash)
 					
-					# Extract text
-					ocr_text = extract_text_from_file(file_path)
+					if ocr_text is None:
+						ocr_text = extract_text_from_file(get_local_path(attachment.file))
+						set_cached_ocr(attachment.content_hash, ocr_text)
 					
 					# Update attachment
 					attachment.ocr_text = ocr_text
@@ -70,28 +100,11 @@ class OutgoingLetter(Document):
 			self.ocr_text = "\n\n---\n\n".join(ocr_texts)
 	
 	def find_related_documents(self):
-		"""Find and link related documents using multiple strategies (topic, date, recipient, subject)"""
-		from correspondence.correspondence.utils.auto_relation_finder import find_all_related_documents
+		"""Queue the search for related documents (topic, date, recipient, subject); the job stores them in the relation graph"""
+		from correspondence.correspondence.utils.auto_relation_finder import queue_related_documents
 		
 		try:
-			# Find all related documents using comprehensive search
-			related_docs = find_all_related_documents(self, "Outgoing Letter")
-			
-			# Clear existing auto-generated relations (keep manual ones)
-			self.related_documents = [
-				d for d in self.related_documents 
-				if d.relation_type == "Manual"
-			]
-			
-			# Add new related documents
-			for doc in related_docs:
-				self.append('related_documents', {
-					'document_type': doc.get('doctype'),
-					'document_name': doc.get('name'),
-					'similarity_score': doc.get('score'),
-					'relation_type': 'Auto',
-					'notes': doc.get('relation_reason', '')
-				})
+			queue_related_documents(self)
 		except Exception as e:
 			frappe.log_error(f"Finding related documents failed: {str(e)}")
 	
@@ -144,8 +157,8 @@ class OutgoingLetter(Document):
 	
 	def generate_archive_number(self):
 		"""Generate unique archive number"""
-		from frappe.model.naming import make_autoname
-		return make_autoname("ARCH-.YYYY.-.MM.-.#####")
+		from correspondence.correspondence.utils.archive_numbers import get_archive_number
+		return get_archive_number()
 	
 	def create_version_snapshot(self):
 		"""Create a version snapshot of the document"""
@@ -162,15 +175,29 @@ class OutgoingLetter(Document):
 			frappe.log_error(f"Version snapshot creation failed: {str(e)}")
 
 
+def on_doctype_update():
+	"""Archived document searches seek is_archived (and the location) and read pages in archived_on order"""
+	frappe.db.add_index("Outgoing Letter", ["is_archived", "archive_location", "archived_on"])
+	frappe.db.add_index("Outgoing Letter", ["is_archived", "archived_on"])
+
+
 @frappe.whitelist()
 def get_letter_preview(letter_name):
 	"""Get letter preview data including attachments and related docs"""
+	from correspondence.correspondence.utils.relation_graph import get_relations
+	from correspondence.correspondence.utils.file_storage import get_local_path
+	
 	letter = frappe.get_doc("Outgoing Letter", letter_name)
 	
+	# Bring attachments in cold storage back so their URLs can be previewed
+	for att in letter.attachments or []:
+		if att.storage_tier == "Cold":
+			get_local_path(att.file)
+	
 	return {
 		"letter": letter.as_dict(),
 		"attachments": [att.as_dict() for att in letter.attachments] if letter.attachments else [],
-		"related_documents": [rel.as_dict() for rel in letter.related_documents] if letter.related_documents else [],
+		"related_documents": get_relations(letter.doctype, letter.name),
 		"topics": [t.as_dict() for t in letter.topics] if letter.topics else []
 	}
 
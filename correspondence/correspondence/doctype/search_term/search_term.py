@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.model.document import Document
+
+
+class SearchTerm(Document):
+	pass
+
+
+def on_doctype_update():
+	"""Prefix lookups scan a range of term_key within the allowed doctypes"""
+	frappe.db.add_index("Search Term", ["term_key", "source_doctype"])
@@ -3,7 +3,11 @@
 
 import frappe
 
+from correspondence.correspondence.utils.query_builder import get_date_range_filters, run_register_query
+
 def execute(filters=None):
+	filters = filters or {}
+	
 	columns = [
 		{"fieldname": "letter_number", "label": "Letter Number", "fieldtype": "Link", "options": "Incoming Letter", "width": 150},
 		{"fieldname": "date_received", "label": "Date Received", "fieldtype": "Date", "width": 100},
@@ -15,32 +19,28 @@ def execute(filters=None):
 		{"fieldname": "assigned_to", "label": "Assigned To", "fieldtype": "Link", "options": "User", "width": 150}
 	]
 	
-	conditions = ""
-	if filters.get("from_date"):
-		conditions += f" AND date_received >= '{filters.get('from_date')}'"
-	if filters.get("to_date"):
-		conditions += f" AND date_received <= '{filters.get('to_date')}'"
-	if filters.get("status"):
-		conditions += f" AND status = '{filters.get('status')}'"
-	if filters.get("priority"):
-		conditions += f" AND priority = '{filters.get('priority')}'"
+	allowed_filters = {
+		**get_date_range_filters("date_received"),
+		"status": ("status", "="),
+		"priority": ("priority", "="),
+	}
 
-	data = frappe.db.sql(f"""
-		SELECT
-			name as letter_number,
-			date_received,
-			subject,
-			sender,
-			sender_organization,
-			status,
-			priority,
-			assigned_to
-		FROM
-			`tabIncoming Letter`
-		WHERE
-			docstatus < 2 {conditions}
-		ORDER BY
-			date_received DESC
-	""", as_dict=1)
+	data = run_register_query(
+		"Incoming Letter",
+		fields=[
+			("name", "letter_number"),
+			"date_received",
+			"subject",
+			"sender",
+			"sender_organization",
+			"status",
+			"priority",
+			"assigned_to"
+		],
+		filters=filters,
+		allowed_filters=allowed_filters,
+		order_by=[("date_received", "desc")],
+		date_field="date_received"
+	)
 
 	return columns, data
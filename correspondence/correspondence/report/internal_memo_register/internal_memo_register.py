@@ -3,7 +3,11 @@
 
 import frappe
 
+from correspondence.correspondence.utils.query_builder import get_date_range_filters, get_register_query
+
 def execute(filters=None):
+	filters = filters or {}
+	
 	columns = [
 		{"fieldname": "reference_number", "label": "Reference Number", "fieldtype": "Link", "options": "Internal Memo", "width": 150},
 		{"fieldname": "date", "label": "Date", "fieldtype": "Date", "width": 100},
@@ -16,33 +20,28 @@ def execute(filters=None):
 		{"fieldname": "priority", "label": "Priority", "fieldtype": "Data", "width": 100}
 	]
 	
-	conditions = ""
-	if filters.get("from_date"):
-		conditions += f" AND date >= '{filters.get('from_date')}'"
-	if filters.get("to_date"):
-		conditions += f" AND date <= '{filters.get('to_date')}'"
-	if filters.get("status"):
-		conditions += f" AND status = '{filters.get('status')}'"
-	if filters.get("priority"):
-		conditions += f" AND priority = '{filters.get('priority')}'"
+	allowed_filters = {
+		**get_date_range_filters("date"),
+		"status": ("status", "="),
+		"priority": ("priority", "="),
+	}
 
-	data = frappe.db.sql(f"""
-		SELECT
-			name as reference_number,
-			date,
-			subject,
-			sender,
-			recipient_type,
-			recipient_department,
-			recipient_user,
-			status,
-			priority
-		FROM
-			`tabInternal Memo`
-		WHERE
-			docstatus < 2 {conditions}
-		ORDER BY
-			date DESC
-	""", as_dict=1)
+	data = get_register_query(
+		"Internal Memo",
+		fields=[
+			("name", "reference_number"),
+			"date",
+			"subject",
+			"sender",
+			"recipient_type",
+			"recipient_department",
+			"recipient_user",
+			"status",
+			"priority"
+		],
+		filters=filters,
+		allowed_filters=allowed_filters,
+		order_by=[("date", "desc")]
+	).run(as_dict=True)
 
 	return columns, data
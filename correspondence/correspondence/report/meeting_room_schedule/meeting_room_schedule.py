@@ -3,8 +3,13 @@
 
 import frappe
 from frappe import _
+from frappe.utils import flt, to_timedelta
+
+from correspondence.correspondence.utils.query_builder import get_date_range_filters, get_register_query
 
 def execute(filters=None):
+	filters = filters or {}
+	
 	columns = [
 		{"fieldname": "booking_id", "label": _("Booking ID"), "fieldtype": "Link", "options": "Meeting Room Booking", "width": 150},
 		{"fieldname": "meeting_room", "label": _("Meeting Room"), "fieldtype": "Link", "options": "Meeting Room", "width": 150},
@@ -19,40 +24,50 @@ def execute(filters=None):
 		{"fieldname": "number_of_attendees", "label": _("Attendees"), "fieldtype": "Int", "width": 80}
 	]
 	
-	conditions = "WHERE docstatus < 2"
-	
-	if filters.get("from_date"):
-		conditions += f" AND booking_date >= '{filters.get('from_date')}'"
-	if filters.get("to_date"):
-		conditions += f" AND booking_date <= '{filters.get('to_date')}'"
-	if filters.get("meeting_room"):
-		conditions += f" AND meeting_room = '{filters.get('meeting_room')}'"
-	if filters.get("status"):
-		conditions += f" AND status = '{filters.get('status')}'"
-	if filters.get("department"):
-		conditions += f" AND department = '{filters.get('department')}'"
-
-	data = frappe.db.sql(f"""
-		SELECT
-			name as booking_id,
-			meeting_room,
-			booking_date,
-			start_time,
-			end_time,
-			TIMESTAMPDIFF(MINUTE, 
-				CONCAT(booking_date, ' ', start_time), 
-				CONCAT(booking_date, ' ', end_time)
-			) / 60.0 as duration,
-			meeting_title,
-			booked_by,
-			department,
-			status,
-			number_of_attendees
-		FROM
-			`tabMeeting Room Booking`
-		{conditions}
-		ORDER BY
-			booking_date DESC, start_time ASC
-	""", as_dict=1)
+	allowed_filters = {
+		**get_date_range_filters("booking_date"),
+		"meeting_room": ("meeting_room", "="),
+		"status": ("status", "="),
+		"department": ("department", "="),
+	}
+
+	data = get_register_query(
+		"Meeting Room Booking",
+		fields=[
+			("name", "booking_id"),
+			"meeting_room",
+			"booking_date",
+			"start_time",
+			"end_time",
+			"meeting_title",
+			"booked_by",
+			"department",
+			"status",
+			"number_of_attendees"
+		],
+		filters=filters,
+		allowed_filters=allowed_filters,
+		order_by=[("booking_date", "desc"), ("start_time", "asc")]
+	).run(as_dict=True)
+
+	for row in data:
+		row.duration = get_duration(row.start_time, row.end_time)
 
 	return columns, data
+
+
+def get_duration(start_time, end_time):
+	"""
+	Booking duration in hours
+
+	Args:
+		start_time: Start time
+		end_time: End time
+
+	Returns:
+		Hours (None if a time is missing)
+	"""
+	if not start_time or not end_time:
+		return None
+
+	return flt((to_timedelta(end_time) - to_timedelta(start_time)).total_seconds() / 3600, 2)
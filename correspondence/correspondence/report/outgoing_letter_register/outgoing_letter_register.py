@@ -3,7 +3,11 @@
 
 import frappe
 
+from correspondence.correspondence.utils.query_builder import get_date_range_filters, run_register_query
+
 def execute(filters=None):
+	filters = filters or {}
+	
 	columns = [
 		{"fieldname": "letter_number", "label": "Letter Number", "fieldtype": "Link", "options": "Outgoing Letter", "width": 150},
 		{"fieldname": "date_created", "label": "Date Created", "fieldtype": "Date", "width": 100},
@@ -14,31 +18,27 @@ def execute(filters=None):
 		{"fieldname": "priority", "label": "Priority", "fieldtype": "Data", "width": 100}
 	]
 	
-	conditions = ""
-	if filters.get("from_date"):
-		conditions += f" AND date_created >= '{filters.get('from_date')}'"
-	if filters.get("to_date"):
-		conditions += f" AND date_created <= '{filters.get('to_date')}'"
-	if filters.get("status"):
-		conditions += f" AND status = '{filters.get('status')}'"
-	if filters.get("priority"):
-		conditions += f" AND priority = '{filters.get('priority')}'"
+	allowed_filters = {
+		**get_date_range_filters("date_created"),
+		"status": ("status", "="),
+		"priority": ("priority", "="),
+	}
 
-	data = frappe.db.sql(f"""
-		SELECT
-			name as letter_number,
-			date_created,
-			subject,
-			recipient,
-			recipient_organization,
-			status,
-			priority
-		FROM
-			`tabOutgoing Letter`
-		WHERE
-			docstatus < 2 {conditions}
-		ORDER BY
-			date_created DESC
-	""", as_dict=1)
+	data = run_register_query(
+		"Outgoing Letter",
+		fields=[
+			("name", "letter_number"),
+			"date_created",
+			"subject",
+			"recipient",
+			"recipient_organization",
+			"status",
+			"priority"
+		],
+		filters=filters,
+		allowed_filters=allowed_filters,
+		order_by=[("date_created", "desc")],
+		date_field="date_created"
+	)
 
 	return columns, data
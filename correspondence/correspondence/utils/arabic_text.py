@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Arabic Text Module
+Normalization, light stemming and tokenization helpers for Arabic (and mixed
+Arabic/Latin) names and text
+"""
+
+import re
+
+
+# Harakat, Quranic annotation marks and superscript alef
+ARABIC_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]")
+
+TATWEEL = "\u0640"
+
+# Letter variants folded to a single canonical form
+ARABIC_LETTER_MAP = str.maketrans({
+	"\u0623": "\u0627",  # alef with hamza above -> alef
+	"\u0625": "\u0627",  # alef with hamza below -> alef
+	"\u0622": "\u0627",  # alef with madda -> alef
+	"\u0671": "\u0627",  # alef wasla -> alef
+	"\u0649": "\u064a",  # alef maksura -> ya
+	"\u06cc": "\u064a",  # farsi yeh -> ya
+	"\u0626": "\u064a",  # ya with hamza -> ya
+	"\u0624": "\u0648",  # waw with hamza -> waw
+	"\u0629": "\u0647",  # ta marbuta -> ha
+	"\u06a9": "\u0643",  # keheh -> kaf
+	**{chr(0x0660 + i): str(i) for i in range(10)},  # Arabic-Indic digits
+	**{chr(0x06f0 + i): str(i) for i in range(10)},  # Extended Arabic-Indic digits
+})
+
+# Anything that is not a letter or digit separates words
+NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+# Maximum length of a key stored in a Data field / used as a document name
+MAX_KEY_LENGTH = 140
+
+
+def normalize_arabic(text):
+	"""
+	Normalize Arabic text for comparison
+
+	Strips diacritics and tatweel, folds alef/ya/ta-marbuta/hamza variants,
+	converts Arabic-Indic digits, lowercases Latin text and folds punctuation
+	and whitespace into single spaces.
+
+	Args:
+		text: Input text
+
+	Returns:
+		Normalized text
+	"""
+	if not text:
+		return ""
+
+	text = ARABIC_DIACRITICS.sub("", text)
+	text = text.replace(TATWEEL, "")
+	text = text.translate(ARABIC_LETTER_MAP)
+	text = NON_WORD.sub(" ", text.lower()).replace("_", " ")
+
+	return " ".join(text.split())
+
+
+def make_name_key(name):
+	"""
+	Build an indexable key for a correspondent name
+
+	Args:
+		name: Sender / recipient name as typed on the letter
+
+	Returns:
+		Normalized key (empty string if nothing remains)
+	"""
+	return normalize_arabic(name)[:MAX_KEY_LENGTH].strip()
+
+
+# Light stemming affixes (Light10), applied after normalize_arabic (so
+# alef/ta-marbuta variants are already folded). Longest affixes are tried
+# first.
+ARABIC_CONJUNCTION = "و"
+ARABIC_ARTICLES = ["وال", "بال", "كال", "فال", "لل", "ال"]
+ARABIC_SUFFIXES = ["ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي"]
+
+# Stems shorter than this are left untouched
+MIN_STEM_LENGTH = 3
+
+ARABIC_LETTERS = re.compile("[\u0621-\u064a]")
+
+
+def light_stem(token):
+	"""
+	Light-stem a normalized token
+
+	Arabic tokens lose, in Light10 order, an optional wa- conjunction, one
+	article (al-, wa-al-, bi-al-, li-l- ...) and one common suffix (plural,
+	dual and pronoun endings), each only if at least three letters remain.
+	A leading waw left after the article is stripped like the conjunction,
+	so a word stems alike with and without the article (wazara and
+	al-wazara). Latin tokens only lose a plural "s".
+
+	Args:
+		token: Token produced by normalize_arabic
+
+	Returns:
+		Stemmed token
+	"""
+	if ARABIC_LETTERS.search(token):
+		token = strip_conjunction(token)
+
+		for article in ARABIC_ARTICLES:
+			if token.startswith(article) and len(token) - len(article) >= MIN_STEM_LENGTH:
+				token = strip_conjunction(token[len(article):])
+				break
+
+		for suffix in ARABIC_SUFFIXES:
+			if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+				token = token[:-len(suffix)]
+				break
+
+		return token
+
+	if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+		return token[:-1]
+
+	return token
+
+
+def strip_conjunction(token):
+	if token.startswith(ARABIC_CONJUNCTION) and len(token) - len(ARABIC_CONJUNCTION) >= MIN_STEM_LENGTH:
+		return token[len(ARABIC_CONJUNCTION):]
+	return token
+
+
+def tokenize(text, stem=True):
+	"""
+	Split text into normalized (and optionally stemmed) search tokens
+
+	Args:
+		text: Input text
+		stem: Apply light stemming
+
+	Returns:
+		List of tokens in document order
+	"""
+	tokens = []
+
+	for token in normalize_arabic(text).split():
+		if stem:
+			token = light_stem(token)
+		if len(token) >= 2:
+			tokens.append(token)
+
+	return tokens
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Archive Counters Module
+Keeps Archive Location current_count / available_space up to date.
+
+Archive state transitions (archive, unarchive, moving an archived letter,
+deleting it) adjust the affected locations with one atomic UPDATE each
+instead of recounting both letter tables. A daily job reconciles all
+locations against one grouped count and logs any drift to the
+`archive_counters` log.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from correspondence.correspondence.utils.archive_tables import get_letter_tables, get_stub_condition
+
+
+# Letter doctypes counted in Archive Location
+COUNTED_DOCTYPES = ["Incoming Letter", "Outgoing Letter"]
+
+
+def get_archive_state(doc):
+	"""
+	Args:
+		doc: Letter (or its version before save)
+
+	Returns:
+		Archive location the letter counts against, or None
+	"""
+	if doc and cint(doc.get("is_archived")) and doc.get("archive_location"):
+		return doc.get("archive_location")
+
+	return None
+
+
+def update_archive_counters(doc, method=None):
+	"""
+	Apply the archive state change of a letter (on_change / after_delete hook)
+
+	Args:
+		doc: Incoming or Outgoing Letter
+		method: Hook method name
+	"""
+	if method == "after_delete":
+		previous, current = get_archive_state(doc), None
+	else:
+		previous, current = get_archive_state(doc.get_doc_before_save()), get_archive_state(doc)
+
+	if previous == current:
+		return
+
+	if previous:
+		adjust_location_count(previous, -1)
+	if current:
+		adjust_location_count(current, 1)
+
+
+def adjust_location_count(location, delta):
+	"""
+	Atomically add to the count of a location
+
+	Args:
+		location: Archive Location name
+		delta: Documents added (negative when removed)
+	"""
+	# MariaDB evaluates single-table SET assignments left to right, so
+	# available_space is computed from the updated current_count
+	frappe.db.sql("""
+		UPDATE `tabArchive Location`
+		SET
+			current_count = GREATEST(IFNULL(current_count, 0) + %(delta)s, 0),
+			available_space = IFNULL(capacity, 0) - current_count
+		WHERE name = %(location)s
+	""", {"location": location, "delta": cint(delta)})
+
+
+def get_archived_counts(locations=None):
+	"""
+	Count archived letters per location in one grouped query (archive
+	tables included)
+
+	Args:
+		locations: Optional list of locations to count (default all)
+
+	Returns:
+		Dict of location -> archived letters
+	"""
+	values = {}
+	condition = ""
+
+	if locations is not None:
+		if not locations:
+			return {}
+		values["locations"] = tuple(locations)
+		condition = "AND archive_location IN %(locations)s"
+
+	branches = " UNION ALL ".join(f"""
+		SELECT archive_location, COUNT(*) AS count
+		FROM `{table}`
+		WHERE is_archived = 1 AND IFNULL(archive_location, '') != '' AND {get_stub_condition(doctype)} {condition}
+		GROUP BY archive_location
+	""" for doctype in COUNTED_DOCTYPES for table in get_letter_tables(doctype))
+
+	rows = frappe.db.sql(f"""
+		SELECT archive_location, SUM(count)
+		FROM ({branches}) AS counts
+		GROUP BY archive_location
+	""", values)
+
+	return {location: cint(count) for location, count in rows}
+
+
+def reconcile_archive_location_counts(locations=None):
+	"""
+	Verify location counts against the letter tables and fix any drift
+	(daily job)
+
+	Args:
+		locations: Optional list of locations (default all)
+
+	Returns:
+		List of corrected locations with their stored and actual counts
+	"""
+	filters = {"name": ["in", locations]} if locations else {}
+	stored = frappe.get_all("Archive Location", filters=filters, fields=["name", "capacity", "current_count", "available_space"])
+	actual = get_archived_counts(locations or None)
+	corrections = []
+
+	for location in stored:
+		count = actual.get(location.name, 0)
+		available = cint(location.capacity) - count
+
+		if cint(location.current_count) == count and cint(location.available_space) == available:
+			continue
+
+		frappe.db.sql("""
+			UPDATE `tabArchive Location`
+			SET current_count = %(count)s, available_space = %(available)s
+			WHERE name = %(location)s
+		""", {"count": count, "available": available, "location": location.name})
+
+		corrections.append({"location": location.name, "stored": cint(location.current_count), "actual": count})
+
+	if corrections:
+		frappe.logger("archive_counters", allow_site=True).warning({"corrections": corrections})
+
+	return corrections
+
+
+@frappe.whitelist()
+def reconcile_archive_locations():
+	"""
+	API endpoint to reconcile all archive location counts now
+
+	Returns:
+		Success status and the corrected locations
+	"""
+	frappe.only_for("System Manager")
+
+	return {"success": True, "corrections": reconcile_archive_location_counts()}
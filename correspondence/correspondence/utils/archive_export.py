@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Archive Export Module
+Writes archived letters to a hand-off package for the national archive.
+
+The package is a tar (optionally gzip) stream written straight to a private
+file. Each letter contributes its document as JSON, its version history,
+its signatures, its attachments and the files of its versions. Files are
+copied into the stream in fixed-size chunks while their SHA-256 is
+computed, so memory use does not depend on file or package size and no
+temporary copies are made; files in cold storage are decompressed straight
+from the cold store into the stream without being restored. manifest.jsonl (one line per member with path,
+kind, size and SHA-256) is the last member, followed by its own checksum.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now
+
+from correspondence.correspondence.utils.archive_counters import COUNTED_DOCTYPES
+from correspondence.correspondence.utils.archive_tables import get_letter_tables, retarget_query
+from correspondence.correspondence.utils.file_storage import open_file
+
+
+# Letters read per query while exporting
+EXPORT_BATCH_SIZE = 200
+
+# Progress is published every this many letters
+PROGRESS_EVERY = 50
+
+# Seconds a job status stays available to get_archive_export_status
+STATUS_TTL = 86400
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+class HashingReader:
+	"""File wrapper computing the size and SHA-256 of what is read through it"""
+
+	def __init__(self, fileobj):
+		self.fileobj = fileobj
+		self.sha256 = hashlib.sha256()
+		self.size = 0
+
+	def read(self, size=-1):
+		chunk = self.fileobj.read(size)
+		self.sha256.update(chunk)
+		self.size += len(chunk)
+		return chunk
+
+
+class CountingWriter:
+	"""Output wrapper counting and hashing the bytes of the package"""
+
+	def __init__(self, fileobj):
+		self.fileobj = fileobj
+		self.md5 = hashlib.md5()
+		self.sha256 = hashlib.sha256()
+		self.size = 0
+
+	def write(self, data):
+		self.fileobj.write(data)
+		self.md5.update(data)
+		self.sha256.update(data)
+		self.size += len(data)
+		return len(data)
+
+	def flush(self):
+		self.fileobj.flush()
+
+
+class ArchivePackageWriter:
+	"""Streams package members into a tar file and records them in the manifest"""
+
+	def __init__(self, path, compress=False):
+		"""
+		Args:
+			path: Package file path
+			compress: Gzip the stream (attachments are mostly already compressed)
+		"""
+		self.path = path
+		self.manifest_path = f"{path}.manifest"
+		self.file = open(path, "wb")
+		self.output = CountingWriter(self.file)
+		self.tar = tarfile.open(fileobj=self.output, mode="w|gz" if compress else "w|", format=tarfile.PAX_FORMAT)
+		self.manifest = open(self.manifest_path, "w", encoding="utf-8")
+		self.start = time.perf_counter()
+		self.stats = {"letters": 0, "members": 0, "files": 0, "missing_files": 0, "source_bytes": 0}
+
+	def add_bytes(self, path, data, entry):
+		"""
+		Add an in-memory member (letter JSON, version and signature lists)
+
+		Args:
+			path: Member path
+			data: Bytes
+			entry: Manifest fields describing the member
+		"""
+		reader = HashingReader(io.BytesIO(data))
+		self.tar.addfile(self.get_tarinfo(path, len(data)), reader)
+		self.record(path, reader, entry)
+
+	def add_file(self, path, file_url, entry):
+		"""
+		Stream a file into the package (cold files straight from the cold store)
+
+		Args:
+			path: Member path
+			file_url: File URL
+			entry: Manifest fields describing the member
+
+		Returns:
+			True if the file was added, False if it is missing
+		"""
+		opened = open_file(file_url)
+		if not opened:
+			self.stats["missing_files"] += 1
+			self.write_manifest({**entry, "path": None, "missing": True})
+			return False
+
+		fileobj, size = opened
+		with fileobj:
+			reader = HashingReader(fileobj)
+			self.tar.addfile(self.get_tarinfo(path, size, os.fstat(fileobj.fileno()).st_mtime), reader)
+
+		self.stats["files"] += 1
+		self.record(path, reader, entry)
+		return True
+
+	def get_tarinfo(self, path, size, mtime=None):
+		tarinfo = tarfile.TarInfo(path)
+		tarinfo.size = size
+		tarinfo.mtime = int(mtime or time.time())
+		tarinfo.mode = 0o644
+		return tarinfo
+
+	def record(self, path, reader, entry):
+		self.stats["members"] += 1
+		self.stats["source_bytes"] += reader.size
+		self.write_manifest({**entry, "path": path, "size": reader.size, "sha256": reader.sha256.hexdigest()})
+
+	def write_manifest(self, entry):
+		self.manifest.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+	def get_metrics(self):
+		"""
+		Returns:
+			Counters with elapsed time and throughput
+		"""
+		elapsed = time.perf_counter() - self.start
+		return {
+			**self.stats,
+			"package_bytes": self.output.size,
+			"elapsed_s": flt(elapsed, 2),
+			"mb_per_s": flt(self.stats["source_bytes"] / 1048576 / elapsed, 2) if elapsed else 0,
+			"letters_per_s": flt(self.stats["letters"] / elapsed, 2) if elapsed else 0,
+		}
+
+	def close(self):
+		"""
+		Append the manifest and its checksum and finish the package
+
+		Returns:
+			Dict with the package size, MD5 and SHA-256
+		"""
+		self.manifest.close()
+
+		with open(self.manifest_path, "rb") as f:
+			reader = HashingReader(f)
+			self.tar.addfile(self.get_tarinfo(MANIFEST_NAME, os.path.getsize(self.manifest_path)), reader)
+
+		checksum = f"{reader.sha256.hexdigest()}  {MANIFEST_NAME}\n".encode("utf-8")
+		self.tar.addfile(self.get_tarinfo(f"{MANIFEST_NAME}.sha256", len(checksum)), io.BytesIO(checksum))
+
+		self.tar.close()
+		self.file.close()
+		os.remove(self.manifest_path)
+
+		return {"size": self.output.size, "md5": self.output.md5.hexdigest(), "sha256": self.output.sha256.hexdigest()}
+
+	def abort(self):
+		"""Close and delete a partial package"""
+		# Flush the tar stream now; left open, it writes to the closed file
+		# when garbage collected
+		try:
+			self.tar.close()
+		except Exception:
+			pass
+
+		for fileobj in (self.manifest, self.file):
+			if not fileobj.closed:
+				fileobj.close()
+
+		for path in (self.path, self.manifest_path):
+			if os.path.exists(path):
+				os.remove(path)
+
+
+def get_export_filters(from_date=None, to_date=None, archive_location=None):
+	"""
+	Args:
+		from_date: Archived on or after
+		to_date: Archived on or before
+		archive_location: Archive location
+
+	Returns:
+		List of get_all filters selecting archived letters
+	"""
+	# Moved letters are read from their archive table, not their stub
+	filters = [["is_archived", "=", 1], ["archive_table", "is", "not set"]]
+
+	if from_date:
+		filters.append(["archived_on", ">=", from_date])
+	if to_date:
+		filters.append(["archived_on", "<=", f"{to_date} 23:59:59.999999"])
+	if archive_location:
+		filters.append(["archive_location", "=", archive_location])
+
+	return filters
+
+
+def iter_export_names(doctype, filters, names=None, table=None):
+	"""
+	Yield the names of the letters to export in batches
+
+	Args:
+		doctype: Letter doctype
+		filters: Filters from get_export_filters
+		names: Optional explicit names (still restricted by filters)
+		table: Letter table to read (default the main table; see
+			archive_tables.get_letter_tables)
+
+	Yields:
+		Lists of names
+	"""
+	last_name = ""
+
+	while True:
+		batch_filters = filters + [["name", ">", last_name]]
+		if names is not None:
+			batch_filters.append(["name", "in", names])
+
+		query = frappe.get_all(doctype, filters=batch_filters, fields=["name"], order_by="name asc", limit=EXPORT_BATCH_SIZE, run=0)
+		batch = frappe.db.sql_list(retarget_query(doctype, query, table or f"tab{doctype}"))
+		if not batch:
+			return
+
+		yield batch
+		last_name = batch[-1]
+
+
+def export_letter(writer, doctype, name):
+	"""
+	Write one letter with its attachments, versions and signatures
+
+	Args:
+		writer: ArchivePackageWriter
+		doctype: Letter doctype
+		name: Letter name
+	"""
+	doc = frappe.get_doc(doctype, name)
+	folder = f"{frappe.scrub(doctype)}/{name}"
+	entry = {"doctype": doctype, "name": name}
+
+	writer.add_bytes(f"{folder}/letter.json", frappe.as_json(doc.as_dict()).encode("utf-8"), {**entry, "kind": "letter"})
+
+	exported = set()
+	for attachment in doc.get("attachments") or []:
+		if not attachment.file or attachment.file in exported:
+			continue
+		exported.add(attachment.file)
+		writer.add_file(
+			f"{folder}/attachments/{attachment.idx:03d}-{os.path.basename(attachment.file)}",
+			attachment.file,
+			{**entry, "kind": "attachment", "source": attachment.file, "is_original": cint(attachment.is_original)}
+		)
+
+	versions = frappe.get_all(
+		"Document Version",
+		filters={"reference_doctype": doctype, "reference_name": name},
+		fields=["name", "version_number", "is_current", "editor", "created_on", "changes_summary",
+		        "original_file", "working_copy", "file_hash"],
+		order_by="version_number asc"
+	)
+	writer.add_bytes(f"{folder}/versions.json", frappe.as_json(versions).encode("utf-8"), {**entry, "kind": "versions"})
+
+	for version in versions:
+		for field in ("original_file", "working_copy"):
+			file_url = version.get(field)
+			if not file_url or file_url in exported:
+				continue
+			exported.add(file_url)
+			writer.add_file(
+				f"{folder}/versions/{version.version_number}-{field}-{os.path.basename(file_url)}",
+				file_url,
+				{**entry, "kind": "version_file", "source": file_url, "version_number": version.version_number}
+			)
+
+	signatures = frappe.get_all(
+		"Document Signature",
+		filters={"document_type": doctype, "document_name": name},
+		fields=["signer", "signature_date", "document_hash", "signature"],
+		order_by="signature_date asc"
+	)
+	writer.add_bytes(f"{folder}/signatures.json", frappe.as_json(signatures).encode("utf-8"), {**entry, "kind": "signatures"})
+
+	writer.stats["letters"] += 1
+
+
+def enqueue_archive_export(doctypes=None, from_date=None, to_date=None, archive_location=None, names=None, compress=False):
+	"""
+	Validate an export request and queue it as a background job
+
+	Args:
+		doctypes: Letter doctypes (default both)
+		from_date: Archived on or after
+		to_date: Archived on or before
+		archive_location: Archive location
+		names: Optional explicit letter names
+		compress: Gzip the package
+
+	Returns:
+		Dict with success and job_id
+	"""
+	doctypes = doctypes or COUNTED_DOCTYPES
+	for doctype in doctypes:
+		if doctype not in COUNTED_DOCTYPES:
+			frappe.throw(_("{0} documents cannot be exported").format(doctype))
+		if not frappe.has_permission(doctype, "export"):
+			frappe.throw(_("Not permitted to export {0}").format(_(doctype)), frappe.PermissionError)
+
+	job_id = f"archive_export::{frappe.generate_hash(length=10)}"
+
+	frappe.enqueue(
+		"correspondence.correspondence.utils.archive_export.run_archive_export",
+		queue="long",
+		timeout=6 * 3600,
+		job_id=job_id,
+		doctypes=doctypes,
+		from_date=from_date,
+		to_date=to_date,
+		archive_location=archive_location,
+		names=names,
+		compress=cint(compress),
+		job_key=job_id
+	)
+
+	set_export_status(job_id, {"status": "Queued"})
+	return {"success": True, "job_id": job_id}
+
+
+def run_archive_export(doctypes, from_date=None, to_date=None, archive_location=None, names=None, compress=False, job_key=None):
+	"""
+	Write the export package (background job)
+
+	Args:
+		doctypes: Letter doctypes
+		from_date: Archived on or after
+		to_date: Archived on or before
+		archive_location: Archive location
+		names: Optional explicit letter names
+		compress: Gzip the package
+		job_key: Job id under which progress and the result are published
+
+	Returns:
+		Dict with the package file URL, checksums and throughput metrics
+	"""
+	filters = get_export_filters(from_date, to_date, archive_location)
+	count_filters = filters + ([["name", "in", names]] if names is not None else [])
+	tables = {doctype: get_letter_tables(doctype, from_date, to_date) for doctype in doctypes}
+	total = sum(
+		cint(frappe.db.sql(retarget_query(
+			doctype, frappe.get_all(doctype, filters=count_filters, fields=["count(*) as count"], run=0), table
+		))[0][0])
+		for doctype in doctypes for table in tables[doctype]
+	)
+
+	file_name = f"archive-export-{now()[:10]}-{frappe.generate_hash(length=8)}.tar{'.gz' if compress else ''}"
+	writer = ArchivePackageWriter(frappe.get_site_path("private", "files", file_name), compress=compress)
+	set_export_status(job_key, {"status": "Running", "total": total, **writer.get_metrics()})
+
+	try:
+		for doctype in doctypes:
+			for table in tables[doctype]:
+				for batch in iter_export_names(doctype, filters, names, table):
+					for name in batch:
+						export_letter(writer, doctype, name)
+
+						if writer.stats["letters"] % PROGRESS_EVERY == 0:
+							publish_export_progress(job_key, total, writer.get_metrics())
+
+		metrics = writer.get_metrics()
+		package = writer.close()
+
+	except Exception as e:
+		writer.abort()
+		frappe.log_error(f"Archive export failed: {str(e)}")
+		set_export_status(job_key, {"status": "Failed", "error": str(e)})
+		raise
+
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"file_url": f"/private/files/{file_name}",
+		"is_private": 1,
+		"file_size": package["size"],
+		"content_hash": package["md5"]
+	})
+	file_doc.insert(ignore_permissions=True)
+	frappe.db.commit()
+
+	result = {
+		"status": "Completed",
+		"file_url": file_doc.file_url,
+		"sha256": package["sha256"],
+		"total": total,
+		**metrics,
+		"package_bytes": package["size"]
+	}
+
+	frappe.logger("archive_export", allow_site=True).info({"job_id": job_key, "user": frappe.session.user, **result})
+	set_export_status(job_key, result)
+	frappe.publish_realtime("archive_export_progress", {"job_id": job_key, **result}, user=frappe.session.user)
+
+	return result
+
+
+def publish_export_progress(job_key, total, metrics):
+	"""
+	Publish export progress and throughput to the user who queued the job
+
+	Args:
+		job_key: Job id
+		total: Letters to export
+		metrics: Writer metrics
+	"""
+	progress = {
+		"status": "Running",
+		"total": total,
+		"percent": round(metrics["letters"] * 100 / total, 1) if total else 100,
+		**metrics
+	}
+
+	frappe.publish_realtime("archive_export_progress", {"job_id": job_key, **progress}, user=frappe.session.user)
+	set_export_status(job_key, progress)
+
+
+def set_export_status(job_key, status):
+	"""
+	Store the status of an export job
+
+	Args:
+		job_key: Job id
+		status: Status dict
+	"""
+	if job_key:
+		status = {**status, "user": frappe.session.user}
+		frappe.cache().set_value(f"archive_export_status::{job_key}", status, expires_in_sec=STATUS_TTL)
+
+
+def get_export_status(job_key):
+	"""
+	Args:
+		job_key: Job id
+
+	Returns:
+		Status dict, or None if unknown or expired
+	"""
+	return frappe.cache().get_value(f"archive_export_status::{job_key}")
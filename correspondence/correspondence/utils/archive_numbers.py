@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Archive Numbers Module
+Allocates ARCH-YYYY-MM-##### archive numbers from monthly sequences.
+
+Each month has a MariaDB SEQUENCE (increment 1) whose NEXTVAL issues the
+next number. NEXTVAL is not part of the caller's transaction, so concurrent
+archivers never wait for each other's commit the way they do on the
+tabSeries row lock of make_autoname, and numbers are issued in increasing
+order per month. Bulk jobs reserve the numbers of a whole batch in one
+statement. Numbers of a rolled back transaction are left as gaps, as with
+any database sequence.
+
+Sequences are created by the migrate patch and the daily
+ensure_archive_number_sequences job only (DDL commits the open
+transaction); archiving fails if the month's sequence is missing.
+"""
+
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import add_months, cint, flt, getdate, today
+
+
+# Same format as make_autoname("ARCH-.YYYY.-.MM.-.#####")
+ARCHIVE_NUMBER_DIGITS = 5
+
+# Reservations slower than this many milliseconds count as contended
+SLOW_RESERVATION_MS = 50
+
+STATS_KEY = "archive_number_stats"
+
+
+def get_archive_number(date=None):
+	"""
+	Next archive number of the month's series
+
+	Args:
+		date: Archive date (default today)
+
+	Returns:
+		Archive number
+	"""
+	return reserve_archive_numbers(1, date)[0]
+
+
+def reserve_archive_numbers(count, date=None):
+	"""
+	Reserve archive numbers for a bulk job in one statement
+
+	Args:
+		count: Numbers needed
+		date: Archive date (selects the monthly series, default today)
+
+	Returns:
+		List of archive numbers in ascending order
+	"""
+	prefix = get_archive_prefix(date)
+	numbers = reserve_block(prefix, count)
+
+	record_stats({"numbers_issued": len(numbers)})
+	return [format_archive_number(prefix, number) for number in numbers]
+
+
+def get_archive_prefix(date=None):
+	"""
+	Args:
+		date: Archive date (default today)
+
+	Returns:
+		Series prefix such as ARCH-2025-11-
+	"""
+	return f"ARCH-{getdate(date or today()).strftime('%Y-%m')}-"
+
+
+def format_archive_number(prefix, number):
+	return f"{prefix}{number:0{ARCHIVE_NUMBER_DIGITS}d}"
+
+
+def get_sequence_name(prefix):
+	"""
+	Args:
+		prefix: Series prefix
+
+	Returns:
+		Sequence name such as archive_number_2025_11_seq
+	"""
+	year, month = prefix.split("-")[1:3]
+	return f"archive_number_{cint(year)}_{cint(month):02d}_seq"
+
+
+def reserve_block(prefix, count=1):
+	"""
+	Take the next numbers of a month's series
+
+	Args:
+		prefix: Series prefix
+		count: Numbers needed
+
+	Returns:
+		List of numbers in ascending order (increasing, but not necessarily
+		consecutive when other workers take numbers at the same time)
+	"""
+	sequence = get_sequence_name(prefix)
+	start = time.perf_counter()
+
+	try:
+		if cint(count) <= 1:
+			numbers = frappe.db.sql_list(f"SELECT NEXTVAL(`{sequence}`)")
+		else:
+			numbers = frappe.db.sql_list(f"""
+				WITH RECURSIVE numbers (i) AS (
+					SELECT 1 UNION ALL SELECT i + 1 FROM numbers WHERE i < %(count)s
+				)
+				SELECT NEXTVAL(`{sequence}`) FROM numbers
+			""", {"count": cint(count)})
+	except Exception as e:
+		if not frappe.db.is_table_missing(e):
+			raise
+		frappe.throw(
+			_("Archive number sequence {0} is missing. Run bench migrate or the daily archive number job to create it.").format(sequence)
+		)
+
+	elapsed_us = int((time.perf_counter() - start) * 1000000)
+	record_stats({
+		"reservations": 1,
+		"reserve_us": elapsed_us,
+		"slow_reservations": 1 if elapsed_us >= SLOW_RESERVATION_MS * 1000 else 0
+	})
+
+	return sorted(cint(number) for number in numbers)
+
+
+def create_archive_number_sequence(prefix):
+	"""
+	Create a month's sequence, continuing after numbers already issued by
+	the tabSeries counter of make_autoname
+
+	DDL commits the open transaction, so this only runs from the migrate
+	patch and the daily ensure_archive_number_sequences job.
+
+	Args:
+		prefix: Series prefix
+	"""
+	current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s", (prefix,))
+	start = cint(current[0][0]) + 1 if current else 1
+
+	frappe.db.sql_ddl(f"""
+		CREATE SEQUENCE IF NOT EXISTS `{get_sequence_name(prefix)}`
+		START WITH {start} INCREMENT BY 1 MINVALUE 1 NOCACHE
+	""")
+
+
+def ensure_archive_number_sequences():
+	"""Create the sequences of the current and the next month (daily job)"""
+	for date in (today(), add_months(today(), 1)):
+		prefix = get_archive_prefix(date)
+		exists = frappe.db.sql("""
+			SELECT 1 FROM information_schema.tables
+			WHERE table_schema = DATABASE() AND table_name = %s AND table_type = 'SEQUENCE'
+		""", (get_sequence_name(prefix),))
+
+		if not exists:
+			create_archive_number_sequence(prefix)
+
+
+def record_stats(counters):
+	"""
+	Add to the archive number counters
+
+	Args:
+		counters: Dict of counter -> increment
+	"""
+	cache = frappe.cache()
+	key = cache.make_key(STATS_KEY)
+
+	for counter, increment in counters.items():
+		if increment:
+			cache.hincrby(key, counter, increment)
+
+
+@frappe.whitelist()
+def get_archive_number_stats(reset=False):
+	"""
+	API endpoint returning archive number sequence contention metrics
+
+	Args:
+		reset: Reset the counters after reading them
+
+	Returns:
+		Reservations, their average time and the number of slow (contended)
+		ones, and numbers issued
+	"""
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	key = cache.make_key(STATS_KEY)
+	# HINCRBY counters are plain integers; RedisWrapper.hgetall would unpickle them
+	counters = {frappe.safe_decode(field): cint(value) for field, value in (cache.execute_command("HGETALL", key) or {}).items()}
+
+	reservations = counters.get("reservations", 0)
+	stats = {
+		"reservations": reservations,
+		"avg_reserve_ms": flt(counters.get("reserve_us", 0) / reservations / 1000, 3) if reservations else 0,
+		"slow_reservations": counters.get("slow_reservations", 0),
+		"numbers_issued": counters.get("numbers_issued", 0),
+	}
+
+	if cint(reset):
+		cache.delete(key)
+
+	return {"success": True, "stats": stats}
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Archive Statistics Module
+Maintains the Archive Statistic summary behind get_archive_statistics.
+
+Each archived letter counts once in the Total row and in the rows of its
+department, archive location and archive year. Archive state changes apply
+their difference as atomic increments; a nightly job recounts the letter
+tables and writes the totals over the rows while holding their locks (so
+increments made meanwhile are applied on top of the new totals, not lost)
+and records when it did, so the endpoint can report how fresh its figures
+are.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import cint, get_datetime, getdate, now, now_datetime
+
+from correspondence.correspondence.utils.archive_counters import COUNTED_DOCTYPES
+from correspondence.correspondence.utils.archive_tables import get_letter_tables, get_stub_condition
+
+
+# Dimension -> letter column (Total counts every archived letter)
+STATISTIC_DIMENSIONS = {
+	"Department": "department",
+	"Location": "archive_location",
+	"Year": "archived_on",
+}
+
+REBUILT_ON_KEY = "archive_statistics_rebuilt_on"
+
+# Figures not rebuilt for this long are reported as stale
+STALE_AFTER_HOURS = 36
+
+
+def get_statistic_name(dimension, value):
+	return hashlib.md5(f"{dimension}\n{value}".encode("utf-8")).hexdigest()
+
+
+def get_statistic_keys(doc):
+	"""
+	Statistic rows an archived letter counts in
+
+	Args:
+		doc: Letter, its version before save, or a dict with the letter columns
+
+	Returns:
+		List of (dimension, value); empty if the letter is not archived
+	"""
+	if not doc or not cint(doc.get("is_archived")):
+		return []
+
+	keys = [("Total", "")]
+
+	for dimension, field in STATISTIC_DIMENSIONS.items():
+		value = doc.get(field)
+		if value and dimension == "Year":
+			value = str(getdate(value).year)
+		if value:
+			keys.append((dimension, value))
+
+	return keys
+
+
+def update_archive_statistics(doc, method=None):
+	"""
+	Apply the archive state change of a letter (on_change / after_delete hook)
+
+	Args:
+		doc: Incoming or Outgoing Letter
+		method: Hook method name
+	"""
+	if method == "after_delete":
+		previous, current = get_statistic_keys(doc), []
+	else:
+		previous, current = get_statistic_keys(doc.get_doc_before_save()), get_statistic_keys(doc)
+
+	deltas = {}
+	for key in previous:
+		deltas[key] = deltas.get(key, 0) - 1
+	for key in current:
+		deltas[key] = deltas.get(key, 0) + 1
+
+	apply_statistic_deltas(deltas)
+
+
+def add_archived_rows(rows):
+	"""
+	Count letters archived without document hooks (bulk archive)
+
+	Args:
+		rows: Dicts with the STATISTIC_DIMENSIONS columns of the archived letters
+	"""
+	deltas = {}
+
+	for row in rows:
+		for key in get_statistic_keys({**row, "is_archived": 1}):
+			deltas[key] = deltas.get(key, 0) + 1
+
+	apply_statistic_deltas(deltas)
+
+
+def apply_statistic_deltas(deltas):
+	"""
+	Add to statistic rows, creating and dropping rows as needed
+
+	Args:
+		deltas: Dict of (dimension, value) -> increment
+	"""
+	deltas = {key: delta for key, delta in deltas.items() if delta}
+	if not deltas:
+		return
+
+	upsert_statistics(deltas, "count + VALUES(count)")
+
+	decreased = [get_statistic_name(*key) for key, delta in deltas.items() if delta < 0]
+	if decreased:
+		frappe.db.sql("""
+			DELETE FROM `tabArchive Statistic`
+			WHERE name IN %(names)s AND count <= 0
+		""", {"names": tuple(decreased)})
+
+
+def upsert_statistics(counts, update):
+	"""
+	Insert statistic rows or update the existing ones
+
+	Args:
+		counts: Dict of (dimension, value) -> count
+		update: SQL expression for the count of an existing row
+	"""
+	timestamp = now()
+	user = frappe.session.user
+	placeholders = []
+	values = []
+
+	for (dimension, value), count in counts.items():
+		placeholders.append("(%s, %s, %s, %s, %s, %s, %s, %s, 0, 0)")
+		values += [get_statistic_name(dimension, value), dimension, value, count, timestamp, timestamp, user, user]
+
+	frappe.db.sql(f"""
+		INSERT INTO `tabArchive Statistic`
+			(name, dimension, value, count, creation, modified, owner, modified_by, docstatus, idx)
+		VALUES {', '.join(placeholders)}
+		ON DUPLICATE KEY UPDATE
+			count = {update},
+			modified = VALUES(modified),
+			modified_by = VALUES(modified_by)
+	""", values)
+
+
+def rebuild_archive_statistics():
+	"""
+	Recount the Archive Statistic rows from the letter tables (nightly job)
+
+	The statistic rows (and the gaps between them) are locked before the
+	letters are counted. Archivers that applied an increment before that are
+	waited for and counted; the others wait for the rebuild to commit and
+	then apply their increment to the new totals.
+	"""
+	# Start a fresh transaction so the count reads the letters as of the lock
+	frappe.db.commit()
+	frappe.db.sql("SELECT name FROM `tabArchive Statistic` FOR UPDATE")
+
+	branches = " UNION ALL ".join(f"""
+		SELECT department, archive_location, YEAR(archived_on) AS year
+		FROM `{table}`
+		WHERE is_archived = 1 AND {get_stub_condition(doctype)}
+	""" for doctype in COUNTED_DOCTYPES for table in get_letter_tables(doctype))
+
+	rows = frappe.db.sql(f"""
+		SELECT department, archive_location, year, COUNT(*) AS count
+		FROM ({branches}) AS archived
+		GROUP BY department, archive_location, year
+	""", as_dict=True)
+
+	totals = {}
+	for row in rows:
+		for key in get_statistic_keys({
+			"is_archived": 1,
+			"department": row.department,
+			"archive_location": row.archive_location,
+			"archived_on": f"{row.year}-01-01" if row.year else None,
+		}):
+			totals[key] = totals.get(key, 0) + cint(row.count)
+
+	if totals:
+		upsert_statistics(totals, "VALUES(count)")
+		frappe.db.sql(
+			"DELETE FROM `tabArchive Statistic` WHERE name NOT IN %(names)s",
+			{"names": tuple(get_statistic_name(*key) for key in totals)}
+		)
+	else:
+		frappe.db.delete("Archive Statistic")
+
+	frappe.db.set_global(REBUILT_ON_KEY, now())
+	frappe.db.commit()
+
+
+@frappe.whitelist()
+def queue_archive_statistics_rebuild():
+	"""
+	API endpoint to rebuild the archive statistics now
+
+	Returns:
+		Success status
+	"""
+	frappe.only_for("System Manager")
+
+	enqueue_rebuild()
+	return {"success": True, "message": "Archive statistics rebuild queued"}
+
+
+def enqueue_rebuild():
+	frappe.enqueue(
+		"correspondence.correspondence.utils.archive_statistics.rebuild_archive_statistics",
+		queue="long",
+		timeout=3600,
+		job_id="archive_statistics::rebuild",
+		deduplicate=True
+	)
+
+
+def get_archive_summary():
+	"""
+	Read the archive statistics summary
+
+	Returns:
+		Dict with total_archived, by_department, by_location, by_year,
+		updated_on, rebuilt_on and stale
+	"""
+	rows = frappe.db.sql("""
+		SELECT dimension, value, count, modified
+		FROM `tabArchive Statistic`
+		ORDER BY count DESC, value DESC
+	""", as_dict=True)
+
+	stats = {"total_archived": 0, "by_department": [], "by_location": [], "by_year": []}
+	updated_on = None
+
+	for row in rows:
+		if row.dimension == "Total":
+			stats["total_archived"] = cint(row.count)
+		elif row.dimension == "Department":
+			stats["by_department"].append({"department": row.value, "count": cint(row.count)})
+		elif row.dimension == "Location":
+			stats["by_location"].append({"archive_location": row.value, "count": cint(row.count)})
+		elif row.dimension == "Year":
+			stats["by_year"].append({"year": cint(row.value), "count": cint(row.count)})
+
+		if not updated_on or row.modified > updated_on:
+			updated_on = row.modified
+
+	stats["by_year"].sort(key=lambda row: row["year"], reverse=True)
+
+	rebuilt_on = frappe.db.get_global(REBUILT_ON_KEY)
+	age_hours = (now_datetime() - get_datetime(rebuilt_on)).total_seconds() / 3600 if rebuilt_on else None
+
+	stats["updated_on"] = str(updated_on) if updated_on else None
+	stats["rebuilt_on"] = rebuilt_on
+	stats["stale"] = age_hours is None or age_hours > STALE_AFTER_HOURS
+
+	if not rebuilt_on:
+		enqueue_rebuild()
+
+	return stats
@@ -0,0 +1,561 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Archive Tables Module
+Moves letters archived in past years out of the main letter tables.
+
+Native MariaDB partitioning does not fit the letter tables: every unique
+key (name, letter_number) would have to include the partitioning column,
+and partitioned InnoDB tables cannot have the FULLTEXT search indexes.
+Instead, with `archive_tables_enabled` set in site config, a monthly job
+moves the letters archived before the last `archive_tables_keep_years`
+(default 2) years into one table per doctype and archive year, such as
+archive_incoming_letter_2023. The tables are created LIKE the letter table
+(same columns and indexes); child rows (attachments, topics) stay where
+they are.
+
+A moved letter leaves a stub in the main table: the same row without its
+long text columns, with `archive_table` naming the table that holds the
+full row. Links, the list view and frappe.get_doc keep working (the letter
+controllers load the full row), and the large columns leave the main table
+and its indexes. Readers that union the archive tables skip the stubs
+(get_stub_condition); the archive tables never hold stubs.
+
+Every table is registered in Letter Archive Table with the range of its
+letter dates, so readers only add the tables that can match their date
+filters (get_letter_tables). The archive_<doctype>_all view unions the main
+table with all of its archive tables for ad hoc queries.
+
+Moved letters are read-only; restore_archived_letters moves them back so
+they can be edited, cancelled or unarchived. Restored letters stay archived
+but are marked keep_in_main_table, so the monthly job does not move them
+out again.
+"""
+
+import json
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate, now, today
+
+
+# Letter doctypes that can be moved to archive tables -> letter date (the
+# date filtered by the register reports)
+LETTER_DATE_FIELDS = {
+	"Incoming Letter": "date_received",
+	"Outgoing Letter": "date_created",
+}
+
+ARCHIVE_TABLE_DOCTYPES = list(LETTER_DATE_FIELDS)
+
+DEFAULT_KEEP_YEARS = 2
+
+# Letters moved per transaction
+MOVE_BATCH_SIZE = 1000
+
+REGISTRY_CACHE_KEY = "letter_archive_tables"
+
+RESTORE_SAVEPOINT = "restore_archived_letters"
+
+# Columns of these types are left out of the stubs
+STUB_CLEARED_FIELDTYPES = ("Small Text", "Text", "Long Text", "Text Editor", "HTML Editor", "Markdown Editor", "Code", "JSON")
+
+
+def is_archive_tables_enabled():
+	return cint(frappe.conf.get("archive_tables_enabled"))
+
+
+def get_archive_table_name(doctype, year):
+	return f"archive_{frappe.scrub(doctype)}_{cint(year)}"
+
+
+def get_archive_view_name(doctype):
+	return f"archive_{frappe.scrub(doctype)}_all"
+
+
+def get_registered_tables(doctype):
+	"""
+	Args:
+		doctype: Letter doctype
+
+	Returns:
+		Letter Archive Table rows of the doctype, newest year first (cached)
+	"""
+	if doctype not in ARCHIVE_TABLE_DOCTYPES:
+		return []
+
+	def _load():
+		return frappe.get_all(
+			"Letter Archive Table",
+			filters={"reference_doctype": doctype},
+			fields=["table_name", "archive_year", "from_date", "to_date", "row_count"],
+			order_by="archive_year desc"
+		)
+
+	return frappe.cache().hget(REGISTRY_CACHE_KEY, doctype, generator=_load)
+
+
+def clear_registry_cache(doctype):
+	frappe.cache().hdel(REGISTRY_CACHE_KEY, doctype)
+
+
+def get_archive_tables(doctype, from_date=None, to_date=None, date_field="archived_on"):
+	"""
+	Archive tables of a doctype that can hold letters in a date range
+
+	Args:
+		doctype: Letter doctype
+		from_date: Range start (inclusive)
+		to_date: Range end (inclusive)
+		date_field: "archived_on" or the letter date field of the doctype;
+			ranges on other fields do not prune
+
+	Returns:
+		List of table names, newest year first
+	"""
+	from_date = getdate(from_date) if from_date else None
+	to_date = getdate(to_date) if to_date else None
+	tables = []
+
+	for table in get_registered_tables(doctype):
+		if date_field == "archived_on":
+			first, last = getdate(f"{table.archive_year}-01-01"), getdate(f"{table.archive_year}-12-31")
+		elif date_field == LETTER_DATE_FIELDS.get(doctype):
+			first, last = table.from_date, table.to_date
+		else:
+			first = last = None
+
+		if from_date and last and from_date > getdate(last):
+			continue
+		if to_date and first and to_date < getdate(first):
+			continue
+
+		tables.append(table.table_name)
+
+	return tables
+
+
+def get_letter_tables(doctype, from_date=None, to_date=None, date_field="archived_on"):
+	"""
+	The main table of a doctype followed by the archive tables that can
+	hold letters in a date range (see get_archive_tables)
+
+	Returns:
+		List of table names
+	"""
+	return [f"tab{doctype}", *get_archive_tables(doctype, from_date, to_date, date_field)]
+
+
+def retarget_query(doctype, query, table):
+	"""
+	Point a statement written for the main letter table (such as the SQL of
+	frappe.get_all(..., run=0)) at another table with the same columns
+
+	Args:
+		doctype: Letter doctype
+		query: SQL using `tab<doctype>`
+		table: Table name
+
+	Returns:
+		SQL
+	"""
+	return query.replace(f"`tab{doctype}`", f"`{table}`")
+
+
+def get_stub_condition(doctype, alias=None):
+	"""
+	Condition skipping the stubs of moved letters, for readers of the main
+	table that also read the archive tables
+
+	Args:
+		doctype: Letter doctype
+		alias: Table alias to qualify the column with
+
+	Returns:
+		SQL condition (always true for doctypes without archive tables)
+	"""
+	if doctype not in ARCHIVE_TABLE_DOCTYPES:
+		return "1=1"
+
+	return f"{alias + '.' if alias else ''}`archive_table` IS NULL"
+
+
+def get_stub_filters(doctype):
+	"""
+	Returns:
+		frappe.get_all filters equivalent to get_stub_condition
+	"""
+	return [["archive_table", "is", "not set"]] if doctype in ARCHIVE_TABLE_DOCTYPES else []
+
+
+def get_stub_cleared_columns(doctype):
+	"""
+	Args:
+		doctype: Letter doctype
+
+	Returns:
+		Columns left out of the stub of a moved letter
+	"""
+	return [df.fieldname for df in frappe.get_meta(doctype).fields if df.fieldtype in STUB_CLEARED_FIELDTYPES]
+
+
+def load_archived_row(doc):
+	"""
+	Fill the columns left out of a stub from the letter's archive table
+	(called from the letter controllers' load_from_db)
+
+	Args:
+		doc: Letter loaded from the main table
+	"""
+	table = doc.get("archive_table")
+	if not table or table not in get_archive_tables(doc.doctype):
+		return
+
+	rows = frappe.db.sql(f"SELECT * FROM `{table}` WHERE `name` = %s", doc.name, as_dict=True)
+	if not rows:
+		return
+
+	for column in get_stub_cleared_columns(doc.doctype):
+		doc.set(column, rows[0].get(column))
+
+
+def check_not_moved(doc):
+	"""
+	Refuse to change a letter whose full row lives in an archive table
+
+	Args:
+		doc: Letter
+	"""
+	if doc.get("archive_table"):
+		frappe.throw(
+			_("{0} {1} has been moved to an archive table. Restore it before changing it.").format(_(doc.doctype), doc.name)
+		)
+
+
+def get_table_columns(table):
+	"""
+	Args:
+		table: Table name
+
+	Returns:
+		List of (column name, column type) in table order
+	"""
+	return frappe.db.sql("""
+		SELECT column_name, column_type
+		FROM information_schema.columns
+		WHERE table_schema = DATABASE() AND table_name = %s
+		ORDER BY ordinal_position
+	""", table)
+
+
+def get_column_list(doctype):
+	return ", ".join(f"`{column}`" for column, column_type in get_table_columns(f"tab{doctype}"))
+
+
+def ensure_archive_table(doctype, table):
+	"""
+	Create an archive table LIKE the letter table and bring its columns up
+	to date (DDL commits the open transaction)
+
+	Args:
+		doctype: Letter doctype
+		table: Archive table name
+	"""
+	frappe.db.sql_ddl(f"CREATE TABLE IF NOT EXISTS `{table}` LIKE `tab{doctype}`")
+	sync_archive_table_columns(doctype, table)
+
+
+def sync_archive_table_columns(doctype, table):
+	"""
+	Add the letter table columns an archive table lacks and follow column
+	type changes
+
+	Args:
+		doctype: Letter doctype
+		table: Archive table name
+	"""
+	existing = dict(get_table_columns(table))
+
+	for column, column_type in get_table_columns(f"tab{doctype}"):
+		if column not in existing:
+			frappe.db.sql_ddl(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {column_type} NULL")
+		elif existing[column] != column_type and column != "name":
+			frappe.db.sql_ddl(f"ALTER TABLE `{table}` MODIFY COLUMN `{column}` {column_type}")
+
+
+def create_archive_view(doctype):
+	"""
+	(Re)create the view over the main table and all archive tables of a
+	doctype
+
+	Args:
+		doctype: Letter doctype
+	"""
+	columns = get_column_list(doctype)
+	selects = [f"SELECT {columns} FROM `{table}` WHERE {get_stub_condition(doctype)}" for table in get_letter_tables(doctype)]
+
+	frappe.db.sql_ddl(f"CREATE OR REPLACE VIEW `{get_archive_view_name(doctype)}` AS {' UNION ALL '.join(selects)}")
+
+
+def sync_archive_tables():
+	"""Follow letter table schema changes in the archive tables and views (after_migrate)"""
+	for doctype in ARCHIVE_TABLE_DOCTYPES:
+		clear_registry_cache(doctype)
+		tables = get_archive_tables(doctype)
+
+		for table in tables:
+			sync_archive_table_columns(doctype, table)
+
+		if tables:
+			create_archive_view(doctype)
+
+
+def move_due_archive_years():
+	"""Move letters archived before the kept years to archive tables (monthly job)"""
+	if not is_archive_tables_enabled():
+		return
+
+	keep_years = max(cint(frappe.conf.get("archive_tables_keep_years") or DEFAULT_KEEP_YEARS), 1)
+	before = f"{getdate(today()).year - keep_years + 1}-01-01"
+
+	for doctype in ARCHIVE_TABLE_DOCTYPES:
+		years = frappe.db.sql_list(f"""
+			SELECT DISTINCT YEAR(`archived_on`)
+			FROM `tab{doctype}`
+			WHERE `is_archived` = 1 AND `archived_on` < %s AND `keep_in_main_table` = 0
+		""", before)
+
+		for year in sorted(years):
+			move_archive_year(doctype, year)
+
+
+def move_archive_year(doctype, year):
+	"""
+	Move the letters of a doctype archived in a year to its archive table
+
+	Each batch is copied and reduced to stubs in one transaction, so a
+	letter's full row is always in exactly one table.
+
+	Args:
+		doctype: Letter doctype
+		year: Archive year
+
+	Returns:
+		Letters moved
+	"""
+	if doctype not in ARCHIVE_TABLE_DOCTYPES:
+		frappe.throw(_("{0} cannot be moved to archive tables").format(_(doctype)))
+
+	table = get_archive_table_name(doctype, year)
+	ensure_archive_table(doctype, table)
+
+	columns = get_column_list(doctype)
+	cleared = ", ".join(f"`{column}` = NULL" for column in get_stub_cleared_columns(doctype))
+	values = {"start": f"{cint(year)}-01-01", "end": f"{cint(year) + 1}-01-01", "table": table}
+	moved = 0
+	start = time.perf_counter()
+
+	while True:
+		names = frappe.db.sql_list(f"""
+			SELECT `name`
+			FROM `tab{doctype}`
+			WHERE `is_archived` = 1 AND `archived_on` >= %(start)s AND `archived_on` < %(end)s
+				AND `archive_table` IS NULL AND `keep_in_main_table` = 0
+			ORDER BY `name`
+			LIMIT {MOVE_BATCH_SIZE}
+			FOR UPDATE
+		""", values)
+
+		if not names:
+			break
+
+		try:
+			frappe.db.sql(f"""
+				INSERT INTO `{table}` ({columns})
+				SELECT {columns} FROM `tab{doctype}` WHERE `name` IN %(names)s
+			""", {"names": tuple(names)})
+			frappe.db.sql(f"""
+				UPDATE `tab{doctype}`
+				SET `archive_table` = %(table)s{', ' + cleared if cleared else ''}
+				WHERE `name` IN %(names)s
+			""", {"names": tuple(names), "table": table})
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			raise
+
+		moved += len(names)
+
+	register_archive_table(doctype, year, table)
+	create_archive_view(doctype)
+
+	frappe.logger("archive_tables", allow_site=True).info({
+		"doctype": doctype,
+		"year": cint(year),
+		"moved": moved,
+		"elapsed_s": flt(time.perf_counter() - start, 2)
+	})
+
+	return moved
+
+
+def register_archive_table(doctype, year, table):
+	"""
+	Record an archive table with its letter count and letter date range
+
+	Args:
+		doctype: Letter doctype
+		year: Archive year
+		table: Archive table name
+	"""
+	date_field = LETTER_DATE_FIELDS[doctype]
+	count, from_date, to_date = frappe.db.sql(f"""
+		SELECT COUNT(*), MIN(`{date_field}`), MAX(`{date_field}`) FROM `{table}`
+	""")[0]
+
+	values = {"row_count": cint(count), "from_date": from_date, "to_date": to_date, "moved_on": now()}
+
+	if frappe.db.exists("Letter Archive Table", table):
+		frappe.db.set_value("Letter Archive Table", table, values)
+	else:
+		frappe.get_doc({
+			"doctype": "Letter Archive Table",
+			"reference_doctype": doctype,
+			"archive_year": cint(year),
+			"table_name": table,
+			**values
+		}).insert(ignore_permissions=True)
+
+	frappe.db.commit()
+	clear_registry_cache(doctype)
+
+
+def restore_letters(doctype, names):
+	"""
+	Move letters back from the archive tables into the main table, replacing
+	their stubs and marking them keep_in_main_table
+
+	The statements of each archive table run under a savepoint, so a failure
+	leaves no letter without its full row.
+
+	Args:
+		doctype: Letter doctype
+		names: Letter names (names not in an archive table are ignored)
+
+	Returns:
+		List of restored names
+	"""
+	restored = []
+	if not names:
+		return restored
+
+	for table in get_archive_tables(doctype):
+		found = frappe.db.sql_list(f"""
+			SELECT `name` FROM `{table}` WHERE `name` IN %(names)s FOR UPDATE
+		""", {"names": tuple(names)})
+
+		if not found:
+			continue
+
+		columns = get_column_list(doctype)
+		frappe.db.savepoint(RESTORE_SAVEPOINT)
+
+		try:
+			frappe.db.sql(
+				f"DELETE FROM `tab{doctype}` WHERE `name` IN %(names)s AND `archive_table` = %(table)s",
+				{"names": tuple(found), "table": table}
+			)
+			frappe.db.sql(f"""
+				INSERT INTO `tab{doctype}` ({columns})
+				SELECT {columns} FROM `{table}` WHERE `name` IN %(names)s
+			""", {"names": tuple(found)})
+			frappe.db.sql(
+				f"UPDATE `tab{doctype}` SET `keep_in_main_table` = 1 WHERE `name` IN %(names)s",
+				{"names": tuple(found)}
+			)
+			frappe.db.sql(f"DELETE FROM `{table}` WHERE `name` IN %(names)s", {"names": tuple(found)})
+			frappe.db.sql("""
+				UPDATE `tabLetter Archive Table`
+				SET row_count = GREATEST(row_count - %(count)s, 0)
+				WHERE name = %(table)s
+			""", {"count": len(found), "table": table})
+		except Exception:
+			frappe.db.rollback(save_point=RESTORE_SAVEPOINT)
+			raise
+
+		frappe.db.release_savepoint(RESTORE_SAVEPOINT)
+
+		restored += found
+
+	if restored:
+		clear_registry_cache(doctype)
+
+	return restored
+
+
+@frappe.whitelist()
+def restore_archived_letters(doctype, names):
+	"""
+	API endpoint to move letters back from the archive tables (replacing their
+	stubs) so they can be edited again
+
+	Args:
+		doctype: Letter doctype
+		names: List of letter names (JSON string or list)
+
+	Returns:
+		Success status and the restored names
+	"""
+	if isinstance(names, str):
+		names = json.loads(names) if names.startswith("[") else [names]
+
+	if doctype not in ARCHIVE_TABLE_DOCTYPES:
+		frappe.throw(_("{0} cannot be moved to archive tables").format(_(doctype)))
+
+	if not frappe.has_permission(doctype, "write"):
+		frappe.throw(_("Not permitted to restore {0}").format(_(doctype)), frappe.PermissionError)
+
+	try:
+		return {"success": True, "restored": restore_letters(doctype, names)}
+
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Restoring archived letters failed: {str(e)}")
+		return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def queue_archive_year_move(doctype, year):
+	"""
+	API endpoint to move the letters archived in a year now
+
+	Args:
+		doctype: Letter doctype
+		year: Archive year
+
+	Returns:
+		Success status
+	"""
+	frappe.only_for("System Manager")
+
+	if doctype not in ARCHIVE_TABLE_DOCTYPES:
+		frappe.throw(_("{0} cannot be moved to archive tables").format(_(doctype)))
+
+	# Letters are still being archived in the current year
+	if cint(year) >= getdate(today()).year:
+		frappe.throw(_("Only past archive years can be moved"))
+
+	frappe.enqueue(
+		"correspondence.correspondence.utils.archive_tables.move_archive_year",
+		queue="long",
+		timeout=6 * 3600,
+		job_id=f"archive_tables::{doctype}::{cint(year)}",
+		deduplicate=True,
+		doctype=doctype,
+		year=cint(year)
+	)
+
+	return {"success": True, "message": f"Moving {doctype} letters archived in {cint(year)} queued"}
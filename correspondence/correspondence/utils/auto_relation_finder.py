@@ -11,11 +11,30 @@ Automatically finds and links related documents based on multiple criteria:
 - Sender/Recipient matching
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import frappe
-from frappe.utils import get_datetime, add_days
+from frappe.utils import add_days, flt, get_datetime
+
+from correspondence.correspondence.utils.search_cache import get_permission_signature
 from datetime import timedelta
 
 
+# Default overall deadline (seconds) for a relation lookup, overridable with
+# `relation_finder_timeout` in site_config.json
+DEFAULT_RELATION_TIMEOUT = 10
+
+# Preview cache settings (seconds); the TTL is overridable with
+# `relation_preview_cache_ttl` in site_config.json
+DEFAULT_PREVIEW_CACHE_TTL = 60
+PREVIEW_POLL_INTERVAL = 0.2
+PREVIEW_LATEST_TTL = 300
+
+# Candidates a topic or date strategy reads at most
+STRATEGY_LIMIT = 50
+
+
 def find_all_related_documents(doc, doctype):
 	"""
 	Find all related documents using multiple strategies
@@ -27,25 +46,141 @@ def find_all_related_documents(doc, doctype):
 	Returns:
 		List of related documents with scores and relation types
 	"""
+	related_docs, timings = find_all_related_documents_timed(doc, doctype)
+	return related_docs
+
+
+def find_all_related_documents_timed(doc, doctype, timeout=None):
+	"""
+	Find all related documents, running every strategy concurrently
+	
+	Each strategy runs in its own thread with its own database connection,
+	whose statements the database aborts at the deadline. Strategies that
+	have not finished by then are skipped and reported as timed out; results
+	from the completed ones are returned.
+	
+	Args:
+		doc: The document object (Incoming Letter or Outgoing Letter)
+		doctype: The doctype name
+		timeout: Overall deadline in seconds (defaults to site config)
+	
+	Returns:
+		Tuple of (related documents, per-strategy timings)
+	"""
+	strategies = [
+		("topic", find_by_topic),
+		("date", find_by_date),
+		("sender_recipient", find_by_sender_recipient),
+		("subject_similarity", find_by_subject_similarity),
+	]
+	
+	if timeout is None:
+		timeout = flt(frappe.conf.get("relation_finder_timeout")) or DEFAULT_RELATION_TIMEOUT
+	
 	related_docs = []
+	timings = {}
+	site = getattr(frappe.local, "site", None)
+	
+	if not site:
+		# No site context (e.g. called from a bare script); run sequentially
+		for strategy_name, strategy in strategies:
+			start = time.monotonic()
+			related_docs.extend(strategy(doc, doctype))
+			timings[strategy_name] = {
+				"status": "completed",
+				"elapsed": round(time.monotonic() - start, 3)
+			}
+		return merge_related_documents(related_docs), timings
+	
+	user = frappe.session.user
+	sites_path = frappe.local.sites_path
+	started_at = time.monotonic()
+	deadline = started_at + timeout
+	executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="relation-finder")
 	
-	# Strategy 1: Find by Topic
-	topic_matches = find_by_topic(doc, doctype)
-	related_docs.extend(topic_matches)
+	try:
+		futures = {
+			executor.submit(
+				_run_strategy_in_thread, site, sites_path, user, deadline, strategy, doc, doctype
+			): strategy_name
+			for strategy_name, strategy in strategies
+		}
+		
+		done, not_done = wait(futures, timeout=timeout)
+		
+		for future in done:
+			strategy_name = futures[future]
+			try:
+				matches, elapsed = future.result()
+				related_docs.extend(matches)
+				timings[strategy_name] = {"status": "completed", "elapsed": elapsed}
+			except Exception as e:
+				frappe.log_error(f"Relation strategy {strategy_name} failed: {str(e)}")
+				timings[strategy_name] = {"status": "failed", "error": str(e)}
+		
+		for future in not_done:
+			future.cancel()
+			timings[futures[future]] = {
+				"status": "timed_out",
+				"elapsed": round(time.monotonic() - started_at, 3)
+			}
+	finally:
+		# Do not block on strategies that overran the deadline; their
+		# statements are aborted at the deadline and the threads close their
+		# own connections
+		executor.shutdown(wait=False, cancel_futures=True)
+	
+	return merge_related_documents(related_docs), timings
+
+
+def _run_strategy_in_thread(site, sites_path, user, deadline, strategy, doc, doctype):
+	"""
+	Run a single strategy inside a worker thread with its own DB connection
 	
-	# Strategy 2: Find by Date Proximity
-	date_matches = find_by_date(doc, doctype)
-	related_docs.extend(date_matches)
+	Args:
+		site: Site name to connect to
+		sites_path: Sites directory of the calling process
+		user: Session user to run as
+		deadline: time.monotonic() value at which the lookup gives up
+		strategy: Strategy function
+		doc: The document object
+		doctype: The doctype name
 	
-	# Strategy 3: Find by Sender/Recipient
-	sender_matches = find_by_sender_recipient(doc, doctype)
-	related_docs.extend(sender_matches)
+	Returns:
+		Tuple of (matches, elapsed seconds)
+	"""
+	frappe.init(site=site, sites_path=sites_path)
+	
+	try:
+		frappe.connect()
+		frappe.set_user(user)
+		
+		# The database aborts any statement still running at the deadline,
+		# so a thread left behind by the caller ends with it
+		frappe.db.sql("SET SESSION max_statement_time = %s", max(deadline - time.monotonic(), 0.1))
+		
+		start = time.monotonic()
+		matches = strategy(doc, doctype)
+		elapsed = round(time.monotonic() - start, 3)
+		
+		# Persist any error logs written by the strategy
+		frappe.db.commit()
+		
+		return matches, elapsed
+	finally:
+		frappe.destroy()
+
+
+def merge_related_documents(related_docs):
+	"""
+	Remove duplicates (keeping the highest score) and return the top matches
 	
-	# Strategy 4: Find by Subject Similarity (existing AI-based method)
-	subject_matches = find_by_subject_similarity(doc, doctype)
-	related_docs.extend(subject_matches)
+	Args:
+		related_docs: List of related documents from all strategies
 	
-	# Remove duplicates (keep highest score for each document)
+	Returns:
+		Top 20 related documents sorted by score
+	"""
 	unique_docs = {}
 	for doc_info in related_docs:
 		key = f"{doc_info['doctype']}::{doc_info['name']}"
@@ -77,49 +212,36 @@ def find_by_topic(doc, doctype):
 		if not hasattr(doc, 'topics') or not doc.topics:
 			return results
 		
-		current_topics = [t.topic for t in doc.topics]
+		current_topics = [t.topic for t in doc.topics if t.topic]
 		
 		if not current_topics:
 			return results
 		
-		# Search in both Incoming and Outgoing Letters
-		for search_doctype in ["Incoming Letter", "Outgoing Letter"]:
-			# Skip searching in the same document
-			if search_doctype == doctype:
-				filters = {"name": ["!=", doc.name]}
-			else:
-				filters = {}
-			
-			# Get all documents
-			documents = frappe.get_all(
-				search_doctype,
-				filters=filters,
-				fields=["name", "subject", "date_received" if search_doctype == "Incoming Letter" else "date_sent"]
-			)
+		# Letters sharing the most topics, read from the (topic, parenttype,
+		# parent) index in one query
+		documents = frappe.db.sql("""
+			SELECT `parenttype`, `parent`, COUNT(DISTINCT `topic`) AS common,
+				GROUP_CONCAT(DISTINCT `topic` ORDER BY `topic` SEPARATOR ', ') AS topics
+			FROM `tabLetter Topic`
+			WHERE `topic` IN %(topics)s
+				AND `parenttype` IN ('Incoming Letter', 'Outgoing Letter')
+				AND NOT (`parenttype` = %(doctype)s AND `parent` = %(name)s)
+			GROUP BY `parenttype`, `parent`
+			ORDER BY common DESC, `parent` DESC
+			LIMIT %(limit)s
+		""", {"topics": tuple(current_topics), "doctype": doctype, "name": doc.name or "", "limit": STRATEGY_LIMIT}, as_dict=True)
+		
+		for document in documents:
+			# Score based on number of common topics
+			score = min(0.9, 0.5 + (document.common * 0.1))
 			
-			for document in documents:
-				# Get topics for this document
-				doc_topics = frappe.get_all(
-					"Letter Topic",
-					filters={"parent": document.name, "parenttype": search_doctype},
-					fields=["topic"]
-				)
-				
-				doc_topic_names = [t.topic for t in doc_topics]
-				
-				# Calculate topic overlap
-				common_topics = set(current_topics).intersection(set(doc_topic_names))
-				
-				if common_topics:
-					# Score based on number of common topics
-					score = min(0.9, 0.5 + (len(common_topics) * 0.1))
-					
-					results.append({
-						"doctype": search_doctype,
-						"name": document.name,
-						"score": score,
-						"relation_reason": f"Common Topics: {', '.join(common_topics)}"
-					})
+			results.append({
+				"doctype": document.parenttype,
+				"name": document.parent,
+				"score": score,
+				"relation_reason": f"Common Topics: {document.topics}",
+				"strategy": "Topic"
+			})
 	
 	except Exception as e:
 		frappe.log_error(f"Find by topic failed: {str(e)}")
@@ -161,24 +283,32 @@ def find_by_date(doc, doctype):
 			date_field = "date_received" if search_doctype == "Incoming Letter" else "date_sent"
 			
 			# Skip searching in the same document
-			if search_doctype == doctype:
-				filters = {
-					"name": ["!=", doc.name],
-					date_field: ["between", [date_from, date_to]]
-				}
-			else:
-				filters = {
-					date_field: ["between", [date_from, date_to]]
-				}
+			exclude = {"name": ["!=", doc.name]} if search_doctype == doctype else {}
 			
 			# For Outgoing Letter, if date_sent is null, we might want to check date_created
 			# But for simplicity, let's stick to the main date field
 			
-			documents = frappe.get_all(
-				search_doctype,
-				filters=filters,
-				fields=["name", "subject", date_field]
+			# The closest letters on each side of the date (each an index
+			# range scan), then the closest of both
+			documents = []
+			sides = (
+				([current_date, date_to], "asc"),
+				([date_from, current_date], "desc")
 			)
+			for date_range, order in sides:
+				documents += frappe.get_all(
+					search_doctype,
+					filters={**exclude, date_field: ["between", date_range]},
+					fields=["name", "subject", date_field],
+					order_by=f"{date_field} {order}",
+					limit=STRATEGY_LIMIT
+				)
+			
+			unique = {document.name: document for document in documents}
+			documents = sorted(
+				unique.values(),
+				key=lambda document: abs((current_date - get_datetime(document.get(date_field))).total_seconds())
+			)[:STRATEGY_LIMIT]
 			
 			for document in documents:
 				doc_date = get_datetime(document.get(date_field))
@@ -191,7 +321,8 @@ def find_by_date(doc, doctype):
 					"doctype": search_doctype,
 					"name": document.name,
 					"score": score,
-					"relation_reason": f"Date Proximity: {days_diff} days apart"
+					"relation_reason": f"Date Proximity: {days_diff} days apart",
+					"strategy": "Date"
 				})
 	
 	except Exception as e:
@@ -204,6 +335,10 @@ def find_by_sender_recipient(doc, doctype):
 	"""
 	Find documents from/to the same sender/recipient
 	
+	Names are compared through their normalized correspondent key, so the
+	lookup is an exact match on an indexed column and tolerates spelling
+	variants (hamza forms, diacritics, extra spaces).
+	
 	Args:
 		doc: The document object
 		doctype: The doctype name
@@ -211,23 +346,25 @@ def find_by_sender_recipient(doc, doctype):
 	Returns:
 		List of related documents
 	"""
+	from correspondence.correspondence.utils.arabic_text import make_name_key
+	
 	results = []
 	
 	try:
 		# Get sender/recipient from current document
 		if doctype == "Incoming Letter":
 			search_value = doc.sender
-			search_field = "sender"
 		else:  # Outgoing Letter
 			search_value = doc.recipient
-			search_field = "recipient"
 		
-		if not search_value:
+		search_key = make_name_key(search_value)
+		
+		if not search_key:
 			return results
 		
 		# Search in Incoming Letters by sender
-		incoming_filters = {"sender": ["like", f"%{search_value}%"]}
-		if doctype == "Incoming Letter":
+		incoming_filters = {"sender_key": search_key}
+		if doctype == "Incoming Letter" and doc.name:
 			incoming_filters["name"] = ["!=", doc.name]
 		
 		incoming_docs = frappe.get_all(
@@ -242,12 +379,13 @@ def find_by_sender_recipient(doc, doctype):
 				"doctype": "Incoming Letter",
 				"name": document.name,
 				"score": 0.85,
-				"relation_reason": f"Same Sender: {document.sender}"
+				"relation_reason": f"Same Sender: {document.sender}",
+				"strategy": "Sender Recipient"
 			})
 		
 		# Search in Outgoing Letters by recipient
-		outgoing_filters = {"recipient": ["like", f"%{search_value}%"]}
-		if doctype == "Outgoing Letter":
+		outgoing_filters = {"recipient_key": search_key}
+		if doctype == "Outgoing Letter" and doc.name:
 			outgoing_filters["name"] = ["!=", doc.name]
 		
 		outgoing_docs = frappe.get_all(
@@ -262,7 +400,8 @@ def find_by_sender_recipient(doc, doctype):
 				"doctype": "Outgoing Letter",
 				"name": document.name,
 				"score": 0.85,
-				"relation_reason": f"Same Recipient: {document.recipient}"
+				"relation_reason": f"Same Recipient: {document.recipient}",
+				"strategy": "Sender Recipient"
 			})
 	
 	except Exception as e:
@@ -310,7 +449,8 @@ def find_by_subject_similarity(doc, doctype):
 				"doctype": similar_doc.get('doctype'),
 				"name": similar_doc.get('name'),
 				"score": similar_doc.get('score'),
-				"relation_reason": f"Content Similarity: {int(similar_doc.get('score') * 100)}%"
+				"relation_reason": f"Content Similarity: {int(similar_doc.get('score') * 100)}%",
+				"strategy": "Subject Similarity"
 			})
 		
 		# Also search in the opposite doctype
@@ -329,7 +469,8 @@ def find_by_subject_similarity(doc, doctype):
 				"doctype": similar_doc.get('doctype'),
 				"name": similar_doc.get('name'),
 				"score": similar_doc.get('score'),
-				"relation_reason": f"Content Similarity: {int(similar_doc.get('score') * 100)}%"
+				"relation_reason": f"Content Similarity: {int(similar_doc.get('score') * 100)}%",
+				"strategy": "Subject Similarity"
 			})
 	
 	except Exception as e:
@@ -338,11 +479,52 @@ def find_by_subject_similarity(doc, doctype):
 	return results
 
 
+def queue_related_documents(doc):
+	"""
+	Find the related documents of a new letter in a background job, so
+	saving it does not wait for the strategies
+
+	Args:
+		doc: Incoming Letter or Outgoing Letter
+	"""
+	frappe.enqueue(
+		"correspondence.correspondence.utils.auto_relation_finder.update_related_documents",
+		queue="short",
+		job_id=f"related_documents::{doc.doctype}::{doc.name}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		doctype=doc.doctype,
+		docname=doc.name
+	)
+
+
+def update_related_documents(doctype, docname):
+	"""
+	Store the related documents of a letter in the relation graph; runs as
+	a background job
+
+	Args:
+		doctype: Incoming Letter or Outgoing Letter
+		docname: Letter name
+	"""
+	from correspondence.correspondence.utils.relation_graph import save_auto_relations
+
+	if not frappe.db.exists(doctype, docname):
+		return
+
+	doc = frappe.get_doc(doctype, docname)
+	save_auto_relations(doctype, docname, find_all_related_documents(doc, doctype))
+	frappe.db.commit()
+
+
 @frappe.whitelist()
 def refresh_related_documents(doctype, docname):
 	"""
 	API endpoint to manually refresh related documents for a document
 	
+	The auto-generated relations are written to the relation graph
+	incrementally; the document itself is not saved.
+	
 	Args:
 		doctype: Document type
 		docname: Document name
@@ -350,35 +532,23 @@ def refresh_related_documents(doctype, docname):
 	Returns:
 		Success status and updated related documents
 	"""
+	from correspondence.correspondence.utils.relation_graph import save_auto_relations
+	
 	try:
 		doc = frappe.get_doc(doctype, docname)
 		
 		# Find all related documents
-		related_docs = find_all_related_documents(doc, doctype)
-		
-		# Clear existing auto-generated relations
-		doc.related_documents = [
-			d for d in doc.related_documents 
-			if d.relation_type == "Manual"
-		]
-		
-		# Add new related documents
-		for rel_doc in related_docs:
-			doc.append('related_documents', {
-				'document_type': rel_doc['doctype'],
-				'document_name': rel_doc['name'],
-				'similarity_score': rel_doc['score'],
-				'relation_type': 'Auto',
-				'notes': rel_doc.get('relation_reason', '')
-			})
+		related_docs, timings = find_all_related_documents_timed(doc, doctype)
 		
-		# Save the document
-		doc.save(ignore_permissions=True)
+		# Update the auto-generated edges (manual ones are kept)
+		changes = save_auto_relations(doctype, docname, related_docs)
 		
 		return {
 			"success": True,
 			"message": f"Found {len(related_docs)} related documents",
-			"related_documents": related_docs
+			"related_documents": related_docs,
+			"changes": changes,
+			"timings": timings
 		}
 	
 	except Exception as e:
@@ -394,6 +564,12 @@ def preview_related_documents(doctype, doc_data):
 	"""
 	API endpoint to preview related documents for unsaved data
 	
+	The form calls this while the user is editing, so results are cached for
+	a short time under a hash of the fields the strategies read and the
+	user's permissions, a request is answered as superseded if a newer draft
+	of the same form arrived while it ran, and concurrent identical requests
+	wait for the first one instead of running the search again.
+	
 	Args:
 		doctype: Document type
 		doc_data: JSON string of document data
@@ -409,17 +585,58 @@ def preview_related_documents(doctype, doc_data):
 		else:
 			data = doc_data
 		
-		# Create a temporary document object in memory
-		doc = frappe.get_doc(data)
+		fingerprint = get_preview_fingerprint(doctype, data, get_permission_signature())
+		cache = frappe.cache()
+		cache_key = f"relation_preview::{fingerprint}"
+		lock_key = f"relation_preview_lock::{fingerprint}"
+		latest_key = f"relation_preview_latest::{frappe.session.user}::{doctype}::{data.get('name') or 'new'}"
 		
-		# Find related documents
-		related_docs = find_all_related_documents(doc, doctype)
+		# Remember the latest draft of the form, also when it is answered from
+		# the cache, so older requests still running are dropped
+		cache.set_value(latest_key, fingerprint, expires_in_sec=PREVIEW_LATEST_TTL)
 		
-		return {
-			"success": True,
-			"message": f"Found {len(related_docs)} related documents",
-			"related_documents": related_docs
-		}
+		cached = cache.get_value(cache_key, expires=True)
+		if cached:
+			return dict(cached, cached=True)
+		
+		timeout = flt(frappe.conf.get("relation_finder_timeout")) or DEFAULT_RELATION_TIMEOUT
+		
+		# Coalesce: if an identical search is already running, wait for its result
+		locked = cache.set(cache.make_key(lock_key), 1, nx=True, ex=int(timeout) + 5)
+		if not locked:
+			deadline = time.monotonic() + timeout
+			while time.monotonic() < deadline:
+				time.sleep(PREVIEW_POLL_INTERVAL)
+				cached = cache.get_value(cache_key, expires=True)
+				if cached:
+					return dict(cached, cached=True)
+		
+		try:
+			# Create a temporary document object in memory
+			doc = frappe.get_doc(data)
+			
+			# Find related documents
+			related_docs, timings = find_all_related_documents_timed(doc, doctype, timeout=timeout)
+			
+			result = {
+				"success": True,
+				"message": f"Found {len(related_docs)} related documents",
+				"related_documents": related_docs,
+				"timings": timings
+			}
+			
+			ttl = int(frappe.conf.get("relation_preview_cache_ttl") or DEFAULT_PREVIEW_CACHE_TTL)
+			cache.set_value(cache_key, result, expires_in_sec=ttl)
+		finally:
+			# A waiter that gave up must not release the owner's lock
+			if locked:
+				cache.delete_value(lock_key)
+		
+		# The form sent a newer draft meanwhile; its request answers instead
+		if cache.get_value(latest_key, expires=True) != fingerprint:
+			return {"success": False, "superseded": True}
+		
+		return result
 	
 	except Exception as e:
 		frappe.log_error(f"Preview related documents failed: {str(e)}")
@@ -427,3 +644,34 @@ def preview_related_documents(doctype, doc_data):
 			"success": False,
 			"error": str(e)
 		}
+
+
+def get_preview_fingerprint(doctype, data, permission_signature=None):
+	"""
+	Hash the draft fields that influence the relation strategies
+	
+	Args:
+		doctype: Document type
+		data: Draft document data (dict)
+		permission_signature: Signature of what the user may see (see
+			search_cache.get_permission_signature), so users only share
+			results with users seeing the same documents
+	
+	Returns:
+		SHA-256 hex digest
+	"""
+	import hashlib
+	import json
+	
+	if doctype == "Incoming Letter":
+		fields = ["name", "subject", "summary", "ocr_text", "sender", "date_received"]
+	else:
+		fields = ["name", "subject", "body_text", "ocr_text", "recipient", "date_sent", "date_created"]
+	
+	relevant = {field: data.get(field) for field in fields}
+	relevant["doctype"] = doctype
+	relevant["permissions"] = permission_signature
+	relevant["topics"] = sorted(t.get("topic") or "" for t in (data.get("topics") or []))
+	
+	payload = json.dumps(relevant, sort_keys=True, default=str)
+	return hashlib.sha256(payload.encode("utf-8")).hexdigest()
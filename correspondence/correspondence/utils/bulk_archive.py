@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Bulk Archive Module
+Set-based archiving of many letters in one transaction.
+
+Instead of loading and saving every document, the job locks the selected
+rows, reserves the archive numbers of each batch in one statement, archives
+the rows with batched UPDATEs, inserts the final version snapshots in bulk and
+applies the Archive Location counts and archive statistics once. Document
+hooks (OCR, notifications, validation) are not run; caches that rely on
+them are invalidated explicitly.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now
+from frappe.utils.background_jobs import is_job_enqueued
+
+from correspondence.correspondence.doctype.document_version.document_version import get_file_hash
+from correspondence.correspondence.utils.archive_counters import adjust_location_count
+from correspondence.correspondence.utils.archive_numbers import reserve_archive_numbers
+from correspondence.correspondence.utils.archive_statistics import add_archived_rows
+from correspondence.correspondence.utils.search_cache import bump_search_generation
+
+
+# Doctypes that can be archived
+ARCHIVABLE_DOCTYPES = ["Incoming Letter", "Outgoing Letter"]
+
+# Rows per UPDATE / INSERT statement
+BULK_ARCHIVE_BATCH_SIZE = 500
+
+# Seconds a job result stays available to get_bulk_archive_status
+RESULT_TTL = 86400
+
+
+def enqueue_bulk_archive(documents, archive_location=None):
+	"""
+	Validate a bulk archive request and queue it as a background job
+
+	Args:
+		documents: List of dicts with doctype and name
+		archive_location: Optional archive location for all documents
+
+	Returns:
+		Dict with success, job_id, the number of queued documents and
+		already_queued (an identical job is queued or running; its status is
+		left as it is)
+	"""
+	names = get_names_by_doctype(documents)
+
+	for doctype in names:
+		if not frappe.has_permission(doctype, "write"):
+			frappe.throw(_("Not permitted to archive {0}").format(_(doctype)), frappe.PermissionError)
+
+	total = sum(len(docnames) for docnames in names.values())
+
+	if archive_location:
+		available = frappe.db.get_value("Archive Location", archive_location, "available_space")
+		if available is None:
+			frappe.throw(_("Archive Location {0} not found").format(archive_location))
+		if cint(available) < total:
+			frappe.throw(_("Archive Location {0} has space for {1} documents only").format(archive_location, available))
+
+	payload = json.dumps([names, archive_location], sort_keys=True)
+	job_id = f"bulk_archive::{hashlib.md5(payload.encode('utf-8')).hexdigest()}"
+
+	if is_job_enqueued(job_id):
+		return {"success": True, "job_id": job_id, "total": total, "already_queued": True}
+
+	frappe.enqueue(
+		"correspondence.correspondence.utils.bulk_archive.run_bulk_archive",
+		queue="long",
+		timeout=3600,
+		job_id=job_id,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		names=names,
+		archive_location=archive_location,
+		job_key=job_id
+	)
+
+	set_job_status(job_id, {"status": "Queued", "total": total})
+
+	return {"success": True, "job_id": job_id, "total": total, "already_queued": False}
+
+
+def get_names_by_doctype(documents):
+	"""
+	Group and validate the requested documents
+
+	Args:
+		documents: List of dicts with doctype and name
+
+	Returns:
+		Dict of doctype -> unique names (in request order)
+	"""
+	names = {}
+
+	for doc_info in documents:
+		doctype = doc_info.get("doctype")
+		docname = doc_info.get("name")
+
+		if not doctype or not docname:
+			frappe.throw(_("Missing doctype or name: {0}").format(doc_info))
+
+		if doctype not in ARCHIVABLE_DOCTYPES:
+			frappe.throw(_("{0} documents cannot be archived").format(doctype))
+
+		docnames = names.setdefault(doctype, [])
+		if docname not in docnames:
+			docnames.append(docname)
+
+	return names
+
+
+def run_bulk_archive(names, archive_location=None, job_key=None):
+	"""
+	Archive the documents in one transaction (background job)
+
+	Args:
+		names: Dict of doctype -> names
+		archive_location: Optional archive location for all documents
+		job_key: Job id under which progress and the result are published
+
+	Returns:
+		Results summary with archived and skipped documents
+	"""
+	total = sum(len(docnames) for docnames in names.values())
+	results = {"success": [], "failed": [], "total": total}
+	locations = {}
+	done = 0
+
+	set_job_status(job_key, {"status": "Running", "total": total, "done": 0})
+
+	try:
+		for doctype, docnames in names.items():
+			for i in range(0, len(docnames), BULK_ARCHIVE_BATCH_SIZE):
+				batch = docnames[i:i + BULK_ARCHIVE_BATCH_SIZE]
+				archived = archive_batch(doctype, batch, archive_location)
+
+				for name, row in archived.items():
+					results["success"].append({"doctype": doctype, "name": name, "archive_number": row.archive_number})
+					if row.archive_location:
+						locations[row.archive_location] = locations.get(row.archive_location, 0) + 1
+
+				for name in batch:
+					if name not in archived:
+						results["failed"].append({
+							"doctype": doctype,
+							"name": name,
+							"error": "Document not found, cancelled or already archived"
+						})
+
+				done += len(batch)
+				publish_progress(job_key, done, total)
+
+		for location, count in sorted(locations.items()):
+			adjust_location_count(location, count)
+
+		frappe.db.commit()
+
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Bulk archive failed: {str(e)}")
+		set_job_status(job_key, {"status": "Failed", "total": total, "error": str(e)})
+		raise
+
+	bump_search_generation()
+
+	set_job_status(job_key, {"status": "Completed", **results})
+	return results
+
+
+def archive_batch(doctype, names, archive_location=None):
+	"""
+	Archive a batch of documents of one doctype
+
+	Args:
+		doctype: Incoming Letter or Outgoing Letter
+		names: Document names
+		archive_location: Optional archive location (default keep the current one)
+
+	Returns:
+		Dict of name -> row with archive_number and archive_location of the
+		documents that were archived
+	"""
+	rows = frappe.db.sql(f"""
+		SELECT name, department, archive_location
+		FROM `tab{doctype}`
+		WHERE name IN %(names)s AND is_archived = 0 AND docstatus < 2
+		ORDER BY name
+		FOR UPDATE
+	""", {"names": tuple(names)}, as_dict=True)
+
+	if not rows:
+		return {}
+
+	timestamp = now()
+	user = frappe.session.user
+	archive_numbers = reserve_archive_numbers(len(rows), timestamp)
+
+	values = {"names": tuple(row.name for row in rows), "now": timestamp, "user": user, "location": archive_location}
+	cases = []
+
+	for i, row in enumerate(rows):
+		row.archive_number = archive_numbers[i]
+		row.archive_location = archive_location or row.archive_location
+		values[f"name_{i}"] = row.name
+		values[f"number_{i}"] = row.archive_number
+		cases.append(f"WHEN %(name_{i})s THEN %(number_{i})s")
+
+	frappe.db.sql(f"""
+		UPDATE `tab{doctype}`
+		SET
+			is_archived = 1,
+			status = 'Archived',
+			archive_number = CASE name {' '.join(cases)} END,
+			archive_location = IFNULL(%(location)s, archive_location),
+			archived_on = %(now)s,
+			archived_by = %(user)s,
+			modified = %(now)s,
+			modified_by = %(user)s
+		WHERE name IN %(names)s
+	""", values)
+
+	insert_version_snapshots(doctype, [row.name for row in rows], timestamp, user)
+	add_archived_rows([{**row, "archived_on": timestamp} for row in rows])
+
+	return {row.name: row for row in rows}
+
+
+def insert_version_snapshots(doctype, names, timestamp, user):
+	"""
+	Insert the final version snapshot of archived documents in bulk
+
+	Mirrors create_document_version: one current version per document,
+	pointing at its first original attachment.
+
+	Args:
+		doctype: Document type
+		names: Archived document names
+		timestamp: Archive timestamp
+		user: Archiving user
+	"""
+	attachments = frappe.db.sql("""
+		SELECT parent, file
+		FROM `tabLetter Attachment`
+		WHERE parenttype = %(doctype)s AND parent IN %(names)s
+			AND is_original = 1 AND IFNULL(file, '') != ''
+		ORDER BY parent, idx
+	""", {"doctype": doctype, "names": tuple(names)}, as_dict=True)
+
+	files = {}
+	for attachment in attachments:
+		files.setdefault(attachment.parent, attachment.file)
+
+	if not files:
+		return
+
+	last_versions = dict(frappe.db.sql("""
+		SELECT reference_name, MAX(version_number)
+		FROM `tabDocument Version`
+		WHERE reference_doctype = %(doctype)s AND reference_name IN %(names)s
+		GROUP BY reference_name
+	""", {"doctype": doctype, "names": tuple(files)}))
+
+	placeholders = []
+	values = []
+	version_names = []
+
+	for parent, file_url in files.items():
+		name = frappe.generate_hash(length=10)
+		version_names.append(name)
+		placeholders.append("(%s, %s, %s, %s, %s, 0, 0, %s, %s, %s, 1, %s, %s, 'Status: Archived', %s, %s)")
+		values += [
+			name, timestamp, timestamp, user, user,
+			doctype, parent, cint(last_versions.get(parent)) + 1,
+			user, timestamp, file_url, get_file_hash(file_url)
+		]
+
+	frappe.db.sql(f"""
+		INSERT INTO `tabDocument Version`
+			(name, creation, modified, owner, modified_by, docstatus, idx,
+			 reference_doctype, reference_name, version_number, is_current,
+			 editor, created_on, changes_summary, original_file, file_hash)
+		VALUES {', '.join(placeholders)}
+	""", values)
+
+	frappe.db.sql("""
+		UPDATE `tabDocument Version`
+		SET is_current = 0
+		WHERE reference_doctype = %(doctype)s AND reference_name IN %(names)s
+			AND name NOT IN %(versions)s
+	""", {"doctype": doctype, "names": tuple(files), "versions": tuple(version_names)})
+
+
+def publish_progress(job_key, done, total):
+	"""
+	Publish bulk archive progress to the user who queued the job
+
+	Args:
+		job_key: Job id
+		done: Documents processed
+		total: Documents requested
+	"""
+	progress = {"job_id": job_key, "done": done, "total": total, "percent": round(done * 100 / total, 1) if total else 100}
+
+	frappe.publish_realtime("bulk_archive_progress", progress, user=frappe.session.user)
+	set_job_status(job_key, {"status": "Running", **progress})
+
+
+def set_job_status(job_key, status):
+	"""
+	Store the status of a bulk archive job
+
+	Args:
+		job_key: Job id
+		status: Status dict
+	"""
+	if job_key:
+		status = {**status, "user": frappe.session.user}
+		frappe.cache().set_value(f"bulk_archive_status::{job_key}", status, expires_in_sec=RESULT_TTL)
+
+
+def get_job_status(job_key):
+	"""
+	Args:
+		job_key: Job id
+
+	Returns:
+		Status dict, or None if unknown or expired
+	"""
+	return frappe.cache().get_value(f"bulk_archive_status::{job_key}")
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Content Store Module
+Stores identical attachment content once.
+
+Every Letter Attachment row records the SHA-256 of its file, and each
+distinct content has a Content Blob row holding its size, the number of
+attachment rows using it and its OCR text. When a file with known content
+is attached again, its disk copy is replaced by a hard link to the stored
+file of the blob, so duplicates occupy disk once while every attachment
+keeps its own URL. Hashing, OCR and version file hashes are looked up by
+content instead of being recomputed.
+
+Reference counts follow attachment rows as letters are saved and deleted;
+a daily job recounts them, drops unused blobs and hashes attachments that
+predate the store.
+"""
+
+import hashlib
+import os
+import shutil
+
+import frappe
+from frappe.utils import cint, flt, now
+
+from correspondence.correspondence.utils.file_storage import get_local_path, get_site_file_path
+
+
+# Doctype -> table field holding its Letter Attachment rows
+ATTACHMENT_TABLES = {
+	"Incoming Letter": "attachments",
+	"Outgoing Letter": "attachments",
+	"Customer File": "documents",
+	"Legacy Archive": "attachments",
+}
+
+# Bytes read per chunk while hashing
+CHUNK_SIZE = 1024 * 1024
+
+# Attachment rows hashed per run of the daily job
+BACKFILL_BATCH_SIZE = 500
+
+
+def hash_file(path):
+	"""
+	Args:
+		path: File on disk
+
+	Returns:
+		Tuple of (SHA-256 hex digest, size in bytes)
+	"""
+	sha256 = hashlib.sha256()
+	size = 0
+
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+			sha256.update(chunk)
+			size += len(chunk)
+
+	return sha256.hexdigest(), size
+
+
+def get_recorded_hash(file_url):
+	"""
+	Args:
+		file_url: File URL
+
+	Returns:
+		Content hash recorded on an attachment row using the file, or None
+	"""
+	if not file_url:
+		return None
+
+	return frappe.db.get_value("Letter Attachment", {"file": file_url, "content_hash": ["is", "set"]}, "content_hash")
+
+
+def link_or_copy(source_path, target_path):
+	"""
+	Make target_path a hard link to source_path, copying when the two are
+	on different file systems (or links are not supported)
+
+	Args:
+		source_path: Existing file
+		target_path: New path (replaced atomically)
+	"""
+	temp_path = f"{target_path}.{frappe.generate_hash(length=8)}.link"
+
+	try:
+		try:
+			os.link(source_path, temp_path)
+		except OSError:
+			shutil.copy2(source_path, temp_path)
+
+		os.replace(temp_path, target_path)
+
+	finally:
+		if os.path.exists(temp_path):
+			os.remove(temp_path)
+
+
+def register_attachments(doc, method=None):
+	"""
+	Hash new attachment rows and store their content once (validate hook)
+
+	Rows that already have a content hash are left alone. OCR text known
+	for the content is copied to the row, so it is not extracted again.
+
+	Args:
+		doc: Document with a Letter Attachment table
+		method: Hook method name
+	"""
+	for row in get_attachment_rows(doc):
+		if not row.file or row.content_hash:
+			continue
+
+		try:
+			blob = store_file(row.file)
+		except Exception as e:
+			frappe.log_error(f"Content store registration failed for {row.file}: {str(e)}")
+			continue
+
+		if not blob:
+			continue
+
+		row.content_hash = blob.name
+		row.file_size = row.file_size or blob.file_size
+
+		if cint(blob.ocr_extracted) and not cint(row.ocr_extracted):
+			row.ocr_text = blob.ocr_text
+			row.ocr_extracted = 1
+
+
+def get_attachment_rows(doc):
+	if not doc:
+		return []
+
+	return doc.get(ATTACHMENT_TABLES.get(doc.doctype, "attachments")) or []
+
+
+def store_file(file_url):
+	"""
+	Register the content of a file, linking it to the stored copy when the
+	content is already known
+
+	Args:
+		file_url: File URL
+
+	Returns:
+		Content Blob fields (name, file_size, ocr_extracted, ocr_text), or
+		None if the file is not on disk
+	"""
+	path = get_local_path(file_url)
+	if not path or not os.path.isfile(path):
+		return None
+
+	content_hash, size = hash_file(path)
+	blob = frappe.db.get_value(
+		"Content Blob",
+		content_hash,
+		["name", "file_size", "stored_file", "ocr_extracted", "ocr_text"],
+		as_dict=True
+	)
+
+	if not blob:
+		create_blob(content_hash, size, file_url)
+		return frappe._dict(name=content_hash, file_size=size, ocr_extracted=0, ocr_text=None)
+
+	stored_path = get_site_file_path(blob.stored_file)
+
+	if blob.stored_file == file_url or not stored_path or not os.path.isfile(stored_path):
+		# The stored copy is gone (deleted or moved to cold storage); this
+		# file becomes the one later duplicates link to
+		frappe.db.set_value("Content Blob", content_hash, "stored_file", file_url, update_modified=False)
+	elif not os.path.samefile(stored_path, path) and hash_file(stored_path)[0] == content_hash:
+		link_or_copy(stored_path, path)
+
+	return blob
+
+
+def create_blob(content_hash, size, file_url):
+	timestamp = now()
+	user = frappe.session.user
+
+	frappe.db.sql("""
+		INSERT INTO `tabContent Blob`
+			(name, content_hash, file_size, ref_count, stored_file, ocr_extracted,
+			 creation, modified, owner, modified_by, docstatus, idx)
+		VALUES (%(hash)s, %(hash)s, %(size)s, 0, %(file)s, 0, %(now)s, %(now)s, %(user)s, %(user)s, 0, 0)
+		ON DUPLICATE KEY UPDATE modified = modified
+	""", {"hash": content_hash, "size": size, "file": file_url, "now": timestamp, "user": user})
+
+
+def update_content_references(doc, method=None):
+	"""
+	Apply the change in attachment rows to the blob reference counts
+	(on_change / after_delete hook)
+
+	Args:
+		doc: Document with a Letter Attachment table
+		method: Hook method name
+	"""
+	if method == "after_delete":
+		previous, current = get_attachment_rows(doc), []
+	else:
+		previous, current = get_attachment_rows(doc.get_doc_before_save()), get_attachment_rows(doc)
+
+	deltas = {}
+	for row in previous:
+		if row.get("content_hash"):
+			deltas[row.content_hash] = deltas.get(row.content_hash, 0) - 1
+	for row in current:
+		if row.get("content_hash"):
+			deltas[row.content_hash] = deltas.get(row.content_hash, 0) + 1
+
+	for content_hash, delta in deltas.items():
+		if delta:
+			frappe.db.sql("""
+				UPDATE `tabContent Blob`
+				SET ref_count = GREATEST(ref_count + %(delta)s, 0)
+				WHERE name = %(hash)s
+			""", {"delta": delta, "hash": content_hash})
+
+
+def get_cached_ocr(content_hash):
+	"""
+	Args:
+		content_hash: Content hash
+
+	Returns:
+		OCR text of the content, or None if it has not been extracted
+	"""
+	if not content_hash:
+		return None
+
+	blob = frappe.db.get_value("Content Blob", content_hash, ["ocr_extracted", "ocr_text"], as_dict=True)
+	if blob and cint(blob.ocr_extracted):
+		return blob.ocr_text or ""
+
+	return None
+
+
+def set_cached_ocr(content_hash, text):
+	"""
+	Keep the OCR text of a content for later attachments of the same file
+
+	Args:
+		content_hash: Content hash
+		text: Extracted text
+	"""
+	if content_hash:
+		frappe.db.set_value(
+			"Content Blob",
+			content_hash,
+			{"ocr_text": text, "ocr_extracted": 1},
+			update_modified=False
+		)
+
+
+def reconcile_content_blobs():
+	"""
+	Hash attachments added before the content store, recount blob
+	references and drop unused blobs (daily job)
+	"""
+	hashed = backfill_content_hashes(BACKFILL_BATCH_SIZE)
+
+	frappe.db.sql("""
+		UPDATE `tabContent Blob` blob
+		LEFT JOIN (
+			SELECT content_hash, COUNT(*) AS refs
+			FROM `tabLetter Attachment`
+			WHERE IFNULL(content_hash, '') != ''
+			GROUP BY content_hash
+		) attachment ON attachment.content_hash = blob.name
+		SET blob.ref_count = IFNULL(attachment.refs, 0)
+	""")
+
+	frappe.db.sql("DELETE FROM `tabContent Blob` WHERE ref_count = 0")
+	frappe.db.commit()
+
+	frappe.logger("content_store", allow_site=True).info({"hashed": hashed, "stats": get_store_usage()})
+
+
+def backfill_content_hashes(limit):
+	"""
+	Register attachment rows without a content hash
+
+	Args:
+		limit: Maximum rows
+
+	Returns:
+		Rows hashed
+	"""
+	rows = frappe.db.sql("""
+		SELECT name, file
+		FROM `tabLetter Attachment`
+		WHERE IFNULL(content_hash, '') = '' AND IFNULL(file, '') LIKE '/%%'
+			AND IFNULL(storage_tier, 'Hot') != 'Cold'
+		LIMIT %(limit)s
+	""", {"limit": cint(limit)}, as_dict=True)
+
+	hashed = 0
+	for row in rows:
+		try:
+			blob = store_file(row.file)
+		except Exception as e:
+			frappe.log_error(f"Content store backfill failed for {row.file}: {str(e)}")
+			continue
+
+		if blob:
+			frappe.db.set_value("Letter Attachment", row.name, "content_hash", blob.name, update_modified=False)
+			hashed += 1
+
+	frappe.db.commit()
+	return hashed
+
+
+def get_store_usage():
+	"""
+	Returns:
+		Distinct contents, attachment references, bytes stored once and bytes
+		the references would take as separate copies
+	"""
+	usage = frappe.db.sql("""
+		SELECT COUNT(*) AS blobs, SUM(ref_count) AS refs,
+			SUM(file_size) AS stored_bytes, SUM(file_size * GREATEST(ref_count, 1)) AS referenced_bytes
+		FROM `tabContent Blob`
+	""", as_dict=True)[0]
+
+	stored_bytes = cint(usage.stored_bytes)
+	referenced_bytes = cint(usage.referenced_bytes)
+
+	return {
+		"blobs": cint(usage.blobs),
+		"references": cint(usage.refs),
+		"stored_bytes": stored_bytes,
+		"referenced_bytes": referenced_bytes,
+		"saved_bytes": referenced_bytes - stored_bytes,
+		"dedup_ratio": flt(referenced_bytes / stored_bytes, 2) if stored_bytes else 0
+	}
+
+
+@frappe.whitelist()
+def get_content_store_stats():
+	"""
+	API endpoint returning content store usage
+
+	Returns:
+		Blob and reference counts with the bytes saved by storing duplicates once
+	"""
+	frappe.only_for("System Manager")
+
+	return {"success": True, **get_store_usage()}
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Correspondent Index Module
+Maintains the normalized Correspondent table used for exact, indexed
+sender/recipient matching and for autocomplete
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import now
+
+from correspondence.correspondence.utils.arabic_text import make_name_key
+
+
+# Letter doctype -> (name field, key field, date field)
+CORRESPONDENT_FIELDS = {
+	"Incoming Letter": ("sender", "sender_key", "date_received"),
+	"Outgoing Letter": ("recipient", "recipient_key", "date_created"),
+}
+
+
+def set_correspondent_key(doc, method=None):
+	"""
+	Set the normalized sender/recipient key on a letter (validate hook)
+	
+	Args:
+		doc: Incoming Letter or Outgoing Letter
+		method: Hook method name
+	"""
+	if doc.doctype not in CORRESPONDENT_FIELDS:
+		return
+	
+	name_field, key_field, date_field = CORRESPONDENT_FIELDS[doc.doctype]
+	doc.set(key_field, make_name_key(doc.get(name_field)))
+
+
+def update_correspondent_index(doc, method=None):
+	"""
+	Refresh the Correspondent rows touched by a letter (on_update / after_delete hook)
+	
+	Args:
+		doc: Incoming Letter or Outgoing Letter
+		method: Hook method name
+	"""
+	if doc.doctype not in CORRESPONDENT_FIELDS:
+		return
+	
+	name_field, key_field, date_field = CORRESPONDENT_FIELDS[doc.doctype]
+	keys = {doc.get(key_field)}
+	
+	previous = doc.get_doc_before_save()
+	if previous:
+		keys.add(previous.get(key_field))
+	
+	for key in keys:
+		if key:
+			refresh_correspondent(key, doc.get(name_field))
+
+
+def refresh_correspondent(key, display_name=None):
+	"""
+	Recount letters for a correspondent key and upsert its Correspondent row
+	
+	Counts use the indexed key columns, so this never scans the letter tables.
+	
+	Args:
+		key: Normalized correspondent key
+		display_name: Name to show for a newly created correspondent
+	"""
+	incoming = frappe.db.sql("""
+		SELECT COUNT(*) AS count, MAX(date_received) AS last_date, MAX(sender) AS display_name
+		FROM `tabIncoming Letter`
+		WHERE sender_key = %s
+	""", key, as_dict=True)[0]
+	
+	outgoing = frappe.db.sql("""
+		SELECT COUNT(*) AS count, MAX(date_created) AS last_date, MAX(recipient) AS display_name
+		FROM `tabOutgoing Letter`
+		WHERE recipient_key = %s
+	""", key, as_dict=True)[0]
+	
+	if not incoming.count and not outgoing.count:
+		frappe.db.delete("Correspondent", {"name": key})
+		return
+	
+	last_dates = [d for d in (incoming.last_date, outgoing.last_date) if d]
+	display_name = display_name or incoming.display_name or outgoing.display_name or key
+	
+	upsert_correspondent(
+		key,
+		display_name,
+		incoming.count,
+		outgoing.count,
+		max(last_dates) if last_dates else None
+	)
+
+
+def upsert_correspondent(key, display_name, incoming_count, outgoing_count, last_letter_date):
+	"""
+	Insert or update a Correspondent row in a single statement
+	
+	Args:
+		key: Normalized correspondent key (document name)
+		display_name: Name as written on the letters
+		incoming_count: Number of incoming letters from this correspondent
+		outgoing_count: Number of outgoing letters to this correspondent
+		last_letter_date: Date of the most recent letter
+	"""
+	timestamp = now()
+	user = frappe.session.user
+	
+	frappe.db.sql("""
+		INSERT INTO `tabCorrespondent`
+			(name, correspondent_name, incoming_count, outgoing_count, total_count,
+			 last_letter_date, creation, modified, owner, modified_by, docstatus, idx)
+		VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 0, 0)
+		ON DUPLICATE KEY UPDATE
+			incoming_count = VALUES(incoming_count),
+			outgoing_count = VALUES(outgoing_count),
+			total_count = VALUES(total_count),
+			last_letter_date = VALUES(last_letter_date),
+			modified = VALUES(modified),
+			modified_by = VALUES(modified_by)
+	""", (
+		key, display_name, incoming_count, outgoing_count, incoming_count + outgoing_count,
+		last_letter_date, timestamp, timestamp, user, user
+	))
+
+
+def rebuild_correspondent_index():
+	"""
+	Rebuild the whole Correspondent table from the letter key columns
+	
+	Used by the backfill patch; runs one grouped query per letter table.
+	"""
+	correspondents = {}
+	
+	for doctype, (name_field, key_field, date_field) in CORRESPONDENT_FIELDS.items():
+		rows = frappe.db.sql(f"""
+			SELECT `{key_field}` AS correspondent_key, MAX(`{name_field}`) AS display_name,
+			       COUNT(*) AS count, MAX(`{date_field}`) AS last_date
+			FROM `tab{doctype}`
+			WHERE IFNULL(`{key_field}`, '') != ''
+			GROUP BY `{key_field}`
+		""", as_dict=True)
+		
+		for row in rows:
+			entry = correspondents.setdefault(row.correspondent_key, {
+				"display_name": row.display_name,
+				"Incoming Letter": 0,
+				"Outgoing Letter": 0,
+				"last_date": None
+			})
+			entry[doctype] = row.count
+			if row.last_date and (not entry["last_date"] or row.last_date > entry["last_date"]):
+				entry["last_date"] = row.last_date
+	
+	frappe.db.delete("Correspondent")
+	
+	for key, entry in correspondents.items():
+		upsert_correspondent(
+			key,
+			entry["display_name"],
+			entry["Incoming Letter"],
+			entry["Outgoing Letter"],
+			entry["last_date"]
+		)
+
+
+@frappe.whitelist()
+def search_correspondents(txt, correspondent_type=None, limit=10):
+	"""
+	Autocomplete correspondents by normalized name prefix
+	
+	Args:
+		txt: Partial name as typed by the user
+		correspondent_type: Optional "sender" or "recipient" to restrict results
+		limit: Maximum results
+	
+	Returns:
+		List of correspondents ordered by number of letters (senders need
+		read permission on Incoming Letter, recipients on Outgoing Letter)
+	"""
+	can_read_senders = frappe.has_permission("Incoming Letter", "read")
+	can_read_recipients = frappe.has_permission("Outgoing Letter", "read")
+	
+	if correspondent_type == "sender":
+		can_read_recipients = False
+	elif correspondent_type == "recipient":
+		can_read_senders = False
+	
+	if not can_read_senders and not can_read_recipients:
+		frappe.throw(_("Not permitted to search correspondents"), frappe.PermissionError)
+	
+	key = make_name_key(txt)
+	
+	if not key:
+		return []
+	
+	conditions = ["name LIKE %(prefix)s"]
+	
+	if not can_read_recipients:
+		conditions.append("incoming_count > 0")
+	elif not can_read_senders:
+		conditions.append("outgoing_count > 0")
+	
+	return frappe.db.sql(f"""
+		SELECT name AS correspondent_key, correspondent_name, incoming_count,
+		       outgoing_count, last_letter_date
+		FROM `tabCorrespondent`
+		WHERE {' AND '.join(conditions)}
+		ORDER BY total_count DESC, last_letter_date DESC
+		LIMIT %(limit)s
+	""", {
+		"prefix": f"{key}%",
+		"limit": int(limit)
+	}, as_dict=True)
@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+File Storage Module
+Storage tiers for letter attachments.
+
+Attachments start in the hot tier (the site's files folders). A daily job
+moves the private files of letters archived longer than
+`cold_storage_after_days` (site config, default 365, 0 disables) into a
+gzip-compressed cold store and records the store key on their Letter
+Attachment rows; a file is only moved when every attachment row using it
+belongs to such a letter. Public files stay hot, since the web server
+serves them without asking Frappe.
+
+Reading a cold file through get_local_path restores it to its original
+path; requests for a cold file's URL restore it the same way before Frappe
+serves it (restore_requested_file). Restored copies form a read-through cache
+bounded by `cold_storage_cache_mb` (default 1024); the least recently used
+copies are removed first, the cold store keeps the master copy.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import time
+
+import frappe
+from frappe.utils import add_days, cint, flt, now, today
+
+from correspondence.correspondence.utils.archive_tables import get_letter_tables, get_stub_condition
+
+
+# Letter doctypes whose attachments can move to cold storage
+COLD_STORAGE_DOCTYPES = ["Incoming Letter", "Outgoing Letter"]
+
+DEFAULT_COLD_AFTER_DAYS = 365
+DEFAULT_CACHE_MB = 1024
+
+# Files moved per run of the daily job
+COLD_STORAGE_BATCH_SIZE = 1000
+
+# Bytes read per chunk while copying
+CHUNK_SIZE = 1024 * 1024
+
+# Redis keys of the read-through cache: restored copies scored by last
+# access and by size (sorted sets are not pickled by frappe.cache), and
+# their total size
+RESTORED_KEY = "cold_storage_restored"
+RESTORED_SIZES_KEY = "cold_storage_restored_sizes"
+RESTORED_BYTES_KEY = "cold_storage_restored_bytes"
+
+
+class LocalColdStore:
+	"""Cold store keeping gzip-compressed files on local disk, keyed by SHA-256"""
+
+	def __init__(self, root=None):
+		"""
+		Args:
+			root: Store directory (default site_config `cold_storage_path` or
+				private/cold_storage)
+		"""
+		self.root = root or frappe.conf.get("cold_storage_path") or frappe.get_site_path("private", "cold_storage")
+
+	def get_path(self, key):
+		return os.path.join(self.root, key[:2], f"{key}.gz")
+
+	def put(self, source_path):
+		"""
+		Compress a file into the store
+
+		Args:
+			source_path: File to store
+
+		Returns:
+			Store key (SHA-256 of the content)
+		"""
+		os.makedirs(self.root, exist_ok=True)
+		temp_path = os.path.join(self.root, f".{frappe.generate_hash(length=12)}.tmp")
+		sha256 = hashlib.sha256()
+
+		try:
+			with open(source_path, "rb") as source, gzip.open(temp_path, "wb") as target:
+				for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+					sha256.update(chunk)
+					target.write(chunk)
+
+			key = sha256.hexdigest()
+			path = self.get_path(key)
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			os.replace(temp_path, path)
+			return key
+
+		finally:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+
+	def restore(self, key, target_path):
+		"""
+		Decompress a stored file to a path
+
+		Args:
+			key: Store key
+			target_path: Destination (replaced atomically)
+
+		Returns:
+			Bytes written
+		"""
+		os.makedirs(os.path.dirname(target_path), exist_ok=True)
+		temp_path = f"{target_path}.{frappe.generate_hash(length=8)}.restore"
+
+		try:
+			with gzip.open(self.get_path(key), "rb") as source, open(temp_path, "wb") as target:
+				shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+			os.replace(temp_path, target_path)
+			return os.path.getsize(target_path)
+
+		finally:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+
+	def open(self, key):
+		"""
+		Args:
+			key: Store key
+
+		Returns:
+			Binary file object reading the decompressed content
+		"""
+		return gzip.open(self.get_path(key), "rb")
+
+	def get_original_size(self, key):
+		"""
+		Args:
+			key: Store key
+
+		Returns:
+			Size of the decompressed content in bytes (read through once)
+		"""
+		size = 0
+		with self.open(key) as source:
+			for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+				size += len(chunk)
+		return size
+
+	def exists(self, key):
+		return os.path.isfile(self.get_path(key))
+
+	def get_size(self, key):
+		return os.path.getsize(self.get_path(key))
+
+
+# site_config `cold_storage_backend` -> store class; other stores (e.g. an
+# object store client) implement put / restore / open / get_original_size /
+# exists / get_size
+COLD_STORES = {
+	"local": LocalColdStore,
+}
+
+
+def get_cold_store():
+	"""
+	Returns:
+		Configured cold store
+	"""
+	return COLD_STORES[frappe.conf.get("cold_storage_backend") or "local"]()
+
+
+def get_site_file_path(file_url):
+	"""
+	Args:
+		file_url: File URL (/files/... or /private/files/...)
+
+	Returns:
+		Path on disk, or None for remote files
+	"""
+	if not file_url or "://" in file_url:
+		return None
+
+	if file_url.startswith("/private/"):
+		return frappe.get_site_path(file_url.lstrip("/"))
+
+	return frappe.get_site_path("public", file_url.lstrip("/"))
+
+
+def get_cold_storage_key(file_url):
+	"""
+	Args:
+		file_url: File URL
+
+	Returns:
+		Cold store key if the file has moved to cold storage, else None
+	"""
+	return frappe.db.get_value(
+		"Letter Attachment",
+		{"file": file_url, "storage_tier": "Cold"},
+		"cold_storage_key"
+	)
+
+
+def get_local_path(file_url):
+	"""
+	Path of a file on disk, restoring it from cold storage when needed
+
+	Use this instead of building the path when reading attachments.
+
+	Args:
+		file_url: File URL
+
+	Returns:
+		Path on disk (may not exist if the file is missing in both tiers)
+	"""
+	path = get_site_file_path(file_url)
+	if not path:
+		return None
+
+	key = get_cold_storage_key(file_url)
+	if not key:
+		return path
+
+	if os.path.isfile(path):
+		touch_restored(file_url)
+	else:
+		size = get_cold_store().restore(key, path)
+		add_restored(file_url, size)
+
+	return path
+
+
+def restore_requested_file():
+	"""
+	Restore a cold file before Frappe serves its /private/files URL
+	(before_request hook)
+
+	Only users who may download the file trigger a restore; Frappe checks
+	the permission again when serving it.
+	"""
+	request = getattr(frappe.local, "request", None)
+	if not request or not request.path.startswith("/private/files/"):
+		return
+
+	file_url = request.path
+	if frappe.session.user == "Guest" or not get_cold_storage_key(file_url):
+		return
+
+	for name in frappe.get_all("File", filters={"file_url": file_url}, pluck="name"):
+		if frappe.get_doc("File", name).is_downloadable():
+			get_local_path(file_url)
+			return
+
+
+def open_file(file_url):
+	"""
+	Open a file for reading without restoring it from cold storage
+
+	Args:
+		file_url: File URL
+
+	Returns:
+		Tuple of (binary file object, size in bytes), or None if the file is
+		missing in both tiers
+	"""
+	path = get_site_file_path(file_url)
+	if not path:
+		return None
+
+	try:
+		fileobj = open(path, "rb")
+		return fileobj, os.fstat(fileobj.fileno()).st_size
+	except FileNotFoundError:
+		pass
+
+	row = frappe.db.get_value(
+		"Letter Attachment",
+		{"file": file_url, "storage_tier": "Cold"},
+		["cold_storage_key", "file_size"],
+		as_dict=True
+	)
+	store = get_cold_store()
+	if not row or not store.exists(row.cold_storage_key):
+		return None
+
+	size = cint(row.file_size) or store.get_original_size(row.cold_storage_key)
+	return store.open(row.cold_storage_key), size
+
+
+def touch_restored(file_url):
+	cache = frappe.cache()
+	cache.zadd(cache.make_key(RESTORED_KEY), {file_url: time.time()})
+
+
+def add_restored(file_url, size):
+	"""
+	Register a restored copy in the read-through cache and evict the least
+	recently used copies beyond the size limit
+
+	Args:
+		file_url: File URL
+		size: Restored bytes
+	"""
+	cache = frappe.cache()
+	previous = cint(cache.zscore(cache.make_key(RESTORED_SIZES_KEY), file_url))
+
+	cache.zadd(cache.make_key(RESTORED_SIZES_KEY), {file_url: size})
+	cache.incrby(cache.make_key(RESTORED_BYTES_KEY), size - previous)
+	touch_restored(file_url)
+
+	evict_restored(keep=file_url)
+
+
+def evict_restored(keep=None, limit_bytes=None):
+	"""
+	Remove restored copies, least recently used first, until the cache fits
+
+	Args:
+		keep: File URL never evicted in this call (the one being read)
+		limit_bytes: Cache size (default from site config)
+	"""
+	cache = frappe.cache()
+	limit_bytes = get_cache_limit() if limit_bytes is None else limit_bytes
+	lru_key = cache.make_key(RESTORED_KEY)
+
+	while cint(cache.get(cache.make_key(RESTORED_BYTES_KEY))) > limit_bytes:
+		oldest = [frappe.safe_decode(url) for url in cache.zrange(lru_key, 0, 1)]
+		oldest = [url for url in oldest if url != keep]
+		if not oldest:
+			break
+
+		remove_restored(oldest[0])
+
+
+def remove_restored(file_url):
+	"""
+	Delete a restored copy (only if the cold store still holds the file)
+
+	Args:
+		file_url: File URL
+	"""
+	cache = frappe.cache()
+	size = cint(cache.zscore(cache.make_key(RESTORED_SIZES_KEY), file_url))
+	key = get_cold_storage_key(file_url)
+
+	if key and get_cold_store().exists(key):
+		path = get_site_file_path(file_url)
+		if path and os.path.isfile(path):
+			os.remove(path)
+
+	cache.zrem(cache.make_key(RESTORED_KEY), file_url)
+	cache.zrem(cache.make_key(RESTORED_SIZES_KEY), file_url)
+	cache.incrby(cache.make_key(RESTORED_BYTES_KEY), -size)
+
+
+def get_cache_limit():
+	"""
+	Returns:
+		Read-through cache size in bytes (site_config `cold_storage_cache_mb`)
+	"""
+	return cint(frappe.conf.get("cold_storage_cache_mb") or DEFAULT_CACHE_MB) * 1024 * 1024
+
+
+def get_cold_cutoff():
+	"""
+	Returns:
+		Letters archived before this date are moved to cold storage, or None
+		when cold storage is disabled
+	"""
+	days = frappe.conf.get("cold_storage_after_days")
+	days = DEFAULT_COLD_AFTER_DAYS if days is None else cint(days)
+
+	return add_days(today(), -days) if days > 0 else None
+
+
+def get_cold_candidates(cutoff, limit):
+	"""
+	Hot files used only by letters archived before the cutoff
+
+	Args:
+		cutoff: Archive date cutoff
+		limit: Maximum files
+
+	Returns:
+		List of file URLs
+	"""
+	# Letters moved to archive tables count like the others
+	branches = [f"""
+		SELECT attachment.file, (letter.is_archived = 1 AND letter.archived_on < %(cutoff)s) AS eligible
+		FROM `tabLetter Attachment` attachment
+		INNER JOIN `{table}` letter ON letter.name = attachment.parent
+		WHERE attachment.parenttype = %(doctype_{i})s AND {get_stub_condition(doctype, "letter")}
+	""" for i, doctype in enumerate(COLD_STORAGE_DOCTYPES) for table in get_letter_tables(doctype)]
+
+	# Rows of other parents keep their files hot
+	branches.append("""
+		SELECT file, 0 AS eligible
+		FROM `tabLetter Attachment`
+		WHERE parenttype NOT IN %(doctypes)s
+	""")
+
+	values = {"cutoff": cutoff, "doctypes": tuple(COLD_STORAGE_DOCTYPES), "limit": cint(limit)}
+	for i, doctype in enumerate(COLD_STORAGE_DOCTYPES):
+		values[f"doctype_{i}"] = doctype
+
+	return frappe.db.sql_list(f"""
+		SELECT file_usage.file
+		FROM ({' UNION ALL '.join(branches)}) AS file_usage
+		WHERE file_usage.file LIKE '/private/files/%%'
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabLetter Attachment` cold
+				WHERE cold.file = file_usage.file AND cold.storage_tier = 'Cold'
+			)
+		GROUP BY file_usage.file
+		HAVING MIN(file_usage.eligible) = 1
+		LIMIT %(limit)s
+	""", values)
+
+
+def move_to_cold_storage(file_url, store=None):
+	"""
+	Move one file to the cold store
+
+	The attachment rows are updated and committed before the hot copy is
+	deleted, so a failure never leaves a row pointing at a missing file.
+
+	Args:
+		file_url: File URL
+		store: Cold store (default configured store)
+
+	Returns:
+		Tuple of (original bytes, stored bytes), or None if the file is missing
+	"""
+	store = store or get_cold_store()
+	path = get_site_file_path(file_url)
+
+	if not path or not os.path.isfile(path):
+		return None
+
+	size = os.path.getsize(path)
+	key = store.put(path)
+
+	frappe.db.sql("""
+		UPDATE `tabLetter Attachment`
+		SET storage_tier = 'Cold', cold_storage_key = %(key)s, moved_to_cold_on = %(now)s, file_size = %(size)s
+		WHERE file = %(file)s
+	""", {"key": key, "now": now(), "size": size, "file": file_url})
+	frappe.db.commit()
+
+	os.remove(path)
+	return size, store.get_size(key)
+
+
+def move_archived_attachments_to_cold_storage():
+	"""Move attachments of long-archived letters to cold storage (daily job)"""
+	cutoff = get_cold_cutoff()
+	if not cutoff:
+		return
+
+	store = get_cold_store()
+	moved = missing = original_bytes = stored_bytes = 0
+	start = time.perf_counter()
+
+	for file_url in get_cold_candidates(cutoff, COLD_STORAGE_BATCH_SIZE):
+		try:
+			sizes = move_to_cold_storage(file_url, store)
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Moving {file_url} to cold storage failed: {str(e)}")
+			continue
+
+		if not sizes:
+			missing += 1
+			continue
+
+		moved += 1
+		original_bytes += sizes[0]
+		stored_bytes += sizes[1]
+
+	frappe.logger("cold_storage", allow_site=True).info({
+		"moved": moved,
+		"missing": missing,
+		"original_bytes": original_bytes,
+		"stored_bytes": stored_bytes,
+		"elapsed_s": flt(time.perf_counter() - start, 2)
+	})
+
+
+@frappe.whitelist()
+def get_cold_storage_stats():
+	"""
+	API endpoint returning storage tier usage
+
+	Returns:
+		Files per tier and read-through cache usage
+	"""
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	tiers = dict(frappe.db.sql("""
+		SELECT IFNULL(storage_tier, 'Hot'), COUNT(DISTINCT file)
+		FROM `tabLetter Attachment`
+		WHERE IFNULL(file, '') != ''
+		GROUP BY IFNULL(storage_tier, 'Hot')
+	"""))
+
+	return {
+		"success": True,
+		"hot_files": cint(tiers.get("Hot")),
+		"cold_files": cint(tiers.get("Cold")),
+		"cold_after_days": frappe.conf.get("cold_storage_after_days", DEFAULT_COLD_AFTER_DAYS),
+		"restored_files": cint(cache.zcard(cache.make_key(RESTORED_KEY))),
+		"restored_bytes": cint(cache.get(cache.make_key(RESTORED_BYTES_KEY))),
+		"cache_limit_bytes": get_cache_limit()
+	}
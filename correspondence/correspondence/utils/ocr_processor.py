@@ -10,6 +10,13 @@ Handles text extraction from PDF and image files using Tesseract OCR
 import frappe
 import os
 
+from correspondence.correspondence.utils.content_store import (
+	get_cached_ocr,
+	get_recorded_hash,
+	set_cached_ocr,
+)
+from correspondence.correspondence.utils.file_storage import get_local_path
+
 
 def extract_text_from_file(file_path):
 	"""
@@ -104,6 +111,27 @@ def extract_from_image(image_path):
 		return ""
 
 
+def get_file_text(file_url):
+	"""
+	Extract the text of a site file, reusing the OCR text of attachments
+	with the same content
+	
+	Args:
+		file_url: URL of the file (relative to site)
+	
+	Returns:
+		Extracted text
+	"""
+	content_hash = get_recorded_hash(file_url)
+	text = get_cached_ocr(content_hash)
+	
+	if text is None:
+		text = extract_text_from_file(get_local_path(file_url))
+		set_cached_ocr(content_hash, text)
+	
+	return text
+
+
 @frappe.whitelist()
 def process_file_ocr(file_url):
 	"""
@@ -116,8 +144,7 @@ def process_file_ocr(file_url):
 		Extracted text
 	"""
 	try:
-		file_path = frappe.get_site_path('public', file_url.lstrip('/'))
-		text = extract_text_from_file(file_path)
+		text = get_file_text(file_url)
 		return {"success": True, "text": text}
 	except Exception as e:
 		frappe.log_error(f"OCR API failed: {str(e)}")
@@ -144,8 +171,7 @@ def batch_process_ocr(file_urls):
 	
 	for file_url in file_urls:
 		try:
-			file_path = frappe.get_site_path('public', file_url.lstrip('/'))
-			text = extract_text_from_file(file_path)
+			text = get_file_text(file_url)
 			results[file_url] = {"success": True, "text": text}
 		except Exception as e:
 			results[file_url] = {"success": False, "error": str(e)}
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Query Builder Module
+Shared, parameterized filtering for the search API and the register reports.
+
+Filters are declared per caller as a whitelist of filter key -> (column,
+operator). Values are always sent as query parameters, so the statement text
+only depends on which filters are set (stable for plan and statement
+caching), and columns are compared directly (no functions on the column), so
+conditions stay index friendly.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder import DocType, Table
+
+from correspondence.correspondence.utils.archive_tables import ARCHIVE_TABLE_DOCTYPES, get_letter_tables
+
+
+# Operators allowed in filter declarations
+OPERATORS = {
+	"=": lambda column, value: column == value,
+	"!=": lambda column, value: column != value,
+	">": lambda column, value: column > value,
+	">=": lambda column, value: column >= value,
+	"<": lambda column, value: column < value,
+	"<=": lambda column, value: column <= value,
+	"in": lambda column, value: column.isin(value),
+	"like": lambda column, value: column.like(value),
+}
+
+SQL_OPERATORS = {"=": "=", "!=": "!=", ">": ">", ">=": ">=", "<": "<", "<=": "<=", "in": "IN", "like": "LIKE"}
+
+# Common register filters: key -> (column, operator); "{date}" is replaced
+# by the doctype's date column
+DATE_RANGE_FILTERS = {
+	"from_date": ("{date}", ">="),
+	"to_date": ("{date}", "<="),
+}
+
+
+def get_filter_spec(allowed_filters, key):
+	"""
+	Look up a filter declaration
+
+	Args:
+		allowed_filters: Dict of filter key -> (column, operator)
+		key: Filter key
+
+	Returns:
+		Tuple of (column, operator)
+	"""
+	if key not in allowed_filters:
+		frappe.throw(_("Filtering on {0} is not allowed").format(key))
+
+	column, operator = allowed_filters[key]
+	if operator not in OPERATORS:
+		frappe.throw(_("Invalid filter operator: {0}").format(operator))
+
+	return column, operator
+
+
+def iter_filters(filters, allowed_filters, ignore_unknown=False):
+	"""
+	Yield the set filters with their declaration
+
+	Args:
+		filters: Dict of filter key -> value (empty values are skipped)
+		allowed_filters: Dict of filter key -> (column, operator)
+		ignore_unknown: Skip keys that are not declared instead of failing
+
+	Yields:
+		Tuples of (key, column, operator, value)
+	"""
+	for key, value in (filters or {}).items():
+		if value in (None, "", []):
+			continue
+
+		if ignore_unknown and key not in allowed_filters:
+			continue
+
+		column, operator = get_filter_spec(allowed_filters, key)
+		if operator == "in" and not isinstance(value, (list, tuple)):
+			value = [value]
+
+		yield key, column, operator, value
+
+
+def get_register_query(doctype, fields, filters, allowed_filters, order_by, table=None):
+	"""
+	Build a register report query with frappe.qb
+
+	Cancelled documents are excluded and unknown filter keys are ignored
+	(reports may pass extra UI-only filters).
+
+	Args:
+		doctype: Document type
+		fields: List of column names or (column, alias) tuples
+		filters: Report filters
+		allowed_filters: Dict of filter key -> (column, operator)
+		order_by: List of (column, "asc" or "desc")
+		table: Table with the columns of the doctype to read instead (an
+			archive table, see utils.archive_tables)
+
+	Returns:
+		frappe.qb query (run it with .run(as_dict=True))
+	"""
+	table = Table(table) if table else DocType(doctype)
+	columns = [table[field].as_(alias) if alias else table[field] for field, alias in normalize_fields(fields)]
+	query = frappe.qb.from_(table).select(*columns).where(table.docstatus < 2)
+
+	for key, column, operator, value in iter_filters(filters, allowed_filters, ignore_unknown=True):
+		query = query.where(OPERATORS[operator](table[column], value))
+
+	for column, order in order_by:
+		query = query.orderby(table[column], order=frappe.qb.desc if order == "desc" else frappe.qb.asc)
+
+	return query
+
+
+def run_register_query(doctype, fields, filters, allowed_filters, order_by, date_field):
+	"""
+	Run a register report query over the letter table and the archive
+	tables the date range filters can match
+
+	Args:
+		doctype: Document type
+		fields: List of column names or (column, alias) tuples
+		filters: Report filters (from_date / to_date on date_field)
+		allowed_filters: Dict of filter key -> (column, operator)
+		order_by: List of (column, "asc" or "desc")
+		date_field: Date column of the from_date / to_date filters
+
+	Returns:
+		List of rows in order_by order
+	"""
+	filters = filters or {}
+	tables = get_letter_tables(doctype, filters.get("from_date"), filters.get("to_date"), date_field)
+
+	data = []
+	for table in tables:
+		query = get_register_query(doctype, fields, filters, allowed_filters, order_by, table=table)
+
+		# Moved letters are read from their archive table, not their stub
+		if doctype in ARCHIVE_TABLE_DOCTYPES:
+			query = query.where(Table(table)["archive_table"].isnull())
+
+		data += query.run(as_dict=True)
+
+	if len(tables) > 1:
+		# Merge the tables; stable sorts from the last key, NULLs lowest as in MariaDB
+		aliases = {field: alias or field for field, alias in normalize_fields(fields)}
+		for column, order in reversed(order_by):
+			key = aliases.get(column, column)
+			data.sort(key=lambda row: (row.get(key) is not None, row.get(key)), reverse=order == "desc")
+
+	return data
+
+
+def normalize_fields(fields):
+	"""
+	Args:
+		fields: Column names or (column, alias) tuples
+
+	Returns:
+		List of (column, alias or None)
+	"""
+	return [field if isinstance(field, (list, tuple)) else (field, None) for field in fields]
+
+
+def get_date_range_filters(date_field):
+	"""
+	from_date / to_date declarations for a date column
+
+	Args:
+		date_field: Date column
+
+	Returns:
+		Dict of filter key -> (column, operator)
+	"""
+	return {key: (column.format(date=date_field), operator) for key, (column, operator) in DATE_RANGE_FILTERS.items()}
+
+
+def build_sql_conditions(filters, allowed_filters, values, prefix, columns=None):
+	"""
+	Build parameterized WHERE conditions for hand-written SQL
+
+	Used where frappe.qb cannot express the rest of the statement (UNION
+	ALL across doctypes, MATCH ... AGAINST).
+
+	Args:
+		filters: Dict of filter key -> value
+		allowed_filters: Dict of filter key -> (column, operator)
+		values: Dict of query parameters (updated in place)
+		prefix: Parameter name prefix
+		columns: Optional set of columns that exist; a filter on a missing
+			column makes the result None
+
+	Returns:
+		List of SQL conditions, or None if a filtered column is missing
+	"""
+	conditions = []
+
+	for key, column, operator, value in iter_filters(filters, allowed_filters):
+		if columns is not None and column not in columns:
+			return None
+
+		param = f"{prefix}_{key}"
+		values[param] = tuple(value) if operator == "in" else value
+		conditions.append(f"`{column}` {SQL_OPERATORS[operator]} %({param})s")
+
+	return conditions
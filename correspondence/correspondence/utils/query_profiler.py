@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Query Profiler Module
+Timing breakdown and slow-query log for the search API.
+
+Every query run through profiled_sql is timed. Queries slower than
+`search_slow_query_ms` (site config, default 1000) are written with their
+SQL and parameters to the `search_slow_queries` log. When a request asks
+for timings, each phase and query is recorded, rows read by the storage
+engine are compared with rows returned, and `analyze` mode adds per-table
+figures from ANALYZE FORMAT=JSON.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint, flt
+
+
+# Queries slower than this many milliseconds are logged
+DEFAULT_SLOW_QUERY_MS = 1000
+
+
+class SearchProfiler:
+	"""Collects the timing breakdown of one search request"""
+
+	def __init__(self, endpoint, mode=None):
+		"""
+		Args:
+			endpoint: Endpoint name
+			mode: None (slow log only), "timings" or "analyze"
+		"""
+		self.endpoint = endpoint
+		self.mode = mode
+		self.phases = []
+		self.queries = []
+		self.start = time.perf_counter()
+
+	@property
+	def enabled(self):
+		return bool(self.mode)
+
+	@contextmanager
+	def phase(self, name):
+		"""
+		Time a phase of the request
+
+		Args:
+			name: Phase name
+		"""
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			if self.enabled:
+				self.phases.append({"phase": name, "ms": elapsed_ms(start)})
+
+	def sql(self, label, query, values=None, as_dict=True):
+		"""
+		Run and time a query
+
+		Args:
+			label: What the query does (e.g. "results", "count Incoming Letter")
+			query: SQL
+			values: Query parameters
+			as_dict: Return rows as dicts
+
+		Returns:
+			Query result
+		"""
+		handler_reads = get_handler_reads() if self.enabled else 0
+		start = time.perf_counter()
+
+		result = frappe.db.sql(query, values, as_dict=as_dict)
+
+		ms = elapsed_ms(start)
+		entry = {"query": label, "ms": ms, "rows_returned": len(result)}
+
+		if self.enabled:
+			entry["rows_examined"] = get_handler_reads() - handler_reads
+			if self.mode == "analyze":
+				entry["tables"] = analyze_query(query, values)
+			self.queries.append(entry)
+
+		if ms >= get_slow_query_threshold():
+			log_slow_query(self.endpoint, label, query, values, entry)
+
+		return result
+
+	def report(self):
+		"""
+		Timing breakdown to return with the response
+
+		Returns:
+			Dict with total time, phases and queries
+		"""
+		return {
+			"total_ms": elapsed_ms(self.start),
+			"phases": self.phases,
+			"queries": self.queries
+		}
+
+	def finish(self, response):
+		"""
+		Attach (and log) the breakdown when timings were requested
+
+		Args:
+			response: Endpoint response (updated in place)
+
+		Returns:
+			The response
+		"""
+		if self.enabled and isinstance(response, dict):
+			response["timings"] = self.report()
+			frappe.logger("search_timings", allow_site=True).info({
+				"endpoint": self.endpoint,
+				"user": frappe.session.user,
+				**response["timings"]
+			})
+
+		return response
+
+
+def get_profiler_mode(with_timings):
+	"""
+	Resolve the with_timings argument of an endpoint
+
+	Timings bypass the result cache and analyze runs every query twice, so
+	only System Managers get them; other users get the slow-query log only.
+
+	Args:
+		with_timings: Falsy, truthy or "analyze"
+
+	Returns:
+		None, "timings" or "analyze"
+	"""
+	if not with_timings or "System Manager" not in frappe.get_roles():
+		return None
+
+	if with_timings == "analyze":
+		return "analyze"
+
+	return "timings" if cint(with_timings) else None
+
+
+def get_slow_query_threshold():
+	"""
+	Slow query threshold from site config
+
+	Returns:
+		Milliseconds
+	"""
+	return flt(frappe.conf.get("search_slow_query_ms") or DEFAULT_SLOW_QUERY_MS)
+
+
+def elapsed_ms(start):
+	return round((time.perf_counter() - start) * 1000, 2)
+
+
+def get_handler_reads():
+	"""
+	Rows read by the storage engine in this session so far
+
+	Returns:
+		Sum of the Handler_read_* status counters
+	"""
+	rows = frappe.db.sql("SHOW SESSION STATUS LIKE 'Handler_read%%'")
+	return sum(cint(value) for name, value in rows)
+
+
+def analyze_query(query, values=None):
+	"""
+	Per-table rows read and time from ANALYZE FORMAT=JSON
+
+	The query is executed a second time, so this is only used on request.
+
+	Args:
+		query: SELECT statement
+		values: Query parameters
+
+	Returns:
+		Dict of table -> {"rows_examined", "ms"}
+	"""
+	plan = json.loads(frappe.db.sql(f"ANALYZE FORMAT=JSON {query}", values)[0][0])
+	tables = {}
+
+	def walk(node):
+		if isinstance(node, dict):
+			table = node.get("table")
+			if isinstance(table, dict) and table.get("table_name"):
+				stats = tables.setdefault(table["table_name"], {"rows_examined": 0, "ms": 0})
+				stats["rows_examined"] += round(flt(table.get("r_rows")) * flt(table.get("r_loops") or 1))
+				stats["ms"] = round(stats["ms"] + flt(table.get("r_total_time_ms")), 2)
+			for value in node.values():
+				walk(value)
+		elif isinstance(node, list):
+			for value in node:
+				walk(value)
+
+	walk(plan)
+	return tables
+
+
+def log_slow_query(endpoint, label, query, values, entry):
+	"""
+	Write a slow query to the search_slow_queries log
+
+	Args:
+		endpoint: Endpoint name
+		label: Query label
+		query: SQL
+		values: Query parameters
+		entry: Timing entry
+	"""
+	frappe.logger("search_slow_queries", allow_site=True).warning({
+		"endpoint": endpoint,
+		"query": label,
+		"user": frappe.session.user,
+		"sql": " ".join(query.split()),
+		"values": values,
+		**entry
+	})
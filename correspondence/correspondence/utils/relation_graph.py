@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Relation Graph Module
+Stores relations between letters as edges in the Letter Relation table so
+they can be read from either end with a single indexed query
+"""
+
+import frappe
+from frappe.utils import flt, now
+
+
+EDGE_FIELDS = [
+	"name", "source_doctype", "source_name", "target_doctype", "target_name",
+	"score", "relation_reason", "strategy", "relation_type",
+	"creation", "modified", "owner", "modified_by", "docstatus", "idx"
+]
+
+
+def save_auto_relations(doctype, docname, related_docs):
+	"""
+	Incrementally replace the auto-generated edges going out of a document
+	
+	Only the difference is written: stale edges are deleted, edges whose
+	score or reason changed are updated and new edges are bulk inserted.
+	Manual edges are left untouched.
+	
+	Args:
+		doctype: Source document type
+		docname: Source document name
+		related_docs: Results of find_all_related_documents
+	
+	Returns:
+		Dict with counts of inserted, updated and deleted edges
+	"""
+	existing = {
+		(edge.target_doctype, edge.target_name): edge
+		for edge in frappe.get_all(
+			"Letter Relation",
+			filters={
+				"source_doctype": doctype,
+				"source_name": docname,
+				"relation_type": "Auto"
+			},
+			fields=["name", "target_doctype", "target_name", "score", "relation_reason", "strategy"]
+		)
+	}
+	
+	wanted = {}
+	for rel_doc in related_docs:
+		if rel_doc.get("doctype") == doctype and rel_doc.get("name") == docname:
+			continue
+		wanted[(rel_doc.get("doctype"), rel_doc.get("name"))] = rel_doc
+	
+	to_delete = [edge.name for key, edge in existing.items() if key not in wanted]
+	to_insert = []
+	updated = 0
+	timestamp = now()
+	user = frappe.session.user
+	
+	for key, rel_doc in wanted.items():
+		score = flt(rel_doc.get("score"), 3)
+		reason = rel_doc.get("relation_reason", "")
+		strategy = rel_doc.get("strategy")
+		edge = existing.get(key)
+		
+		if not edge:
+			to_insert.append((
+				frappe.generate_hash(length=12), doctype, docname, key[0], key[1],
+				score, reason, strategy, "Auto",
+				timestamp, timestamp, user, user, 0, 0
+			))
+		elif flt(edge.score, 3) != score or edge.relation_reason != reason or edge.strategy != strategy:
+			frappe.db.set_value(
+				"Letter Relation",
+				edge.name,
+				{"score": score, "relation_reason": reason, "strategy": strategy},
+				update_modified=True
+			)
+			updated += 1
+	
+	if to_delete:
+		frappe.db.delete("Letter Relation", {"name": ["in", to_delete]})
+	
+	if to_insert:
+		frappe.db.bulk_insert("Letter Relation", EDGE_FIELDS, to_insert)
+	
+	return {"inserted": len(to_insert), "updated": updated, "deleted": len(to_delete)}
+
+
+def sync_manual_relations(doc, method=None):
+	"""
+	Mirror the manual rows of the Related Documents table into the graph (on_update hook)
+	
+	Args:
+		doc: Incoming Letter or Outgoing Letter
+		method: Hook method name
+	"""
+	manual_rows = {
+		(row.document_type, row.document_name): row
+		for row in (doc.get("related_documents") or [])
+		if row.relation_type == "Manual" and row.document_type and row.document_name
+	}
+	
+	existing = {
+		(edge.target_doctype, edge.target_name): edge.name
+		for edge in frappe.get_all(
+			"Letter Relation",
+			filters={
+				"source_doctype": doc.doctype,
+				"source_name": doc.name,
+				"relation_type": "Manual"
+			},
+			fields=["name", "target_doctype", "target_name"]
+		)
+	}
+	
+	to_delete = [name for key, name in existing.items() if key not in manual_rows]
+	if to_delete:
+		frappe.db.delete("Letter Relation", {"name": ["in", to_delete]})
+	
+	timestamp = now()
+	user = frappe.session.user
+	to_insert = [
+		(
+			frappe.generate_hash(length=12), doc.doctype, doc.name, key[0], key[1],
+			flt(row.similarity_score, 3) or 1.0, row.notes or "", "Manual", "Manual",
+			timestamp, timestamp, user, user, 0, 0
+		)
+		for key, row in manual_rows.items()
+		if key not in existing
+	]
+	
+	if to_insert:
+		frappe.db.bulk_insert("Letter Relation", EDGE_FIELDS, to_insert)
+
+
+def delete_relations(doc, method=None):
+	"""
+	Remove every edge touching a deleted document (after_delete hook)
+	
+	Args:
+		doc: Deleted document
+		method: Hook method name
+	"""
+	frappe.db.delete("Letter Relation", {"source_doctype": doc.doctype, "source_name": doc.name})
+	frappe.db.delete("Letter Relation", {"target_doctype": doc.doctype, "target_name": doc.name})
+
+
+def get_relations(doctype, docname, limit=50):
+	"""
+	Get documents related to a document in either direction
+	
+	Args:
+		doctype: Document type
+		docname: Document name
+		limit: Maximum results
+	
+	Returns:
+		List of related documents sorted by score (one entry per document),
+		leaving out documents the session user may not read
+	"""
+	edges = frappe.db.sql("""
+		SELECT target_doctype AS doctype, target_name AS name, score, relation_reason,
+		       strategy, relation_type, 'outgoing' AS direction
+		FROM `tabLetter Relation`
+		WHERE source_doctype = %(doctype)s AND source_name = %(docname)s
+		UNION ALL
+		SELECT source_doctype AS doctype, source_name AS name, score, relation_reason,
+		       strategy, relation_type, 'incoming' AS direction
+		FROM `tabLetter Relation`
+		WHERE target_doctype = %(doctype)s AND target_name = %(docname)s
+	""", {"doctype": doctype, "docname": docname}, as_dict=True)
+	
+	# An edge may exist in both directions; keep the strongest one
+	unique = {}
+	for edge in edges:
+		key = (edge.doctype, edge.name)
+		if key not in unique or flt(edge.score) > flt(unique[key].score):
+			unique[key] = edge
+	
+	results = []
+	for edge in sorted(unique.values(), key=lambda x: flt(x.score), reverse=True):
+		if len(results) >= int(limit):
+			break
+		if frappe.has_permission(edge.doctype, "read", edge.name):
+			results.append(edge)
+	
+	return results
+
+
+@frappe.whitelist()
+def get_related_documents(doctype, docname, limit=50):
+	"""
+	API endpoint to get related documents from the relation graph
+	
+	Args:
+		doctype: Document type
+		docname: Document name
+		limit: Maximum results
+	
+	Returns:
+		Related documents
+	"""
+	try:
+		frappe.has_permission(doctype, "read", docname, throw=True)
+		
+		related = get_relations(doctype, docname, limit)
+		
+		return {"success": True, "related_documents": related, "count": len(related)}
+	
+	except frappe.PermissionError:
+		raise
+	except Exception as e:
+		frappe.log_error(f"Get related documents failed: {str(e)}")
+		return {"success": False, "error": str(e)}
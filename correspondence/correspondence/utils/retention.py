@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Retention Module
+Purges records that have outlived their retention period.
+
+Generated QR codes and barcodes (regenerated on request), read
+notifications about correspondence documents are deleted once they are
+older than the days configured for them. Relations are not aged out: the
+auto edges of archived letters are never recomputed, and saving a letter
+already deletes its superseded edges, so only relations whose source or
+target document no longer exists are deleted. Deletes run in small batches,
+each committed on its own with a pause in between, so a large backlog
+never holds locks for long; a run stops after a time budget and the next
+one carries on. Every run logs the rows deleted and the rate per policy.
+"""
+
+import json
+import time
+
+import frappe
+from frappe.utils import add_days, cint, flt, now, now_datetime
+
+
+# Doctype -> date column the age is measured on, default retention in days
+# and the conditions selecting the records the policy applies to
+# (app_documents: only records about documents of this app; orphaned_links:
+# (doctype column, name column) pairs of which one pointing at a missing
+# document makes a record expired, instead of its age)
+RETENTION_POLICIES = {
+	"Document QR Code": {"date_field": "generated_date", "days": 365, "conditions": []},
+	"Document Barcode": {"date_field": "generated_date", "days": 365, "conditions": []},
+	"Notification Log": {
+		"date_field": "creation",
+		"days": 90,
+		"conditions": ["`read` = 1"],
+		"app_documents": True
+	},
+	"Letter Relation": {
+		"conditions": [],
+		"orphaned_links": [("source_doctype", "source_name"), ("target_doctype", "target_name")]
+	},
+	"Related Document": {
+		"conditions": ["`relation_type` = 'Auto'"],
+		"orphaned_links": [("document_type", "document_name")]
+	},
+}
+
+# Rows deleted per transaction
+DEFAULT_BATCH_SIZE = 1000
+
+# Pause between batches, in seconds
+DEFAULT_BATCH_SLEEP = 0.2
+
+# A run stops after this many seconds; the next run continues
+DEFAULT_MAX_SECONDS = 1800
+
+LAST_RUN_KEY = "retention_last_run"
+
+
+def get_retention_days(doctype):
+	"""
+	Args:
+		doctype: Doctype with a retention policy
+
+	Returns:
+		Days records are kept (`retention_days` in site config overrides
+		the default per doctype; 0 keeps them forever), None for policies
+		not based on age
+	"""
+	if not RETENTION_POLICIES[doctype].get("date_field"):
+		return None
+
+	overrides = frappe.conf.get("retention_days") or {}
+	return cint(overrides.get(doctype, RETENTION_POLICIES[doctype]["days"]))
+
+
+def get_expired_condition(doctype, cutoff, values):
+	"""
+	Args:
+		doctype: Doctype with a retention policy
+		cutoff: Records dated before this are expired (ignored by policies
+			not based on age)
+		values: Dict of query parameters (updated in place)
+
+	Returns:
+		SQL condition selecting the expired records
+	"""
+	policy = RETENTION_POLICIES[doctype]
+	conditions = list(policy["conditions"])
+
+	if policy.get("date_field"):
+		conditions.append(f"`{policy['date_field']}` < %(cutoff)s")
+		values["cutoff"] = cutoff
+
+	if policy.get("orphaned_links"):
+		conditions.append(get_orphaned_condition(doctype, policy["orphaned_links"], values))
+
+	if policy.get("app_documents"):
+		conditions.append("`document_type` IN %(app_doctypes)s")
+		values["app_doctypes"] = tuple(frappe.get_all("DocType", filters={"module": "Correspondence"}, pluck="name")) or ("",)
+
+	return " AND ".join(conditions)
+
+
+def get_orphaned_condition(doctype, links, values):
+	"""
+	Args:
+		doctype: Doctype with a retention policy
+		links: (doctype column, name column) pairs
+		values: Dict of query parameters (updated in place)
+
+	Returns:
+		SQL condition selecting the records linking to a missing document
+	"""
+	orphaned = []
+
+	for doctype_column, name_column in links:
+		linked_doctypes = frappe.db.sql_list(f"SELECT DISTINCT `{doctype_column}` FROM `tab{doctype}`")
+
+		for i, linked in enumerate(linked_doctypes):
+			key = f"{doctype_column}_{i}"
+			values[key] = linked
+
+			if not linked or "`" in linked or not frappe.db.table_exists(linked):
+				orphaned.append(f"`{doctype_column}` <=> %({key})s")
+				continue
+
+			orphaned.append(f"""(`{doctype_column}` = %({key})s AND NOT EXISTS (
+				SELECT 1 FROM `tab{linked}` linked WHERE linked.`name` = `tab{doctype}`.`{name_column}`
+			))""")
+
+	return f"({' OR '.join(orphaned)})" if orphaned else "1=0"
+
+
+def is_active(doctype):
+	"""
+	Args:
+		doctype: Doctype with a retention policy
+
+	Returns:
+		Whether the policy deletes anything (False if its records are kept
+		forever)
+	"""
+	return bool(RETENTION_POLICIES[doctype].get("orphaned_links") or get_cutoff(doctype))
+
+
+def get_cutoff(doctype):
+	days = get_retention_days(doctype)
+	return add_days(now_datetime(), -days) if days and days > 0 else None
+
+
+def purge_expired(doctype, deadline=None):
+	"""
+	Delete the expired records of a doctype in batches
+
+	Args:
+		doctype: Doctype with a retention policy
+		deadline: time.perf_counter() value after which no batch is started
+
+	Returns:
+		Dict with deleted, batches, elapsed_s, rows_per_s and complete
+		(False if the deadline stopped the purge)
+	"""
+	stats = {"deleted": 0, "batches": 0, "elapsed_s": 0, "rows_per_s": 0, "complete": True}
+	if not is_active(doctype):
+		return stats
+
+	batch_size = cint(frappe.conf.get("retention_batch_size")) or DEFAULT_BATCH_SIZE
+	pause = flt(frappe.conf.get("retention_batch_sleep", DEFAULT_BATCH_SLEEP))
+	values = {}
+	condition = get_expired_condition(doctype, get_cutoff(doctype), values)
+	start = time.perf_counter()
+
+	while True:
+		if deadline and time.perf_counter() > deadline:
+			stats["complete"] = False
+			break
+
+		names = frappe.db.sql_list(f"""
+			SELECT `name` FROM `tab{doctype}`
+			WHERE {condition}
+			LIMIT {batch_size}
+		""", values)
+
+		if not names:
+			break
+
+		frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE `name` IN %(names)s", {"names": tuple(names)})
+		frappe.db.commit()
+
+		stats["deleted"] += len(names)
+		stats["batches"] += 1
+
+		if len(names) < batch_size:
+			break
+
+		# Let other transactions take the locks before the next batch
+		time.sleep(pause)
+
+	elapsed = time.perf_counter() - start
+	stats["elapsed_s"] = flt(elapsed, 2)
+	stats["rows_per_s"] = flt(stats["deleted"] / elapsed, 1) if elapsed else 0
+
+	return stats
+
+
+def run_retention():
+	"""Purge expired records of every retention policy (daily job)"""
+	max_seconds = flt(frappe.conf.get("retention_max_seconds")) or DEFAULT_MAX_SECONDS
+	deadline = time.perf_counter() + max_seconds
+	results = {}
+
+	for doctype in RETENTION_POLICIES:
+		try:
+			results[doctype] = purge_expired(doctype, deadline)
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Retention purge of {doctype} failed: {str(e)}")
+			results[doctype] = {"error": str(e)}
+
+	frappe.db.set_global(LAST_RUN_KEY, json.dumps({"ran_on": now(), "results": results}))
+	frappe.db.commit()
+
+	frappe.logger("retention", allow_site=True).info(results)
+	return results
+
+
+@frappe.whitelist()
+def get_retention_preview():
+	"""
+	API endpoint listing each retention policy with the records it would
+	delete now
+
+	Returns:
+		Per doctype: retention days (None for policies deleting records
+		linking to missing documents), cutoff and expired record count, plus
+		the results of the last run
+	"""
+	frappe.only_for("System Manager")
+
+	policies = {}
+	for doctype, policy in RETENTION_POLICIES.items():
+		cutoff = get_cutoff(doctype)
+		expired = 0
+
+		if is_active(doctype):
+			values = {}
+			condition = get_expired_condition(doctype, cutoff, values)
+			expired = frappe.db.sql(f"SELECT COUNT(*) FROM `tab{doctype}` WHERE {condition}", values)[0][0]
+
+		policies[doctype] = {
+			"date_field": policy.get("date_field"),
+			"orphaned_links": bool(policy.get("orphaned_links")),
+			"days": get_retention_days(doctype),
+			"cutoff": str(cutoff) if cutoff else None,
+			"expired": cint(expired)
+		}
+
+	last_run = frappe.db.get_global(LAST_RUN_KEY)
+
+	return {
+		"success": True,
+		"policies": policies,
+		"last_run": json.loads(last_run) if last_run else None
+	}
+
+
+@frappe.whitelist()
+def queue_retention_run():
+	"""
+	API endpoint to purge expired records now
+
+	Returns:
+		Success status
+	"""
+	frappe.only_for("System Manager")
+
+	frappe.enqueue(
+		"correspondence.correspondence.utils.retention.run_retention",
+		queue="long",
+		timeout=3600,
+		job_id="retention::run",
+		deduplicate=True
+	)
+	return {"success": True, "message": "Retention run queued"}
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Search Cache Module
+Caches search API responses per user and permission signature.
+
+Entries are keyed by endpoint, normalized arguments, the user (results honour
+shares and permission query conditions), the user's roles and user
+permissions, and a generation token. Any write to a searchable
+document replaces the token, which invalidates every entry at once; stale
+entries simply expire.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import cint, flt
+
+
+# Seconds a cached response is kept (site_config `search_cache_ttl`, 0 disables)
+DEFAULT_SEARCH_CACHE_TTL = 300
+
+GENERATION_KEY = "search_cache_generation"
+STATS_KEY = "search_cache_stats"
+
+
+def get_search_cache_ttl():
+	"""
+	Cache lifetime from site config
+
+	Returns:
+		Seconds (0 when caching is disabled)
+	"""
+	ttl = frappe.conf.get("search_cache_ttl")
+	return DEFAULT_SEARCH_CACHE_TTL if ttl is None else cint(ttl)
+
+
+def normalize_query(query):
+	"""
+	Normalize a query for use in a cache key
+
+	Only changes that cannot alter results are applied: the database
+	collation is case-insensitive and whitespace runs do not matter.
+
+	Args:
+		query: Query string
+
+	Returns:
+		Normalized query
+	"""
+	return " ".join((query or "").split()).lower()
+
+
+def get_permission_signature(user=None):
+	"""
+	Hash of everything that decides what a user may see
+
+	Args:
+		user: User (default current user)
+
+	Returns:
+		Signature string
+	"""
+	from frappe.permissions import get_user_permissions
+
+	user = user or frappe.session.user
+	user_permissions = {
+		doctype: sorted(permission.get("doc") for permission in permissions)
+		for doctype, permissions in get_user_permissions(user).items()
+	}
+
+	payload = json.dumps([sorted(frappe.get_roles(user)), user_permissions], sort_keys=True)
+	return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def get_generation():
+	"""
+	Current cache generation
+
+	Returns:
+		Generation token
+	"""
+	generation = frappe.cache().get_value(GENERATION_KEY)
+
+	if not generation:
+		generation = frappe.generate_hash(length=10)
+		frappe.cache().set_value(GENERATION_KEY, generation)
+
+	return generation
+
+
+def bump_search_generation(doc=None, method=None):
+	"""
+	Invalidate all cached search results (on_change / after_delete hook)
+
+	Also called directly by bulk operations that bypass document hooks.
+
+	Args:
+		doc: Changed document
+		method: Hook method name
+	"""
+	frappe.cache().set_value(GENERATION_KEY, frappe.generate_hash(length=10))
+
+
+def cached_search(endpoint, arguments, search):
+	"""
+	Return a cached search response or compute and cache it
+
+	Only successful responses are cached.
+
+	Args:
+		endpoint: Endpoint name (part of the key and of the metrics)
+		arguments: JSON-serializable arguments that decide the result
+		search: Callable producing the response
+
+	Returns:
+		Search response (with "cached": True when served from cache)
+	"""
+	ttl = get_search_cache_ttl()
+	if not ttl:
+		return search()
+
+	payload = json.dumps([arguments, frappe.session.user, get_permission_signature()], sort_keys=True, default=str)
+	key = f"search_cache::{get_generation()}::{endpoint}::{hashlib.md5(payload.encode('utf-8')).hexdigest()}"
+
+	response = frappe.cache().get_value(key, expires=True)
+	if response is not None:
+		record_lookup(endpoint, hit=True)
+		return {**response, "cached": True}
+
+	record_lookup(endpoint, hit=False)
+	response = search()
+
+	if response.get("success"):
+		frappe.cache().set_value(key, response, expires_in_sec=ttl)
+
+	return response
+
+
+def record_lookup(endpoint, hit):
+	"""
+	Count a cache hit or miss
+
+	Args:
+		endpoint: Endpoint name
+		hit: True for a hit
+	"""
+	cache = frappe.cache()
+	cache.hincrby(cache.make_key(STATS_KEY), f"{endpoint}:{'hits' if hit else 'misses'}", 1)
+
+
+@frappe.whitelist()
+def get_search_cache_stats():
+	"""
+	API endpoint returning hit/miss counts and hit ratio per endpoint
+
+	Returns:
+		Cache statistics
+	"""
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	# HINCRBY counters are plain integers; RedisWrapper.hgetall would unpickle them
+	counters = cache.execute_command("HGETALL", cache.make_key(STATS_KEY)) or {}
+
+	stats = {}
+	for field, count in counters.items():
+		endpoint, kind = frappe.safe_decode(field).rsplit(":", 1)
+		stats.setdefault(endpoint, {"hits": 0, "misses": 0})[kind] = cint(count)
+
+	for endpoint, counts in stats.items():
+		lookups = counts["hits"] + counts["misses"]
+		counts["hit_ratio"] = flt(counts["hits"] / lookups, 3) if lookups else 0
+
+	return {"success": True, "ttl": get_search_cache_ttl(), "stats": stats}
+
+
+@frappe.whitelist()
+def clear_search_cache(reset_stats=False):
+	"""
+	API endpoint to invalidate cached search results
+
+	Args:
+		reset_stats: Also reset the hit/miss counters
+
+	Returns:
+		Success status
+	"""
+	frappe.only_for("System Manager")
+
+	bump_search_generation()
+
+	if cint(reset_stats):
+		frappe.cache().delete(frappe.cache().make_key(STATS_KEY))
+
+	return {"success": True}
@@ -0,0 +1,722 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Search Index Module
+App-level inverted index over letters with Arabic-aware tokenization.
+
+Postings are stored on disk in an SQLite file under the site's private
+folder. Each posting list is split into blocks of 4096 document ids and
+encoded as varints (document id deltas, term frequency, position deltas), so
+an update only rewrites the blocks that contain the changed document.
+
+A rebuild writes a new file next to the live one and then points the
+`current` file at it with an atomic rename, so searches keep using the old
+index until the new one is complete. Index updates check the pointer after
+writing and repeat the write on the new file if it moved meanwhile, and
+replaced files are only deleted once they have not been written for a day,
+so no process still has them open.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import time
+from collections import defaultdict
+
+import frappe
+from frappe.utils import now, strip_html_tags
+
+from correspondence.correspondence.utils.arabic_text import tokenize
+from correspondence.correspondence.utils.archive_tables import (
+	get_letter_tables,
+	get_stub_filters,
+	retarget_query,
+)
+from correspondence.correspondence.utils.search_cache import bump_search_generation
+
+
+# Fields indexed per doctype
+INDEXED_FIELDS = {
+	"Incoming Letter": ["letter_number", "subject", "sender", "summary", "ocr_text"],
+	"Outgoing Letter": ["letter_number", "subject", "recipient", "body_text", "ocr_text"],
+	"Internal Memo": ["reference_number", "subject", "content"],
+	"Legacy Archive": ["legacy_reference_number", "subject", "source", "destination", "summary", "keywords"],
+}
+
+# Fields holding HTML (Text Editor)
+HTML_FIELDS = {"summary", "body_text", "content"}
+
+# Document ids per posting block
+BLOCK_BITS = 12
+
+# Rows per batch when rebuilding
+REBUILD_BATCH_SIZE = 500
+
+# Index file used until the first rebuild; afterwards the file named in
+# CURRENT_FILE
+DEFAULT_INDEX_FILE = "letters.sqlite3"
+CURRENT_FILE = "current"
+
+# Replaced index files untouched for this many hours are deleted
+OLD_FILE_GRACE_HOURS = 24
+
+QUERY_TOKENS = re.compile(r'"([^"]*)"|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+	doc_id INTEGER PRIMARY KEY,
+	doctype TEXT NOT NULL,
+	name TEXT NOT NULL,
+	UNIQUE (doctype, name)
+);
+CREATE TABLE IF NOT EXISTS forward (
+	doc_id INTEGER PRIMARY KEY,
+	terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+	term TEXT NOT NULL,
+	block INTEGER NOT NULL,
+	data BLOB NOT NULL,
+	PRIMARY KEY (term, block)
+) WITHOUT ROWID;
+"""
+
+
+def encode_block(entries):
+	"""
+	Encode a posting block
+
+	Args:
+		entries: Dict of doc_id -> sorted list of positions
+
+	Returns:
+		Bytes
+	"""
+	out = bytearray()
+	previous_doc = 0
+
+	for doc_id in sorted(entries):
+		positions = entries[doc_id]
+		_write_varint(out, doc_id - previous_doc)
+		_write_varint(out, len(positions))
+		previous_position = 0
+		for position in positions:
+			_write_varint(out, position - previous_position)
+			previous_position = position
+		previous_doc = doc_id
+
+	return bytes(out)
+
+
+def decode_block(data):
+	"""
+	Decode a posting block
+
+	Args:
+		data: Bytes produced by encode_block
+
+	Returns:
+		Dict of doc_id -> list of positions
+	"""
+	entries = {}
+	values = _read_varints(data)
+	doc_id = 0
+
+	for delta in values:
+		doc_id += delta
+		frequency = next(values)
+		position = 0
+		positions = []
+		for _ in range(frequency):
+			position += next(values)
+			positions.append(position)
+		entries[doc_id] = positions
+
+	return entries
+
+
+def _write_varint(out, value):
+	while value >= 0x80:
+		out.append((value & 0x7F) | 0x80)
+		value >>= 7
+	out.append(value)
+
+
+def _read_varints(data):
+	value = 0
+	shift = 0
+	for byte in data:
+		value |= (byte & 0x7F) << shift
+		if byte & 0x80:
+			shift += 7
+		else:
+			yield value
+			value = 0
+			shift = 0
+
+
+def parse_query(query):
+	"""
+	Parse a search query into AND-ed clauses of OR-ed alternatives
+
+	Words are AND-ed, `OR` (or `|`) between two items makes them
+	alternatives and double quotes mark a phrase. Every alternative is a
+	list of tokens that must appear consecutively.
+
+	Args:
+		query: Query string, e.g. `عقد "وزارة المالية" OR ميزانية`
+
+	Returns:
+		List of clauses, each a list of token lists
+	"""
+	clauses = []
+	pending_or = False
+
+	for match in QUERY_TOKENS.finditer(query or ""):
+		phrase, word = match.groups()
+
+		if word is not None and word.upper() in ("OR", "|"):
+			pending_or = bool(clauses)
+			continue
+
+		terms = tokenize(phrase if phrase is not None else word)
+		if not terms:
+			continue
+
+		if pending_or:
+			clauses[-1].append(terms)
+		else:
+			clauses.append([terms])
+		pending_or = False
+
+	return clauses
+
+
+class LetterSearchIndex:
+	"""Inverted index over letters stored in an SQLite file"""
+
+	def __init__(self, path):
+		self.path = path
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+
+		self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute("PRAGMA synchronous=NORMAL")
+		self.conn.executescript(SCHEMA)
+
+	def close(self):
+		"""Close the underlying connection"""
+		self.conn.close()
+
+	def document_count(self):
+		"""Number of indexed documents"""
+		return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+	def index_documents(self, documents):
+		"""
+		Add or replace documents in one transaction
+
+		Each touched posting block is read and written once, however many
+		documents of the batch it contains.
+
+		Args:
+			documents: Iterable of (doctype, name, text)
+
+		Returns:
+			Number of documents indexed
+		"""
+		count = 0
+		self.conn.execute("BEGIN IMMEDIATE")
+
+		try:
+			changes = defaultdict(dict)
+
+			for doctype, name, text in documents:
+				doc_id = self._get_doc_id(doctype, name, create=True)
+				new_terms = defaultdict(list)
+				for position, term in enumerate(tokenize(text)):
+					new_terms[term].append(position)
+
+				block = doc_id >> BLOCK_BITS
+				for term in self._get_forward_terms(doc_id):
+					changes[(term, block)].setdefault(doc_id, None)
+				for term, positions in new_terms.items():
+					changes[(term, block)][doc_id] = positions
+
+				self.conn.execute(
+					"INSERT OR REPLACE INTO forward (doc_id, terms) VALUES (?, ?)",
+					(doc_id, "\n".join(new_terms))
+				)
+				count += 1
+
+			self._apply_changes(changes)
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+
+		return count
+
+	def remove_document(self, doctype, name):
+		"""
+		Remove a document from the index
+
+		Args:
+			doctype: Document type
+			name: Document name
+		"""
+		self.conn.execute("BEGIN IMMEDIATE")
+
+		try:
+			doc_id = self._get_doc_id(doctype, name)
+			if doc_id is not None:
+				block = doc_id >> BLOCK_BITS
+				changes = {(term, block): {doc_id: None} for term in self._get_forward_terms(doc_id)}
+				self._apply_changes(changes)
+				self.conn.execute("DELETE FROM forward WHERE doc_id = ?", (doc_id,))
+				self.conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+
+	def postings(self, term):
+		"""
+		Get the full posting list of a term
+
+		Args:
+			term: Normalized token
+
+		Returns:
+			Dict of doc_id -> positions
+		"""
+		entries = {}
+		for (data,) in self.conn.execute("SELECT data FROM postings WHERE term = ? ORDER BY block", (term,)):
+			entries.update(decode_block(data))
+		return entries
+
+	def search(self, query, doctypes=None, limit=100):
+		"""
+		Run a query against the index
+
+		Args:
+			query: Query string (see parse_query)
+			doctypes: Optional list of doctypes to keep
+			limit: Maximum results
+
+		Returns:
+			List of dicts with doctype, name and score, best first
+		"""
+		clauses = parse_query(query)
+		if not clauses:
+			return []
+
+		total_docs = max(self.document_count(), 1)
+		postings_cache = {}
+		scores = None
+
+		for clause in clauses:
+			clause_scores = defaultdict(float)
+
+			for terms in clause:
+				for term in terms:
+					if term not in postings_cache:
+						postings_cache[term] = self.postings(term)
+
+				matches = _match_phrase([postings_cache[term] for term in terms])
+				if not matches:
+					continue
+
+				idf = math.log(1 + total_docs / len(matches))
+				for doc_id, frequency in matches.items():
+					clause_scores[doc_id] += (1 + math.log(frequency)) * idf
+
+			if scores is None:
+				scores = clause_scores
+			else:
+				scores = {doc_id: score + clause_scores[doc_id] for doc_id, score in scores.items() if doc_id in clause_scores}
+
+			if not scores:
+				return []
+
+		ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+		results = []
+
+		# Resolve ids in chunks until enough results of the wanted doctypes are found
+		for start in range(0, len(ranked), 500):
+			chunk = ranked[start:start + 500]
+			placeholders = ", ".join("?" * len(chunk))
+			names = {
+				doc_id: (doctype, name)
+				for doc_id, doctype, name in self.conn.execute(
+					f"SELECT doc_id, doctype, name FROM docs WHERE doc_id IN ({placeholders})",
+					[doc_id for doc_id, score in chunk]
+				)
+			}
+
+			for doc_id, score in chunk:
+				if doc_id not in names:
+					continue
+				doctype, name = names[doc_id]
+				if doctypes and doctype not in doctypes:
+					continue
+				results.append({"doctype": doctype, "name": name, "score": round(score, 4)})
+				if len(results) >= limit:
+					return results
+
+		return results
+
+	def _get_doc_id(self, doctype, name, create=False):
+		row = self.conn.execute("SELECT doc_id FROM docs WHERE doctype = ? AND name = ?", (doctype, name)).fetchone()
+		if row:
+			return row[0]
+		if not create:
+			return None
+		return self.conn.execute("INSERT INTO docs (doctype, name) VALUES (?, ?)", (doctype, name)).lastrowid
+
+	def _get_forward_terms(self, doc_id):
+		row = self.conn.execute("SELECT terms FROM forward WHERE doc_id = ?", (doc_id,)).fetchone()
+		return row[0].split("\n") if row and row[0] else []
+
+	def _apply_changes(self, changes):
+		"""Apply {(term, block): {doc_id: positions or None}} to the posting blocks"""
+		for (term, block), doc_changes in changes.items():
+			row = self.conn.execute("SELECT data FROM postings WHERE term = ? AND block = ?", (term, block)).fetchone()
+			entries = decode_block(row[0]) if row else {}
+
+			for doc_id, positions in doc_changes.items():
+				if positions is None:
+					entries.pop(doc_id, None)
+				else:
+					entries[doc_id] = positions
+
+			if entries:
+				self.conn.execute(
+					"INSERT OR REPLACE INTO postings (term, block, data) VALUES (?, ?, ?)",
+					(term, block, encode_block(entries))
+				)
+			elif row:
+				self.conn.execute("DELETE FROM postings WHERE term = ? AND block = ?", (term, block))
+
+
+def _match_phrase(posting_lists):
+	"""
+	Find documents where the terms appear consecutively
+
+	Args:
+		posting_lists: One posting dict (doc_id -> positions) per term
+
+	Returns:
+		Dict of doc_id -> number of phrase occurrences
+	"""
+	if not posting_lists or not all(posting_lists):
+		return {}
+
+	first = posting_lists[0]
+	if len(posting_lists) == 1:
+		return {doc_id: len(positions) for doc_id, positions in first.items()}
+
+	matches = {}
+	candidates = set(first).intersection(*posting_lists[1:])
+
+	for doc_id in candidates:
+		starts = set(first[doc_id])
+		for offset, postings in enumerate(posting_lists[1:], start=1):
+			starts &= {position - offset for position in postings[doc_id]}
+			if not starts:
+				break
+		if starts:
+			matches[doc_id] = len(starts)
+
+	return matches
+
+
+def get_search_index():
+	"""
+	Get the index of the current site (one connection per request/job)
+
+	Returns:
+		LetterSearchIndex
+	"""
+	if not getattr(frappe.local, "letter_search_index", None):
+		frappe.local.letter_search_index = LetterSearchIndex(get_index_path())
+
+	return frappe.local.letter_search_index
+
+
+def get_index_directory():
+	return frappe.get_site_path("private", "search_index")
+
+
+def get_index_path():
+	"""
+	Returns:
+		Path of the live index file
+	"""
+	directory = get_index_directory()
+	name = DEFAULT_INDEX_FILE
+
+	try:
+		with open(os.path.join(directory, CURRENT_FILE)) as f:
+			name = f.read().strip() or name
+	except FileNotFoundError:
+		pass
+
+	return os.path.join(directory, name)
+
+
+def is_search_index_enabled():
+	"""
+	Check whether search_letters should use the index in "auto" mode
+
+	Returns:
+		True if enabled in site config (`letter_search_index_enabled`)
+	"""
+	return bool(frappe.conf.get("letter_search_index_enabled"))
+
+
+def get_document_text(doc):
+	"""
+	Build the indexed text of a letter
+
+	Args:
+		doc: Document or dict with the indexed fields
+
+	Returns:
+		Text to tokenize
+	"""
+	parts = []
+	for field in INDEXED_FIELDS[doc.get("doctype")]:
+		value = doc.get(field)
+		if value:
+			parts.append(strip_html_tags(value) if field in HTML_FIELDS else str(value))
+	return "\n".join(parts)
+
+
+def index_letter(doctype, docname):
+	"""
+	Index (or re-index) a single letter; runs as a background job
+
+	Args:
+		doctype: Document type
+		docname: Document name
+	"""
+	values = frappe.db.get_value(doctype, docname, INDEXED_FIELDS[doctype], as_dict=True)
+
+	if not values:
+		remove_letter(doctype, docname)
+		return
+
+	values["doctype"] = doctype
+	write_index(lambda index: index.index_documents([(doctype, docname, get_document_text(values))]))
+
+	# Cached index-mode results predate this update
+	bump_search_generation()
+
+
+def remove_letter(doctype, docname):
+	"""
+	Remove a letter from the index; runs as a background job
+
+	Args:
+		doctype: Document type
+		docname: Document name
+	"""
+	write_index(lambda index: index.remove_document(doctype, docname))
+	bump_search_generation()
+
+
+def queue_index_update(doc, method=None):
+	"""
+	Queue re-indexing of a letter after it is saved (on_update hook)
+
+	Args:
+		doc: Letter, memo or legacy archive record
+		method: Hook method name
+	"""
+	frappe.enqueue(
+		"correspondence.correspondence.utils.search_index.index_letter",
+		queue="short",
+		job_id=f"letter_search_index::{doc.doctype}::{doc.name}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		doctype=doc.doctype,
+		docname=doc.name
+	)
+
+
+def queue_index_removal(doc, method=None):
+	"""
+	Queue removal of a deleted letter from the index (after_delete hook)
+
+	Args:
+		doc: Deleted letter
+		method: Hook method name
+	"""
+	frappe.enqueue(
+		"correspondence.correspondence.utils.search_index.remove_letter",
+		queue="short",
+		enqueue_after_commit=True,
+		doctype=doc.doctype,
+		docname=doc.name
+	)
+
+
+def rebuild_index():
+	"""
+	Rebuild the index from scratch into a new file and swap it in; runs as
+	a background job
+	"""
+	directory = get_index_directory()
+	name = f"letters-{frappe.generate_hash(length=10)}.sqlite3"
+	started_on = now()
+
+	remove_old_index_files(directory)
+
+	index = LetterSearchIndex(os.path.join(directory, name))
+	try:
+		fill_index(index)
+	finally:
+		index.close()
+
+	# Atomic swap: new connections open the new file, open ones finish on
+	# the old one
+	pointer = os.path.join(directory, CURRENT_FILE)
+	with open(f"{pointer}.tmp", "w") as f:
+		f.write(name)
+	os.replace(f"{pointer}.tmp", pointer)
+
+	if getattr(frappe.local, "letter_search_index", None):
+		frappe.local.letter_search_index.close()
+		frappe.local.letter_search_index = None
+
+	# Letters saved while the rebuild ran may have been read before the
+	# change; updates written to the old file after this point are repeated
+	# on the new one by write_index
+	index = get_search_index()
+	for doctype, fields in INDEXED_FIELDS.items():
+		rows = frappe.get_all(doctype, filters={"modified": [">=", started_on]}, fields=["name", *fields])
+		index.index_documents([(doctype, row.name, get_document_text({**row, "doctype": doctype})) for row in rows])
+
+	bump_search_generation()
+
+
+def write_index(write):
+	"""
+	Apply an update to the live index, repeating it on the new file if a
+	rebuild swapped the index in while it was written
+
+	Args:
+		write: Function taking a LetterSearchIndex
+	"""
+	index = get_search_index()
+	write(index)
+
+	if index.path != get_index_path():
+		index.close()
+		frappe.local.letter_search_index = None
+		write(get_search_index())
+
+
+def remove_old_index_files(directory):
+	"""
+	Delete replaced index files (with their -wal and -shm files) that have
+	not been written for OLD_FILE_GRACE_HOURS; earlier ones may still be
+	open in other processes
+
+	Args:
+		directory: Index directory
+	"""
+	if not os.path.isdir(directory):
+		return
+
+	current = os.path.basename(get_index_path())
+	cutoff = time.time() - OLD_FILE_GRACE_HOURS * 3600
+	files = defaultdict(list)
+
+	for file_name in os.listdir(directory):
+		if file_name.startswith("letters"):
+			files[file_name.split(".sqlite3")[0]].append(os.path.join(directory, file_name))
+
+	for base, paths in files.items():
+		if current.startswith(f"{base}.sqlite3"):
+			continue
+
+		if max(os.path.getmtime(path) for path in paths) < cutoff:
+			for path in paths:
+				os.remove(path)
+
+
+def fill_index(index):
+	"""
+	Index every letter, including those moved to archive tables
+
+	Args:
+		index: LetterSearchIndex to write to
+	"""
+	for doctype, fields in INDEXED_FIELDS.items():
+		# Letters moved to archive tables stay searchable
+		for table in get_letter_tables(doctype):
+			last_name = ""
+			while True:
+				query = frappe.get_all(
+					doctype,
+					filters=[["name", ">", last_name], *get_stub_filters(doctype)],
+					fields=["name", *fields],
+					order_by="name asc",
+					limit=REBUILD_BATCH_SIZE,
+					run=0
+				)
+				rows = frappe.db.sql(retarget_query(doctype, query, table), as_dict=True)
+				if not rows:
+					break
+
+				batch = []
+				for row in rows:
+					row["doctype"] = doctype
+					batch.append((doctype, row.name, get_document_text(row)))
+
+				index.index_documents(batch)
+				last_name = rows[-1].name
+
+
+@frappe.whitelist()
+def rebuild_search_index():
+	"""
+	API endpoint to queue a full rebuild of the letter search index
+
+	Returns:
+		Success status
+	"""
+	frappe.only_for("System Manager")
+
+	enqueue_rebuild()
+	return {"success": True, "message": "Search index rebuild queued"}
+
+
+def enqueue_rebuild():
+	frappe.enqueue(
+		"correspondence.correspondence.utils.search_index.rebuild_index",
+		queue="long",
+		timeout=6 * 3600,
+		job_id="letter_search_index::rebuild",
+		deduplicate=True
+	)
+
+
+def search_letter_index(query, doctypes=None, limit=100):
+	"""
+	Query the letter index
+
+	Args:
+		query: Query string with AND (default), OR and "phrase" support
+		doctypes: Optional list of doctypes to keep
+		limit: Maximum results
+
+	Returns:
+		List of dicts with doctype, name and score
+	"""
+	return get_search_index().search(query, doctypes=doctypes, limit=limit)
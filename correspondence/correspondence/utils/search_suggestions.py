@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Search Suggestions Module
+Maintains the Search Term prefix table behind search autocomplete.
+
+Every subject, sender, recipient and letter number is stored once per
+source doctype and department with the number of documents using it and the
+date it was last seen. Subjects are also stored under the key of each later
+word, so typing a word from the middle of a subject still finds it. Lookups
+are a range scan on term_key and their results are cached per permission
+scope until a term changes.
+
+The table counts every document, so for users whose reads of a doctype are
+restricted (user permissions, if_owner, shares, permission query
+conditions) each suggested term of that doctype is checked against the
+documents the user may read, and its frequency is recounted from them.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import cint, cstr, getdate, now
+
+from correspondence.correspondence.utils.arabic_text import make_name_key
+
+
+# Source doctype -> term fields, date field and department field
+SUGGESTION_SOURCES = {
+	"Incoming Letter": {
+		"terms": {"Subject": "subject", "Sender": "sender", "Letter Number": "letter_number"},
+		"date_field": "date_received",
+		"department_field": "department",
+	},
+	"Outgoing Letter": {
+		"terms": {"Subject": "subject", "Recipient": "recipient", "Letter Number": "letter_number"},
+		"date_field": "date_created",
+		"department_field": "department",
+	},
+	"Internal Memo": {
+		"terms": {"Subject": "subject", "Letter Number": "reference_number"},
+		"date_field": "date",
+		"department_field": "recipient_department",
+	},
+	"Legacy Archive": {
+		"terms": {
+			"Subject": "subject",
+			"Sender": "source",
+			"Recipient": "destination",
+			"Letter Number": "legacy_reference_number",
+		},
+		"date_field": "date",
+		"department_field": None,
+	},
+}
+
+# Subjects are findable from each of their first words
+MAX_SUBJECT_WORDS = 8
+
+# Display terms are truncated to the column length
+MAX_TERM_LENGTH = 240
+
+# Cached suggestion lists expire even without changes
+SUGGESTION_CACHE_TTL = 600
+
+# Rows per batch when rebuilding
+REBUILD_BATCH_SIZE = 1000
+
+# Candidates read per suggestion when some have to be checked against
+# restricted documents
+RESTRICTED_CANDIDATE_FACTOR = 5
+
+
+def get_term_keys(term_type, value):
+	"""
+	Keys under which a term is stored
+	
+	Args:
+		term_type: Subject, Sender, Recipient or Letter Number
+		value: Term as written on the document
+	
+	Returns:
+		List of normalized keys (empty if nothing remains)
+	"""
+	key = make_name_key(value)
+	if not key:
+		return []
+	
+	if term_type != "Subject":
+		return [key]
+	
+	words = key.split()
+	return [make_name_key(" ".join(words[i:])) for i in range(min(len(words), MAX_SUBJECT_WORDS))]
+
+
+def get_document_terms(doc):
+	"""
+	Search Term rows contributed by a document
+	
+	Args:
+		doc: Document or dict with the source fields and doctype
+	
+	Returns:
+		Dict of row name -> row
+	"""
+	source = SUGGESTION_SOURCES[doc.get("doctype")]
+	department = doc.get(source["department_field"]) if source["department_field"] else None
+	last_seen = doc.get(source["date_field"]) or doc.get("creation")
+	rows = {}
+	
+	for term_type, field in source["terms"].items():
+		value = (doc.get(field) or "").strip()[:MAX_TERM_LENGTH]
+		keys = get_term_keys(term_type, value)
+		
+		for term_key in keys:
+			# One row per term, key, doctype and department
+			name = hashlib.md5(
+				"\n".join([term_type, doc.get("doctype"), department or "", term_key, keys[0]]).encode("utf-8")
+			).hexdigest()
+			rows[name] = {
+				"name": name,
+				"term": value,
+				"term_key": term_key,
+				"term_type": term_type,
+				"source_doctype": doc.get("doctype"),
+				"department": department,
+				"last_seen": getdate(last_seen) if last_seen else None,
+			}
+	
+	return rows
+
+
+def update_search_terms(doc, method=None):
+	"""
+	Apply the term changes of a saved or deleted document (on_update / after_delete hook)
+	
+	Only the difference between the previous and the current version is
+	written, so a save that does not touch a term field costs nothing.
+	
+	Args:
+		doc: Letter, memo or legacy archive record
+		method: Hook method name
+	"""
+	if doc.doctype not in SUGGESTION_SOURCES:
+		return
+	
+	current = {} if method == "after_delete" else get_document_terms(doc)
+	
+	previous = doc.get_doc_before_save() if method != "after_delete" else doc
+	previous = get_document_terms(previous) if previous else {}
+	
+	added = [row for name, row in current.items() if name not in previous]
+	removed = [name for name in previous if name not in current]
+	
+	if not added and not removed:
+		return
+	
+	add_terms(added)
+	remove_terms(removed)
+	clear_suggestion_cache()
+
+
+def add_terms(rows, counts=None):
+	"""
+	Insert term rows or increase their frequency
+	
+	Args:
+		rows: Rows from get_document_terms
+		counts: Optional dict of row name -> frequency increment (default 1)
+	"""
+	if not rows:
+		return
+	
+	timestamp = now()
+	user = frappe.session.user
+	placeholders = []
+	values = []
+	
+	for row in rows:
+		placeholders.append("(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 0, 0)")
+		values += [
+			row["name"], row["term"], row["term_key"], row["term_type"], row["source_doctype"],
+			row["department"], (counts or {}).get(row["name"], 1), row["last_seen"],
+			timestamp, timestamp, user, user
+		]
+	
+	frappe.db.sql(f"""
+		INSERT INTO `tabSearch Term`
+			(name, term, term_key, term_type, source_doctype, department, frequency,
+			 last_seen, creation, modified, owner, modified_by, docstatus, idx)
+		VALUES {', '.join(placeholders)}
+		ON DUPLICATE KEY UPDATE
+			frequency = frequency + VALUES(frequency),
+			term = VALUES(term),
+			last_seen = GREATEST(IFNULL(last_seen, VALUES(last_seen)), IFNULL(VALUES(last_seen), last_seen)),
+			modified = VALUES(modified),
+			modified_by = VALUES(modified_by)
+	""", values)
+
+
+def remove_terms(names):
+	"""
+	Decrease the frequency of term rows, dropping rows no longer used
+	
+	Args:
+		names: Row names
+	"""
+	if not names:
+		return
+	
+	frappe.db.sql("""
+		UPDATE `tabSearch Term`
+		SET frequency = frequency - 1
+		WHERE name IN %(names)s
+	""", {"names": tuple(names)})
+	
+	frappe.db.sql("""
+		DELETE FROM `tabSearch Term`
+		WHERE name IN %(names)s AND frequency <= 0
+	""", {"names": tuple(names)})
+
+
+def rebuild_search_terms():
+	"""Rebuild the Search Term table from all source documents; runs as a background job"""
+	frappe.db.delete("Search Term")
+	
+	for doctype, source in SUGGESTION_SOURCES.items():
+		fields = ["name", "creation", source["date_field"], *source["terms"].values()]
+		if source["department_field"]:
+			fields.append(source["department_field"])
+		
+		rows = {}
+		counts = {}
+		last_name = ""
+		
+		while True:
+			docs = frappe.get_all(
+				doctype,
+				filters={"name": [">", last_name]},
+				fields=fields,
+				order_by="name asc",
+				limit=REBUILD_BATCH_SIZE
+			)
+			if not docs:
+				break
+			
+			for doc in docs:
+				doc["doctype"] = doctype
+				for name, row in get_document_terms(doc).items():
+					counts[name] = counts.get(name, 0) + 1
+					known = rows.get(name)
+					if not known or (row["last_seen"] and (not known["last_seen"] or row["last_seen"] > known["last_seen"])):
+						rows[name] = row
+			
+			last_name = docs[-1].name
+		
+		batch = list(rows.values())
+		for i in range(0, len(batch), REBUILD_BATCH_SIZE):
+			add_terms(batch[i:i + REBUILD_BATCH_SIZE], counts)
+	
+	clear_suggestion_cache()
+
+
+@frappe.whitelist()
+def rebuild_search_suggestions():
+	"""
+	API endpoint to queue a full rebuild of the suggestion table
+	
+	Returns:
+		Success status
+	"""
+	frappe.only_for("System Manager")
+	
+	frappe.enqueue(
+		"correspondence.correspondence.utils.search_suggestions.rebuild_search_terms",
+		queue="long",
+		timeout=3600,
+		job_id="search_suggestions::rebuild",
+		deduplicate=True
+	)
+	
+	return {"success": True, "message": "Search suggestions rebuild queued"}
+
+
+def get_permission_scope(user=None):
+	"""
+	Describe what the user may see: readable doctypes, allowed departments
+	and the match conditions of the doctypes the user may only partly read
+	
+	Args:
+		user: User (default current user)
+	
+	Returns:
+		Tuple of (doctypes, departments or None for all, dict of doctype ->
+		SQL condition for restricted doctypes, scope key)
+	"""
+	from frappe.permissions import get_user_permissions
+	
+	from correspondence.correspondence.api.search import get_permission_conditions
+	
+	user = user or frappe.session.user
+	doctypes = sorted(dt for dt in SUGGESTION_SOURCES if frappe.has_permission(dt, "read", user=user))
+	
+	departments = None
+	restrictions = get_user_permissions(user).get("Department")
+	if restrictions:
+		departments = sorted({permission.get("doc") for permission in restrictions})
+	
+	restricted = {}
+	for doctype in doctypes:
+		conditions = get_permission_conditions(doctype, user=user)
+		if conditions:
+			restricted[doctype] = " AND ".join(conditions)
+	
+	scope_key = hashlib.md5(json.dumps([doctypes, departments, restricted]).encode("utf-8")).hexdigest()
+	return doctypes, departments, restricted, scope_key
+
+
+def get_suggestions(query, limit=10):
+	"""
+	Suggest terms starting with the typed prefix
+	
+	Results are ranked by the number of documents using a term, then by how
+	recently it was seen, and cached per prefix and permission scope.
+	
+	Args:
+		query: Partial text as typed by the user
+		limit: Maximum suggestions
+	
+	Returns:
+		List of dicts with type, value, frequency and last_seen
+	"""
+	prefix = make_name_key(query)
+	limit = cint(limit) or 10
+	
+	if not prefix:
+		return []
+	
+	doctypes, departments, restricted, scope_key = get_permission_scope()
+	if not doctypes:
+		return []
+	
+	cache_key = f"search_suggestions::{get_cache_generation()}::{scope_key}::{limit}::{prefix}"
+	suggestions = frappe.cache().get_value(cache_key)
+	
+	if suggestions is None:
+		suggestions = query_suggestions(prefix, doctypes, departments, limit, restricted)
+		frappe.cache().set_value(cache_key, suggestions, expires_in_sec=SUGGESTION_CACHE_TTL)
+	
+	return suggestions
+
+
+def query_suggestions(prefix, doctypes, departments, limit, restricted=None):
+	"""
+	Read suggestions from the Search Term table
+	
+	Args:
+		prefix: Normalized prefix
+		doctypes: Readable source doctypes
+		departments: Allowed departments, or None for all
+		limit: Maximum suggestions
+		restricted: Dict of doctype -> SQL condition selecting the documents
+			the user may read, for doctypes the user may only partly read
+	
+	Returns:
+		List of suggestion dicts
+	"""
+	restricted = restricted or {}
+	values = {
+		"prefix": prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%",
+		"doctypes": tuple(doctypes),
+		"limit": limit * RESTRICTED_CANDIDATE_FACTOR if restricted else limit
+	}
+	conditions = ["term_key LIKE %(prefix)s", "source_doctype IN %(doctypes)s"]
+	
+	if departments is not None:
+		values["departments"] = tuple(departments)
+		# Like Frappe's own user permissions, rows without a department stay
+		# visible unless strict user permissions are enabled
+		if cint(frappe.get_system_settings("apply_strict_user_permissions")):
+			conditions.append("department IN %(departments)s")
+		else:
+			conditions.append("(department IN %(departments)s OR IFNULL(department, '') = '')")
+	
+	rows = frappe.db.sql(f"""
+		SELECT term_type, term, source_doctype, SUM(frequency) AS frequency, MAX(last_seen) AS last_seen
+		FROM `tabSearch Term`
+		WHERE {' AND '.join(conditions)}
+		GROUP BY term_type, term, source_doctype
+		ORDER BY frequency DESC, last_seen DESC
+		LIMIT %(limit)s
+	""", values, as_dict=True)
+	
+	if restricted:
+		rows = recount_restricted_terms(rows, restricted)
+	
+	# One suggestion per term across source doctypes
+	merged = {}
+	for row in rows:
+		key = (row.term_type, row.term)
+		if key in merged:
+			merged[key].frequency += cint(row.frequency)
+			merged[key].last_seen = max(filter(None, [merged[key].last_seen, row.last_seen]), default=None)
+		else:
+			merged[key] = frappe._dict(row, frequency=cint(row.frequency))
+	
+	rows = sorted(merged.values(), key=lambda row: (row.frequency, str(row.last_seen or "")), reverse=True)[:limit]
+	
+	return [{
+		"type": frappe.scrub(row.term_type),
+		"value": row.term,
+		"frequency": cint(row.frequency),
+		"last_seen": str(row.last_seen) if row.last_seen else None
+	} for row in rows]
+
+
+def recount_restricted_terms(rows, restricted):
+	"""
+	Recount candidate terms of restricted doctypes over the documents the
+	user may read, dropping terms found in none of them
+	
+	Args:
+		rows: Search Term rows grouped per term and source doctype
+		restricted: Dict of doctype -> SQL condition (see query_suggestions)
+	
+	Returns:
+		Rows with the frequencies the user may see
+	"""
+	groups = {}
+	for row in rows:
+		if row.source_doctype in restricted:
+			groups.setdefault((row.source_doctype, row.term_type), set()).add(row.term)
+	
+	readable = {}
+	for (doctype, term_type), terms in groups.items():
+		field = SUGGESTION_SOURCES[doctype]["terms"][term_type]
+		for term, frequency in frappe.db.sql(f"""
+			SELECT `{field}`, COUNT(*)
+			FROM `tab{doctype}`
+			WHERE `{field}` IN %(terms)s AND {restricted[doctype]}
+			GROUP BY `{field}`
+		""", {"terms": tuple(terms)}):
+			# Compared like the database collation does (case and
+			# trailing spaces)
+			key = (doctype, term_type, cstr(term).rstrip().casefold())
+			readable[key] = readable.get(key, 0) + frequency
+	
+	checked = []
+	for row in rows:
+		if row.source_doctype in restricted:
+			row.frequency = readable.get((row.source_doctype, row.term_type, cstr(row.term).rstrip().casefold()), 0)
+			if not row.frequency:
+				continue
+		checked.append(row)
+	
+	return checked
+
+
+def get_cache_generation():
+	"""
+	Current suggestion cache generation
+	
+	Returns:
+		Generation token (changes whenever a term changes)
+	"""
+	generation = frappe.cache().get_value("search_suggestions_generation")
+	
+	if not generation:
+		generation = frappe.generate_hash(length=8)
+		frappe.cache().set_value("search_suggestions_generation", generation)
+	
+	return generation
+
+
+def clear_suggestion_cache():
+	"""Invalidate all cached suggestion lists"""
+	frappe.cache().set_value("search_suggestions_generation", frappe.generate_hash(length=8))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, ERP Team and contributors
+# For license information, please see license.txt
+
+"""
+Snippets Module
+Builds short, highlighted excerpts of letter text around the words matching
+a search query
+"""
+
+import re
+
+from frappe.utils import escape_html, strip_html_tags
+
+from correspondence.correspondence.utils.arabic_text import (
+	ARABIC_DIACRITICS,
+	ARABIC_LETTER_MAP,
+	TATWEEL,
+	tokenize,
+)
+
+
+# Characters allowed between two letters of a match
+IGNORABLE = f"(?:{ARABIC_DIACRITICS.pattern}|{TATWEEL})*"
+
+# Rest of the word around a match (diacritics are not \w)
+WORD_CHARS = f"(?:\\w|{ARABIC_DIACRITICS.pattern})*"
+
+# Canonical character (after normalize_arabic) -> every spelling folded to it
+LETTER_VARIANTS = {}
+for _source, _target in ARABIC_LETTER_MAP.items():
+	LETTER_VARIANTS[_target] = LETTER_VARIANTS.get(_target, _target) + chr(_source)
+
+# Default snippet length in characters
+SNIPPET_LENGTH = 200
+
+# Whitespace runs are collapsed in snippets
+WHITESPACE = re.compile(r"\s+")
+
+
+def build_match_pattern(query):
+	"""
+	Compile a pattern matching the words of a query in the original text
+
+	Each query token (normalized and light-stemmed like the search index)
+	matches inside a word regardless of diacritics, tatweel, alef/ya/ta-
+	marbuta spelling and case; the whole surrounding word is highlighted.
+
+	Args:
+		query: Search query (index syntax such as OR and quotes is ignored)
+
+	Returns:
+		Compiled pattern, or None if the query has no usable token
+	"""
+	query = query.replace('"', " ").replace("|", " ")
+	tokens = sorted({token for token in tokenize(query) if token not in ("or", "and")}, key=len, reverse=True)
+
+	if not tokens:
+		return None
+
+	alternatives = []
+	for token in tokens:
+		letters = []
+		for char in token:
+			variants = LETTER_VARIANTS.get(char)
+			letters.append(f"[{variants}]" if variants else re.escape(char))
+		alternatives.append(IGNORABLE.join(letters))
+
+	return re.compile(WORD_CHARS + "(?:" + "|".join(alternatives) + ")" + WORD_CHARS, re.IGNORECASE | re.UNICODE)
+
+
+def build_snippet(text, pattern, length=SNIPPET_LENGTH):
+	"""
+	Cut the window of a text containing the most matches and highlight them
+
+	Args:
+		text: Plain or HTML text
+		pattern: Pattern from build_match_pattern
+		length: Maximum snippet length in characters (before markup)
+
+	Returns:
+		HTML-escaped snippet with matches wrapped in <mark>, or None if the
+		text does not match
+	"""
+	if not text or not pattern:
+		return None
+
+	text = WHITESPACE.sub(" ", strip_html_tags(text)).strip()
+	matches = [(match.start(), match.end()) for match in pattern.finditer(text)]
+
+	if not matches:
+		return None
+
+	# Slide a window over the match offsets and keep the densest one
+	best_first, best_last = 0, 1
+	last = 0
+	for first in range(len(matches)):
+		while last < len(matches) and matches[last][1] - matches[first][0] <= length:
+			last += 1
+		if last - first > best_last - best_first:
+			best_first, best_last = first, last
+
+	window_start = matches[best_first][0]
+	window_end = matches[best_last - 1][1]
+
+	# Pad the window with context on both sides, snapped to word boundaries
+	start = max(0, window_start - max(length - (window_end - window_start), 0) // 2)
+	end = min(len(text), start + length)
+	start = max(0, end - length)
+
+	if start > 0:
+		space = text.find(" ", start)
+		if 0 <= space < window_start:
+			start = space + 1
+	if end < len(text):
+		space = text.rfind(" ", start, end)
+		if space >= window_end:
+			end = space
+
+	parts = ["…" if start > 0 else ""]
+	position = start
+	for match_start, match_end in matches:
+		if match_start < start or match_end > end:
+			continue
+		parts.append(escape_html(text[position:match_start]))
+		parts.append(f"<mark>{escape_html(text[match_start:match_end])}</mark>")
+		position = match_end
+	parts.append(escape_html(text[position:end]))
+	parts.append("…" if end < len(text) else "")
+
+	return "".join(parts)
+
+
+def get_snippet(values, fields, pattern, length=SNIPPET_LENGTH):
+	"""
+	Snippet from the first field that matches, else the start of the first
+	non-empty field
+
+	Args:
+		values: Dict of field -> text
+		fields: Fields in order of preference
+		pattern: Pattern from build_match_pattern
+		length: Maximum snippet length
+
+	Returns:
+		Snippet HTML (empty string if all fields are empty)
+	"""
+	for field in fields:
+		snippet = build_snippet(values.get(field), pattern, length)
+		if snippet:
+			return snippet
+
+	for field in fields:
+		text = WHITESPACE.sub(" ", strip_html_tags(values.get(field) or "")).strip()
+		if text:
+			return escape_html(text[:length]) + ("…" if len(text) > length else "")
+
+	return ""
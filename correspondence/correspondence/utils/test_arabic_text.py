@@ -0,0 +1,56 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.arabic_text import (
+	MAX_KEY_LENGTH,
+	light_stem,
+	make_name_key,
+	normalize_arabic,
+	tokenize,
+)
+
+
+class TestArabicText(FrappeTestCase):
+	def test_normalize_arabic_folds_spellings(self):
+		self.assertEqual(normalize_arabic("أحمد إبراهيم آل مُوسى ٢٠٢٥"), "احمد ابراهيم ال موسي 2025")
+		self.assertEqual(normalize_arabic(None), "")
+
+	def test_make_name_key(self):
+		self.assertEqual(make_name_key("  وزارة  الماليّة - مكتب الوزير "), "وزاره الماليه مكتب الوزير")
+		self.assertEqual(make_name_key("وزارة المالية"), make_name_key("وزاره الماليه"))
+		self.assertLessEqual(len(make_name_key("x" * 500)), MAX_KEY_LENGTH)
+
+	def test_light_stem_strips_conjunction_and_articles_alike(self):
+		# وزارة with and without wa-, al-, wa-al-, li-l- and bi-al-
+		for word in ("وزارة", "الوزارة", "والوزارة", "للوزارة", "بالوزارة"):
+			self.assertEqual(light_stem(normalize_arabic(word)), "زار", word)
+
+	def test_light_stem_strips_one_suffix(self):
+		self.assertEqual(light_stem(normalize_arabic("المعلمون")), "معلم")
+		self.assertEqual(light_stem(normalize_arabic("كتابها")), "كتاب")
+
+	def test_light_stem_keeps_minimum_length(self):
+		# A leading waw that is part of a short word is kept
+		self.assertEqual(light_stem("ورد"), "ورد")
+		self.assertEqual(light_stem("ولد"), "ولد")
+		self.assertEqual(light_stem("وال"), "وال")
+
+	def test_light_stem_latin_plural(self):
+		self.assertEqual(light_stem("letters"), "letter")
+		self.assertEqual(light_stem("class"), "class")
+		self.assertEqual(light_stem("bus"), "bus")
+
+	def test_tokenize_normalizes_and_stems(self):
+		self.assertEqual(
+			tokenize("إلى الوزارةِ، رسالة رقم ٤٥ Letters"),
+			["الي", "زار", "رسال", "رقم", "45", "letter"]
+		)
+
+	def test_tokenize_without_stemming(self):
+		self.assertEqual(tokenize("الوزارة و letters", stem=False), ["الوزاره", "letters"])
+
+	def test_tokenize_empty(self):
+		self.assertEqual(tokenize(""), [])
+		self.assertEqual(tokenize(None), [])
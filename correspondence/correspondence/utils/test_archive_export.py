@@ -0,0 +1,98 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.archive_export import MANIFEST_NAME, ArchivePackageWriter
+
+
+class TestArchivePackageWriter(FrappeTestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.attachment = os.path.join(self.directory, "scan.pdf")
+		self.content = os.urandom(300000)
+
+		with open(self.attachment, "wb") as f:
+			f.write(self.content)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory, ignore_errors=True)
+
+	def open_file(self, file_url):
+		if file_url == "/private/files/scan.pdf":
+			return open(self.attachment, "rb"), len(self.content)
+		return None
+
+	def write_package(self, compress=False):
+		path = os.path.join(self.directory, "package.tar")
+		writer = ArchivePackageWriter(path, compress=compress)
+		entry = {"doctype": "Incoming Letter", "name": "IN-0001"}
+
+		with patch("correspondence.correspondence.utils.archive_export.open_file", self.open_file):
+			writer.add_bytes("incoming_letter/IN-0001/letter.json", b'{"name": "IN-0001"}', {**entry, "kind": "letter"})
+			self.assertTrue(writer.add_file("incoming_letter/IN-0001/attachments/001-scan.pdf", "/private/files/scan.pdf", {**entry, "kind": "attachment"}))
+			self.assertFalse(writer.add_file("incoming_letter/IN-0001/attachments/002-lost.pdf", "/private/files/lost.pdf", {**entry, "kind": "attachment"}))
+
+		metrics = writer.get_metrics()
+		return path, writer.close(), metrics
+
+	def test_manifest_records_member_checksums(self):
+		path, package, metrics = self.write_package()
+
+		with tarfile.open(path) as tar:
+			self.assertEqual(tar.getnames(), [
+				"incoming_letter/IN-0001/letter.json",
+				"incoming_letter/IN-0001/attachments/001-scan.pdf",
+				MANIFEST_NAME,
+				f"{MANIFEST_NAME}.sha256",
+			])
+
+			manifest = tar.extractfile(MANIFEST_NAME).read()
+			entries = [json.loads(line) for line in manifest.decode("utf-8").splitlines()]
+
+			for entry in entries:
+				if entry.get("missing"):
+					continue
+				data = tar.extractfile(entry["path"]).read()
+				self.assertEqual(entry["size"], len(data))
+				self.assertEqual(entry["sha256"], hashlib.sha256(data).hexdigest())
+
+			self.assertEqual(
+				tar.extractfile(f"{MANIFEST_NAME}.sha256").read().decode("utf-8"),
+				f"{hashlib.sha256(manifest).hexdigest()}  {MANIFEST_NAME}\n"
+			)
+
+		self.assertEqual(entries[1]["sha256"], hashlib.sha256(self.content).hexdigest())
+		self.assertEqual(entries[2], {"doctype": "Incoming Letter", "name": "IN-0001", "kind": "attachment", "path": None, "missing": True})
+		self.assertEqual((metrics["members"], metrics["files"], metrics["missing_files"]), (2, 1, 1))
+
+	def test_package_checksums(self):
+		path, package, metrics = self.write_package(compress=True)
+
+		with open(path, "rb") as f:
+			data = f.read()
+
+		self.assertEqual(package["size"], len(data))
+		self.assertEqual(package["md5"], hashlib.md5(data).hexdigest())
+		self.assertEqual(package["sha256"], hashlib.sha256(data).hexdigest())
+		self.assertFalse(os.path.exists(f"{path}.manifest"))
+
+		with tarfile.open(path, "r:gz") as tar:
+			self.assertEqual(tar.extractfile("incoming_letter/IN-0001/attachments/001-scan.pdf").read(), self.content)
+
+	def test_abort_removes_partial_package(self):
+		path = os.path.join(self.directory, "partial.tar")
+		writer = ArchivePackageWriter(path)
+		writer.add_bytes("letter.json", b"{}", {"kind": "letter"})
+		writer.abort()
+
+		self.assertFalse(os.path.exists(path))
+		self.assertFalse(os.path.exists(f"{path}.manifest"))
@@ -0,0 +1,23 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.archive_numbers import (
+	format_archive_number,
+	get_archive_prefix,
+	get_sequence_name,
+)
+
+
+class TestArchiveNumbers(FrappeTestCase):
+	def test_archive_prefix(self):
+		self.assertEqual(get_archive_prefix("2025-11-03"), "ARCH-2025-11-")
+
+	def test_format_archive_number(self):
+		self.assertEqual(format_archive_number("ARCH-2025-11-", 42), "ARCH-2025-11-00042")
+		self.assertEqual(format_archive_number("ARCH-2025-11-", 123456), "ARCH-2025-11-123456")
+
+	def test_sequence_name(self):
+		self.assertEqual(get_sequence_name("ARCH-2025-01-"), "archive_number_2025_01_seq")
+		self.assertEqual(get_sequence_name(get_archive_prefix("2024-12-31")), "archive_number_2024_12_seq")
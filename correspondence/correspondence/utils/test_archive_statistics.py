@@ -0,0 +1,21 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.archive_statistics import get_statistic_keys, get_statistic_name
+
+
+class TestArchiveStatistics(FrappeTestCase):
+	def test_statistic_keys(self):
+		doc = frappe._dict(is_archived=1, department="HR", archive_location=None, archived_on="2024-05-01 10:00:00")
+		self.assertEqual(get_statistic_keys(doc), [("Total", ""), ("Department", "HR"), ("Year", "2024")])
+
+	def test_statistic_keys_not_archived(self):
+		self.assertEqual(get_statistic_keys(frappe._dict(is_archived=0, department="HR")), [])
+		self.assertEqual(get_statistic_keys(None), [])
+
+	def test_statistic_name_is_stable(self):
+		self.assertEqual(get_statistic_name("Department", "HR"), get_statistic_name("Department", "HR"))
+		self.assertNotEqual(get_statistic_name("Department", "HR"), get_statistic_name("Location", "HR"))
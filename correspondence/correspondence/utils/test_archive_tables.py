@@ -0,0 +1,34 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.archive_tables import (
+	get_archive_table_name,
+	get_archive_view_name,
+	get_stub_condition,
+	get_stub_filters,
+	retarget_query,
+)
+
+
+class TestArchiveTables(FrappeTestCase):
+	def test_table_names(self):
+		self.assertEqual(get_archive_table_name("Incoming Letter", 2023), "archive_incoming_letter_2023")
+		self.assertEqual(get_archive_view_name("Outgoing Letter"), "archive_outgoing_letter_all")
+
+	def test_stub_condition(self):
+		self.assertEqual(get_stub_condition("Incoming Letter"), "`archive_table` IS NULL")
+		self.assertEqual(get_stub_condition("Outgoing Letter", "letter"), "letter.`archive_table` IS NULL")
+		self.assertEqual(get_stub_filters("Incoming Letter"), [["archive_table", "is", "not set"]])
+
+	def test_stub_condition_without_archive_tables(self):
+		self.assertEqual(get_stub_condition("Internal Memo"), "1=1")
+		self.assertEqual(get_stub_filters("Internal Memo"), [])
+
+	def test_retarget_query_only_replaces_the_letter_table(self):
+		query = "SELECT `tabIncoming Letter`.name FROM `tabIncoming Letter` JOIN `tabIncoming Letter Item` ON 1=1"
+		self.assertEqual(
+			retarget_query("Incoming Letter", query, "archive_incoming_letter_2023"),
+			"SELECT `archive_incoming_letter_2023`.name FROM `archive_incoming_letter_2023` JOIN `tabIncoming Letter Item` ON 1=1"
+		)
@@ -0,0 +1,54 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.content_store import CHUNK_SIZE, hash_file, link_or_copy
+
+
+class TestContentStore(FrappeTestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.source = os.path.join(self.directory, "source.pdf")
+		self.content = os.urandom(CHUNK_SIZE * 2 + 123)
+
+		with open(self.source, "wb") as f:
+			f.write(self.content)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory, ignore_errors=True)
+
+	def test_hash_file(self):
+		self.assertEqual(hash_file(self.source), (hashlib.sha256(self.content).hexdigest(), len(self.content)))
+
+	def test_hash_empty_file(self):
+		path = os.path.join(self.directory, "empty")
+		open(path, "wb").close()
+
+		self.assertEqual(hash_file(path), (hashlib.sha256(b"").hexdigest(), 0))
+
+	def test_link_replaces_target(self):
+		target = os.path.join(self.directory, "target.pdf")
+		with open(target, "wb") as f:
+			f.write(b"old content")
+
+		link_or_copy(self.source, target)
+
+		self.assertTrue(os.path.samefile(self.source, target))
+		self.assertEqual(sorted(os.listdir(self.directory)), ["source.pdf", "target.pdf"])
+
+	def test_copies_when_link_fails(self):
+		target = os.path.join(self.directory, "target.pdf")
+
+		with patch("os.link", side_effect=OSError("cross-device link")):
+			link_or_copy(self.source, target)
+
+		self.assertFalse(os.path.samefile(self.source, target))
+		self.assertEqual(hash_file(target), hash_file(self.source))
+		self.assertEqual(sorted(os.listdir(self.directory)), ["source.pdf", "target.pdf"])
@@ -0,0 +1,73 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.file_storage import LocalColdStore
+
+
+class TestLocalColdStore(FrappeTestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.store = LocalColdStore(os.path.join(self.directory, "cold"))
+		self.source = os.path.join(self.directory, "letter.txt")
+		self.content = "رسالة إلى الوزارة\n".encode("utf-8") * 50000
+
+		with open(self.source, "wb") as f:
+			f.write(self.content)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory, ignore_errors=True)
+
+	def test_put_stores_compressed_content_by_hash(self):
+		key = self.store.put(self.source)
+
+		self.assertEqual(key, hashlib.sha256(self.content).hexdigest())
+		self.assertTrue(self.store.exists(key))
+		self.assertEqual(self.store.get_path(key), os.path.join(self.store.root, key[:2], f"{key}.gz"))
+		self.assertLess(self.store.get_size(key), len(self.content))
+
+		with gzip.open(self.store.get_path(key), "rb") as f:
+			self.assertEqual(f.read(), self.content)
+
+		# No temporary files are left in the store
+		self.assertEqual(os.listdir(self.store.root), [key[:2]])
+
+	def test_restore_writes_original_content(self):
+		key = self.store.put(self.source)
+		target = os.path.join(self.directory, "private", "files", "restored.txt")
+
+		self.assertEqual(self.store.restore(key, target), len(self.content))
+
+		with open(target, "rb") as f:
+			self.assertEqual(f.read(), self.content)
+		self.assertEqual(os.listdir(os.path.dirname(target)), ["restored.txt"])
+
+	def test_restore_replaces_existing_file(self):
+		key = self.store.put(self.source)
+		target = os.path.join(self.directory, "restored.txt")
+		with open(target, "wb") as f:
+			f.write(b"stale")
+
+		self.store.restore(key, target)
+
+		with open(target, "rb") as f:
+			self.assertEqual(f.read(), self.content)
+
+	def test_open_reads_without_restoring(self):
+		key = self.store.put(self.source)
+
+		with self.store.open(key) as f:
+			self.assertEqual(f.read(), self.content)
+		self.assertEqual(self.store.get_original_size(key), len(self.content))
+
+	def test_missing_key(self):
+		self.assertFalse(self.store.exists("0" * 64))
+		self.assertRaises(FileNotFoundError, self.store.restore, "0" * 64, os.path.join(self.directory, "x"))
+		self.assertFalse(os.path.exists(os.path.join(self.directory, "x")))
@@ -0,0 +1,49 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.pagination import (
+	decode_cursor,
+	encode_cursor,
+	get_page_size,
+	keyset_condition,
+)
+
+
+class TestPagination(FrappeTestCase):
+	def test_cursor_round_trip(self):
+		key = ["2025-11-03 10:15:00", "Incoming Letter", "IN-2025-00042"]
+		cursor = encode_cursor(key)
+
+		self.assertNotIn("=", cursor.rstrip("="))
+		self.assertEqual(decode_cursor(cursor), key)
+
+	def test_cursor_keeps_unicode(self):
+		key = [0.5, "رسالة"]
+		self.assertEqual(decode_cursor(encode_cursor(key)), key)
+
+	def test_no_cursor(self):
+		self.assertIsNone(decode_cursor(None))
+		self.assertIsNone(decode_cursor(""))
+
+	def test_invalid_cursor(self):
+		self.assertRaises(frappe.ValidationError, decode_cursor, "not a cursor!")
+
+	def test_keyset_condition(self):
+		values = {}
+		condition = keyset_condition(["`modified`", "`name`"], ["2025-01-01", "A-1"], values)
+
+		self.assertEqual(
+			condition,
+			"((`modified` < %(cursor_0)s) OR (`modified` = %(cursor_0)s AND `name` < %(cursor_1)s))"
+		)
+		self.assertEqual(values, {"cursor_0": "2025-01-01", "cursor_1": "A-1"})
+
+	def test_page_size(self):
+		self.assertEqual(get_page_size(None), 50)
+		self.assertEqual(get_page_size("20"), 20)
+		self.assertEqual(get_page_size(0, default=10), 10)
+		self.assertEqual(get_page_size(10000), 500)
+		self.assertEqual(get_page_size(-5), 1)
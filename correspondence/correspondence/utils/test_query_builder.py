@@ -0,0 +1,49 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.query_builder import build_sql_conditions
+
+ALLOWED_FILTERS = {
+	"department": ("department", "="),
+	"from_date": ("archived_on", ">="),
+	"status": ("status", "in"),
+	"subject": ("subject", "like"),
+}
+
+
+class TestQueryBuilder(FrappeTestCase):
+	def test_builds_parameterized_conditions(self):
+		values = {}
+		conditions = build_sql_conditions(
+			{"department": "HR", "from_date": "2025-01-01", "subject": "%budget%"}, ALLOWED_FILTERS, values, "filter"
+		)
+
+		self.assertEqual(conditions, [
+			"`department` = %(filter_department)s",
+			"`archived_on` >= %(filter_from_date)s",
+			"`subject` LIKE %(filter_subject)s",
+		])
+		self.assertEqual(values, {"filter_department": "HR", "filter_from_date": "2025-01-01", "filter_subject": "%budget%"})
+
+	def test_in_filter_takes_tuple(self):
+		values = {}
+		self.assertEqual(build_sql_conditions({"status": ["Open", "Closed"]}, ALLOWED_FILTERS, values, "f"), ["`status` IN %(f_status)s"])
+		self.assertEqual(values["f_status"], ("Open", "Closed"))
+
+		build_sql_conditions({"status": "Open"}, ALLOWED_FILTERS, values, "f")
+		self.assertEqual(values["f_status"], ("Open",))
+
+	def test_skips_empty_values(self):
+		values = {}
+		self.assertEqual(build_sql_conditions({"department": "", "status": [], "subject": None}, ALLOWED_FILTERS, values, "f"), [])
+		self.assertEqual(values, {})
+
+	def test_rejects_undeclared_filters(self):
+		self.assertRaises(frappe.ValidationError, build_sql_conditions, {"owner": "x"}, ALLOWED_FILTERS, {}, "f")
+
+	def test_missing_column(self):
+		self.assertIsNone(build_sql_conditions({"department": "HR"}, ALLOWED_FILTERS, {}, "f", columns={"status"}))
+		self.assertEqual(build_sql_conditions({"department": "HR"}, ALLOWED_FILTERS, {}, "f", columns={"department"}), ["`department` = %(f_department)s"])
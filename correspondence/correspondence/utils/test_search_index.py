@@ -0,0 +1,26 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.search_index import decode_block, encode_block
+
+
+class TestSearchIndex(FrappeTestCase):
+	def test_block_round_trip(self):
+		entries = {3: [1, 5, 9], 10: [2], 250: [0, 300, 70000]}
+		self.assertEqual(decode_block(encode_block(entries)), entries)
+
+	def test_block_orders_documents(self):
+		entries = {42: [7], 5: [0, 1]}
+		self.assertEqual(list(decode_block(encode_block(entries))), [5, 42])
+
+	def test_block_uses_varint_deltas(self):
+		# doc 1 (delta 1), one position (1), position 3 (delta 3)
+		self.assertEqual(encode_block({1: [3]}), bytes([1, 1, 3]))
+		# Deltas of 128 and more take two bytes
+		self.assertEqual(len(encode_block({200: [0]})), 4)
+
+	def test_empty_block(self):
+		self.assertEqual(encode_block({}), b"")
+		self.assertEqual(decode_block(b""), {})
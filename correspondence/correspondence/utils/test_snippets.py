@@ -0,0 +1,41 @@
+# Copyright (c) 2025, ERP Team and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from correspondence.correspondence.utils.snippets import build_match_pattern, build_snippet, get_snippet
+
+
+class TestSnippets(FrappeTestCase):
+	def test_highlights_whole_word_across_spellings(self):
+		# Query without diacritics matches the vocalized word with its article
+		pattern = build_match_pattern("الوزارة")
+		self.assertEqual(
+			build_snippet("أرسلت الوَزارةُ خطاباً إلى المدير", pattern),
+			"أرسلت <mark>الوَزارةُ</mark> خطاباً إلى المدير"
+		)
+
+	def test_highlights_every_match_case_insensitively(self):
+		pattern = build_match_pattern("budget")
+		self.assertEqual(build_snippet("the Budgets, budget.", pattern), "the <mark>Budgets</mark>, <mark>budget</mark>.")
+
+	def test_cuts_window_around_match(self):
+		pattern = build_match_pattern("budget")
+		text = "word " * 60 + "the budget is <b>final</b> " + "tail " * 60
+
+		self.assertEqual(build_snippet(text, pattern, length=40), "…word word the <mark>budget</mark> is final tail…")
+
+	def test_escapes_html(self):
+		pattern = build_match_pattern("budget")
+		self.assertEqual(build_snippet("a < b budgets", pattern), "a &lt; b <mark>budgets</mark>")
+
+	def test_no_match(self):
+		pattern = build_match_pattern("budget")
+		self.assertIsNone(build_snippet("nothing here", pattern))
+		self.assertIsNone(build_snippet("", pattern))
+		self.assertIsNone(build_match_pattern('"OR" | and'))
+
+	def test_get_snippet_falls_back_to_first_text(self):
+		pattern = build_match_pattern("budget")
+		self.assertEqual(get_snippet({"summary": "", "ocr_text": "x budget"}, ["summary", "ocr_text"], pattern), "x <mark>budget</mark>")
+		self.assertEqual(get_snippet({"summary": "hello world"}, ["summary"], pattern, 5), "hello…")
@@ -12,6 +12,8 @@ from frappe.utils import now
 import shutil
 import os
 
+from correspondence.correspondence.utils.file_storage import get_local_path
+
 
 def create_document_version(doctype, docname, user=None, changes_summary=""):
 	"""
@@ -100,7 +102,7 @@ def get_working_copy(doctype, docname, attachment_name):
 		
 		# Create working copy by copying original
 		if version.original_file:
-			original_path = frappe.get_site_path('public', version.original_file.lstrip('/'))
+			original_path = get_local_path(version.original_file)
 			
 			if os.path.exists(original_path):
 				# Create working copy filename
@@ -108,7 +110,8 @@ def get_working_copy(doctype, docname, attachment_name):
 				name, ext = os.path.splitext(base_name)
 				working_copy_name = f"{name}_working_copy{ext}"
 				
-				# Copy file
+				# Copy file (a real copy: editors may save the working copy in
+				# place, which must not change the preserved original)
 				working_copy_dir = os.path.dirname(original_path)
 				working_copy_path = os.path.join(working_copy_dir, working_copy_name)
 				
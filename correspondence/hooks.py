@@ -91,6 +91,11 @@ web_include_js = "/assets/correspondence/js/main.js"
 # before_uninstall = "correspondence.uninstall.before_uninstall"
 # after_uninstall = "correspondence.uninstall.after_uninstall"
 
+# Migration
+# ------------
+
+after_migrate = ["correspondence.correspondence.utils.archive_tables.sync_archive_tables"]
+
 # Integration Setup
 # ------------------
 # To set up dependencies/integrations with other apps
@@ -139,11 +144,97 @@ web_include_js = "/assets/correspondence/js/main.js"
 
 doc_events = {
 	"Incoming Letter": {
-		"on_update": "correspondence.correspondence.utils.notification_utils.notify_on_assignment",
-		"validate": "correspondence.correspondence.utils.notification_utils.notify_on_status_change"
+		"on_update": [
+			"correspondence.correspondence.utils.notification_utils.notify_on_assignment",
+			"correspondence.correspondence.utils.correspondent_index.update_correspondent_index",
+			"correspondence.correspondence.utils.relation_graph.sync_manual_relations",
+			"correspondence.correspondence.utils.search_index.queue_index_update",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms"
+		],
+		"validate": [
+			"correspondence.correspondence.utils.notification_utils.notify_on_status_change",
+			"correspondence.correspondence.utils.correspondent_index.set_correspondent_key",
+			"correspondence.correspondence.utils.content_store.register_attachments"
+		],
+		"after_delete": [
+			"correspondence.correspondence.utils.correspondent_index.update_correspondent_index",
+			"correspondence.correspondence.utils.relation_graph.delete_relations",
+			"correspondence.correspondence.utils.search_index.queue_index_removal",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms",
+			"correspondence.correspondence.utils.search_cache.bump_search_generation",
+			"correspondence.correspondence.utils.archive_counters.update_archive_counters",
+			"correspondence.correspondence.utils.archive_statistics.update_archive_statistics",
+			"correspondence.correspondence.utils.content_store.update_content_references"
+		],
+		"on_change": [
+			"correspondence.correspondence.utils.search_cache.bump_search_generation",
+			"correspondence.correspondence.utils.archive_counters.update_archive_counters",
+			"correspondence.correspondence.utils.archive_statistics.update_archive_statistics",
+			"correspondence.correspondence.utils.content_store.update_content_references"
+		]
 	},
 	"Outgoing Letter": {
-		"validate": "correspondence.correspondence.utils.notification_utils.notify_on_status_change"
+		"on_update": [
+			"correspondence.correspondence.utils.correspondent_index.update_correspondent_index",
+			"correspondence.correspondence.utils.relation_graph.sync_manual_relations",
+			"correspondence.correspondence.utils.search_index.queue_index_update",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms"
+		],
+		"validate": [
+			"correspondence.correspondence.utils.notification_utils.notify_on_status_change",
+			"correspondence.correspondence.utils.correspondent_index.set_correspondent_key",
+			"correspondence.correspondence.utils.content_store.register_attachments"
+		],
+		"after_delete": [
+			"correspondence.correspondence.utils.correspondent_index.update_correspondent_index",
+			"correspondence.correspondence.utils.relation_graph.delete_relations",
+			"correspondence.correspondence.utils.search_index.queue_index_removal",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms",
+			"correspondence.correspondence.utils.search_cache.bump_search_generation",
+			"correspondence.correspondence.utils.archive_counters.update_archive_counters",
+			"correspondence.correspondence.utils.archive_statistics.update_archive_statistics",
+			"correspondence.correspondence.utils.content_store.update_content_references"
+		],
+		"on_change": [
+			"correspondence.correspondence.utils.search_cache.bump_search_generation",
+			"correspondence.correspondence.utils.archive_counters.update_archive_counters",
+			"correspondence.correspondence.utils.archive_statistics.update_archive_statistics",
+			"correspondence.correspondence.utils.content_store.update_content_references"
+		]
+	},
+	"Internal Memo": {
+		"on_update": [
+			"correspondence.correspondence.utils.search_index.queue_index_update",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms"
+		],
+		"after_delete": [
+			"correspondence.correspondence.utils.search_index.queue_index_removal",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms",
+			"correspondence.correspondence.utils.search_cache.bump_search_generation"
+		],
+		"on_change": "correspondence.correspondence.utils.search_cache.bump_search_generation"
+	},
+	"Legacy Archive": {
+		"on_update": [
+			"correspondence.correspondence.utils.search_index.queue_index_update",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms"
+		],
+		"validate": "correspondence.correspondence.utils.content_store.register_attachments",
+		"after_delete": [
+			"correspondence.correspondence.utils.search_index.queue_index_removal",
+			"correspondence.correspondence.utils.search_suggestions.update_search_terms",
+			"correspondence.correspondence.utils.search_cache.bump_search_generation",
+			"correspondence.correspondence.utils.content_store.update_content_references"
+		],
+		"on_change": [
+			"correspondence.correspondence.utils.search_cache.bump_search_generation",
+			"correspondence.correspondence.utils.content_store.update_content_references"
+		]
+	},
+	"Customer File": {
+		"validate": "correspondence.correspondence.utils.content_store.register_attachments",
+		"on_change": "correspondence.correspondence.utils.content_store.update_content_references",
+		"after_delete": "correspondence.correspondence.utils.content_store.update_content_references"
 	}
 }
 
@@ -152,7 +243,16 @@ doc_events = {
 
 scheduler_events = {
 	"daily": [
-		"correspondence.correspondence.utils.notification_utils.check_daily_follow_ups"
+		"correspondence.correspondence.utils.notification_utils.check_daily_follow_ups",
+		"correspondence.correspondence.utils.archive_numbers.ensure_archive_number_sequences",
+		"correspondence.correspondence.utils.archive_counters.reconcile_archive_location_counts",
+		"correspondence.correspondence.utils.archive_statistics.rebuild_archive_statistics",
+		"correspondence.correspondence.utils.file_storage.move_archived_attachments_to_cold_storage",
+		"correspondence.correspondence.utils.content_store.reconcile_content_blobs",
+		"correspondence.correspondence.utils.retention.run_retention"
+	],
+	"monthly": [
+		"correspondence.correspondence.utils.archive_tables.move_due_archive_years"
 	]
 }
 
@@ -186,7 +286,7 @@ scheduler_events = {
 
 # Request Events
 # ----------------
-# before_request = ["correspondence.utils.before_request"]
+before_request = ["correspondence.correspondence.utils.file_storage.restore_requested_file"]
 # after_request = ["correspondence.utils.after_request"]
 
 # Job Events
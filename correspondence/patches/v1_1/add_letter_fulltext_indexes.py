@@ -0,0 +1,17 @@
+import frappe
+
+from correspondence.correspondence.api.search import FULLTEXT_INDEXES
+
+
+def execute():
+	"""Add FULLTEXT indexes used by the fulltext mode of search_letters"""
+	for doctype, (index_name, columns) in FULLTEXT_INDEXES.items():
+		if frappe.db.sql(f"SHOW INDEX FROM `tab{doctype}` WHERE Key_name = %s", index_name):
+			continue
+		
+		frappe.db.sql_ddl(f"""
+			ALTER TABLE `tab{doctype}`
+			ADD FULLTEXT INDEX `{index_name}` ({', '.join(f'`{c}`' for c in columns)})
+		""")
+	
+	frappe.cache().delete_value("letter_fulltext_index")
@@ -0,0 +1,28 @@
+import frappe
+
+from correspondence.correspondence.utils.arabic_text import make_name_key
+from correspondence.correspondence.utils.correspondent_index import (
+	CORRESPONDENT_FIELDS,
+	rebuild_correspondent_index,
+)
+
+
+def execute():
+	"""Populate sender/recipient keys on existing letters and build the Correspondent table"""
+	for doctype, (name_field, key_field, date_field) in CORRESPONDENT_FIELDS.items():
+		rows = frappe.db.sql(f"""
+			SELECT `{name_field}` AS value
+			FROM `tab{doctype}`
+			WHERE IFNULL(`{name_field}`, '') != ''
+			GROUP BY `{name_field}`
+		""", as_dict=True)
+		
+		# Update per distinct name rather than per letter
+		for row in rows:
+			frappe.db.sql(f"""
+				UPDATE `tab{doctype}`
+				SET `{key_field}` = %s
+				WHERE `{name_field}` = %s
+			""", (make_name_key(row.value), row.value))
+	
+	rebuild_correspondent_index()
@@ -0,0 +1,8 @@
+import frappe
+
+from correspondence.correspondence.utils.archive_statistics import rebuild_archive_statistics
+
+
+def execute():
+	"""Build the Archive Statistic summary from the letter tables"""
+	rebuild_archive_statistics()
@@ -0,0 +1,6 @@
+from correspondence.correspondence.utils.search_suggestions import rebuild_search_terms
+
+
+def execute():
+	"""Build the Search Term table used by search autocomplete"""
+	rebuild_search_terms()
@@ -0,0 +1,8 @@
+import frappe
+
+from correspondence.correspondence.utils.archive_numbers import ensure_archive_number_sequences
+
+
+def execute():
+	"""Create the archive number sequences of the current and the next month"""
+	ensure_archive_number_sequences()
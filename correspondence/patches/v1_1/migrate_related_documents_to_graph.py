@@ -0,0 +1,21 @@
+import frappe
+
+
+def execute():
+	"""Copy existing Related Document rows of letters into the Letter Relation graph"""
+	frappe.db.sql("""
+		INSERT IGNORE INTO `tabLetter Relation`
+			(name, source_doctype, source_name, target_doctype, target_name, score,
+			 relation_reason, strategy, relation_type, creation, modified, owner,
+			 modified_by, docstatus, idx)
+		SELECT
+			rd.name, rd.parenttype, rd.parent, rd.document_type, rd.document_name,
+			rd.similarity_score, rd.notes,
+			IF(rd.relation_type = 'Manual', 'Manual', NULL),
+			IFNULL(rd.relation_type, 'Manual'),
+			rd.creation, rd.modified, rd.owner, rd.modified_by, 0, 0
+		FROM `tabRelated Document` rd
+		WHERE rd.parenttype IN ('Incoming Letter', 'Outgoing Letter')
+			AND IFNULL(rd.document_type, '') != ''
+			AND IFNULL(rd.document_name, '') != ''
+	""")